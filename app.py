@@ -1,4 +1,4 @@
-import os, sys
+import os, sys, uuid
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
@@ -6,8 +6,9 @@ if APP_DIR not in sys.path:
 import streamlit as st
 from config import APP_TITLE, LOGO_URL
 from core.basic_auth import require_basic_auth
-from core.database import run_ddl
-from core.migrations import run_migrations
+from core.database import db_backend, pool_stats
+from core.migrations import boot_info, ensure_schema
+from core import profiling
 from components.navigation import render_sidebar
 from nzi_pages import dashboard, clients, admin, client_folder, jobs, job_folder
 from nzi_pages import scope1, scope2, scope3
@@ -24,14 +25,18 @@ except Exception:
 
 require_basic_auth()
 
-run_ddl()
+# Query profile for this rerun (None unless QUERY_PROFILE / SLOW_QUERY_LOG is set).
+_profile = profiling.begin_rerun()
+# Resolved up front: once a page calls st.stop() / st.rerun(), any st.* access in
+# the finally block below raises again.
+_profile_session = st.session_state.setdefault("_profile_session", uuid.uuid4().hex)
 
 def _env_truthy(name: str, default: str = "true") -> bool:
     v = str(os.getenv(name, default) or "").strip().lower()
     return v in ("1", "true", "yes", "y", "on")
 
-if _env_truthy("RUN_STARTUP_MIGRATIONS", "false"):
-    run_migrations()
+# Schema setup runs once per process; later reruns return immediately.
+ensure_schema(include_migrations=_env_truthy("RUN_STARTUP_MIGRATIONS", "false"))
 
 # --- Action links handler (Clients icons) ---
 try:
@@ -81,22 +86,38 @@ with c2:
     st.caption("Net Zero International — internal portal")
 st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
 
+diagnostics = st.expander("🔧 Diagnostics", expanded=False)
+with diagnostics:
+    st.caption("Schema boot")
+    st.write(boot_info())
+    if db_backend() == "postgres":
+        st.caption("Connection pool")
+        st.write(pool_stats())
+
 page = render_sidebar()
-if page == "Dashboard":
-    dashboard.render()
-elif page == "Clients":
-    clients.render()
-elif page == "Client Folder":
-    client_folder.render()
-elif page == "Jobs":
-    jobs.render()
-elif page == "Job Folder":
-    job_folder.render()
-elif page == "Admin":
-    admin.render()
-elif page == "Scope 1":
-    scope1.render()
-elif page == "Scope 2":
-    scope2.render()
-elif page == "Scope 3":
-    scope3.render()
+profiling.set_page(page)
+try:
+    if page == "Dashboard":
+        dashboard.render()
+    elif page == "Clients":
+        clients.render()
+    elif page == "Client Folder":
+        client_folder.render()
+    elif page == "Jobs":
+        jobs.render()
+    elif page == "Job Folder":
+        job_folder.render()
+    elif page == "Admin":
+        admin.render()
+    elif page == "Scope 1":
+        scope1.render()
+    elif page == "Scope 2":
+        scope2.render()
+    elif page == "Scope 3":
+        scope3.render()
+finally:
+    # First statement, with no st.* call before it, so it also runs after st.stop().
+    # Keyed per browser session so benchmarks/apptest_load.py can read its own reruns.
+    profiling.end_rerun(_profile, session_key=_profile_session)
+    with diagnostics:
+        profiling.render_panel(_profile)
@@ -0,0 +1,293 @@
+"""Headless load harness: drive app.py through scripted sessions with AppTest.
+
+Each simulated session is a streamlit.testing.v1.AppTest running the real
+app.py against a (generated) database, clicking through the pages the way a
+consultant does:
+
+  dashboard          first load
+  clients            sidebar -> Clients
+  client_folder      open a client's folder (the row's 📂 button)
+  client_folder_tab  switch Client Folder section (the client_folder_tab radio)
+  jobs               sidebar -> Jobs (renders the full jobs list; not in the default script)
+  job_folder         open one of the client's jobs (what the Jobs 📂 button does)
+  scope              Job Folder -> Open Scope 3
+  add_scope_row      fill in the Add row form and add a Scope 3 row
+
+Every step is one interaction; its latency is the wall time of the rerun(s)
+it triggers and its query count comes from core.profiling (QUERY_PROFILE is
+switched on for the run) via profiling.recent_reruns() for the session's
+_profile_session key, so reruns ended by st.stop() / st.rerun() count too.
+--sessions runs N sessions, --concurrency of them at a time in threads
+sharing this process (and its DB handle / pool), to expose contention. The report gives p50 / p95 per step and can be written to
+JSON with --out.
+
+Usage:
+    python -m benchmarks.apptest_load --db /tmp/nzi_bench.duckdb --generate --scale small
+    python -m benchmarks.apptest_load --db /tmp/nzi_bench.duckdb --sessions 8 --concurrency 4 --rounds 2
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+from benchmarks.generate import add_scale_arguments, scale_args, use_database
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+STEPS = ("dashboard", "clients", "client_folder", "client_folder_tab", "jobs", "job_folder", "scope", "add_scope_row")
+DEFAULT_STEPS = tuple(s for s in STEPS if s != "jobs")
+SCOPE = "Scope 3"
+
+
+@dataclass
+class StepResult:
+    session: int
+    round: int
+    step: str
+    ms: float
+    queries: int | None
+    reruns: int
+    error: str | None = None
+
+
+class Session:
+    def __init__(self, sid: int, client_id: int, job_id: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.sid = sid
+        self.client_id = client_id
+        self.job_id = job_id
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.tab = 0
+
+    # --- interactions -------------------------------------------------
+    def _nav(self, page: str):
+        self.at.radio(key="nav_page").set_value(page).run()
+
+    def dashboard(self):
+        self.at.run()
+
+    def clients(self):
+        if self.at.session_state["active_page"] == "Clients" or self._radio_value("nav_page") != "Clients":
+            self._nav("Clients")
+        else:
+            # Radio already on Clients (we left via buttons): go back the way the pages' Back buttons do.
+            self.at.session_state["active_page"] = "Clients"
+            self.at.run()
+
+    def _radio_value(self, key: str):
+        found = [w for w in self.at.radio if w.key == key]
+        return found[0].value if found else None
+
+    def client_folder(self):
+        self.at.button(key=f"cl_open_{self.client_id}").click().run()
+
+    def client_folder_tab(self):
+        tabs = [w for w in self.at.radio if w.key == "client_folder_tab"]
+        if tabs:
+            self.tab = (self.tab + 2) % len(tabs[0].options)
+            tabs[0].set_value(tabs[0].options[self.tab]).run()
+        else:
+            self.at.run()
+
+    def jobs(self):
+        self._nav("Jobs")
+
+    def job_folder(self):
+        self.at.session_state["selected_job_id"] = self.job_id
+        self.at.session_state["active_page"] = "Job Folder"
+        self.at.run()
+
+    def scope(self):
+        buttons = [b for b in self.at.button if b.label == f"📦 Open {SCOPE}"]
+        if not buttons:
+            raise RuntimeError(f"'Open {SCOPE}' button not found")
+        buttons[0].click().run()
+
+    def add_scope_row(self):
+        base = f"{SCOPE}_addrow"
+        self.at.number_input(key=f"{base}_qty").set_value(100.0 + self.sid)
+        self.at.button(key=f"{base}_add").click().run()
+
+    # --- measurement --------------------------------------------------
+    def _profiles(self) -> list[dict]:
+        from core import profiling
+
+        try:
+            key = self.at.session_state["_profile_session"]
+        except KeyError:
+            return []
+        return profiling.recent_reruns(key)
+
+    def step(self, name: str, rnd: int) -> StepResult:
+        seen = max((p["seq"] for p in self._profiles()), default=0)
+        t0 = time.perf_counter()
+        error = None
+        try:
+            getattr(self, name)()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        ms = (time.perf_counter() - t0) * 1000.0
+        if error is None and len(self.at.exception):
+            error = str(self.at.exception[0].message).splitlines()[0]
+        profiles = [p for p in self._profiles() if p["seq"] > seen]
+        queries = sum(p["queries"] for p in profiles) if profiles else None
+        return StepResult(self.sid, rnd, name, round(ms, 2), queries, len(profiles), error)
+
+
+def _targets(n: int) -> list[tuple[int, int]]:
+    """(client_id, job_id) per session: active clients on the first Clients page that have jobs."""
+    from core.database import get_conn
+
+    with get_conn() as con:
+        rows = con.execute(
+            """
+            SELECT c.db_id, MIN(j.job_id)
+            FROM clients c
+            JOIN jobs j ON j.client_db_id = c.db_id
+            JOIN job_scope_config s ON s.job_id = j.job_id AND s.scope = %s AND s.include_scope = TRUE
+            WHERE c.status = 'Active'
+            GROUP BY c.db_id, c.client_name
+            ORDER BY c.client_name, c.db_id
+            LIMIT 50
+            """,
+            [SCOPE],
+        ).fetchall()
+    if not rows:
+        raise RuntimeError("No active client with a Scope 3 job; generate a database first.")
+    return [(int(rows[i % len(rows)][0]), int(rows[i % len(rows)][1])) for i in range(n)]
+
+
+def run_session(sid: int, target: tuple[int, int], steps, rounds: int, timeout: float) -> list[StepResult]:
+    s = Session(sid, *target, timeout=timeout)
+    out = []
+    for rnd in range(rounds):
+        for name in steps:
+            if rnd > 0 and name == "dashboard":
+                continue
+            out.append(s.step(name, rnd))
+    return out
+
+
+def _pct(values: list[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    s = sorted(values)
+    return s[max(0, math.ceil(q * len(s)) - 1)]
+
+
+def summarise(results: list[StepResult], steps) -> dict:
+    out = {}
+    for name in steps:
+        rs = [r for r in results if r.step == name]
+        if not rs:
+            continue
+        ms = [r.ms for r in rs]
+        qs = [r.queries for r in rs if r.queries is not None]
+        out[name] = {
+            "n": len(rs),
+            "p50_ms": round(statistics.median(ms), 2),
+            "p95_ms": round(_pct(ms, 0.95), 2),
+            "max_ms": round(max(ms), 2),
+            "queries_avg": round(statistics.mean(qs), 1) if qs else None,
+            "queries_max": max(qs) if qs else None,
+            "errors": sum(1 for r in rs if r.error),
+        }
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="DuckDB file (ignored with DB_BACKEND=postgres)")
+    ap.add_argument("--generate", action="store_true", help="generate the database first (must not exist)")
+    add_scale_arguments(ap)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--concurrency", type=int, default=1)
+    ap.add_argument("--rounds", type=int, default=1, help="times each session repeats the script")
+    ap.add_argument("--steps", default=",".join(DEFAULT_STEPS), help=f"comma-separated subset of {','.join(STEPS)}")
+    ap.add_argument("--timeout", type=float, default=120.0, help="per-rerun AppTest timeout (s)")
+    ap.add_argument("--user", default="alex@nzi.example", help="provisioned Admin email to sign in as")
+    ap.add_argument("--out", help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    bad = [s for s in steps if s not in STEPS]
+    if bad:
+        ap.error(f"unknown steps: {bad}")
+
+    postgres = os.getenv("DB_BACKEND", "duckdb").lower() == "postgres"
+    if not postgres and not args.db:
+        ap.error("--db is required for DuckDB")
+    use_database(args.db)
+    # Sign in through the dev-login path and record every query.
+    os.environ.update(
+        APP_ENV="dev", DEV_LOGIN_EMAIL=args.user, QUERY_PROFILE="1",
+        BASIC_AUTH_USER="", BASIC_AUTH_PASSWORD="", RUN_STARTUP_MIGRATIONS="false",
+    )
+    os.chdir(REPO_DIR)
+
+    if args.generate:
+        from benchmarks.generate import generate
+
+        if not postgres and os.path.exists(args.db):
+            ap.error(f"{args.db} already exists; drop --generate or pick a new path")
+        generate(**scale_args(args), seed=args.seed)
+
+    from core.migrations import ensure_schema
+
+    ensure_schema(include_migrations=postgres)
+    targets = _targets(args.sessions + 1)
+
+    # Warm-up session (imports, schema boot, caches); not recorded.
+    t0 = time.perf_counter()
+    warm = run_session(-1, targets[-1], ["dashboard", "clients"], 1, args.timeout)
+    print(f"warm-up: {(time.perf_counter() - t0) * 1000.0:.0f} ms" + "".join(f"  [{r.step}: {r.error}]" for r in warm if r.error))
+
+    results: list[StepResult] = []
+    lock = threading.Lock()
+
+    def one(sid):
+        rs = run_session(sid, targets[sid], steps, args.rounds, args.timeout)
+        with lock:
+            results.extend(rs)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        list(pool.map(one, range(args.sessions)))
+    wall = time.perf_counter() - t0
+
+    summary = summarise(results, steps)
+    print(f"\n{args.sessions} sessions x {args.rounds} round(s), concurrency {args.concurrency}: {wall:.1f}s wall")
+    print(f"{'step':<20} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'queries':>8} {'errors':>7}")
+    for name, s in summary.items():
+        q = "-" if s["queries_avg"] is None else f"{s['queries_avg']:g}"
+        print(f"{name:<20} {s['n']:>4} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['max_ms']:>9.1f} {q:>8} {s['errors']:>7}")
+    errors = sorted({r.error for r in results if r.error})
+    for e in errors[:10]:
+        print(f"  error: {e}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "sessions": args.sessions,
+                    "concurrency": args.concurrency,
+                    "rounds": args.rounds,
+                    "wall_s": round(wall, 2),
+                    "steps": summary,
+                    "results": [asdict(r) for r in results],
+                },
+                f,
+                indent=2,
+            )
+        print(f"results: {args.out}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
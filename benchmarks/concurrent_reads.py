@@ -0,0 +1,158 @@
+"""Client Folder reads one after another vs concurrently (core.parallel.fetch_all).
+
+Scenarios, run for a spread of clients with the section cache cleared before
+every call:
+
+  open          client row + Sites (what opening a client issues)
+  all_sections  client row + every cached section + the Targets baseline
+
+--rtt-ms adds that much sleep to every read to stand in for the network
+round trip to a hosted Postgres. DuckDB reads are in-process, so at 0 the
+comparison only shows the thread hand-off cost. With DB_BACKEND=postgres
+leave it at 0 and the real round trips are measured.
+
+Usage:
+    python -m benchmarks.concurrent_reads --db /tmp/nzi_bench.duckdb --generate --scale small
+    python -m benchmarks.concurrent_reads --db /tmp/nzi_bench.duckdb --rtt-ms 20 --workers 4
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.generate import add_scale_arguments, scale_args, use_database
+
+
+def _scenarios(rtt_ms: float) -> dict:
+    from models.clients import get_client
+    from services import client_folder as folder
+
+    def read(fn):
+        def run(cid):
+            if rtt_ms:
+                time.sleep(rtt_ms / 1000.0)
+            return fn(cid)
+
+        return run
+
+    open_reads = {"client": get_client, "sites": folder.sites}
+    all_reads = dict(
+        open_reads,
+        contacts=folder.contacts,
+        crp=folder.crp_years,
+        activity=folder.activity_summary,
+        datasets=folder.datasets_used,
+        notes=folder.notes,
+        baseline=lambda cid: folder.baseline(cid, None, 2026),
+    )
+    return {
+        "open": {k: read(fn) for k, fn in open_reads.items()},
+        "all_sections": {k: read(fn) for k, fn in all_reads.items()},
+    }
+
+
+def _client_ids(n: int) -> list[int]:
+    from core.database import get_conn
+
+    with get_conn() as con:
+        df = con.execute("SELECT db_id FROM clients WHERE status='Active' ORDER BY db_id").df()
+    ids = df["db_id"].astype(int).tolist()
+    if not ids:
+        raise RuntimeError("No active clients; generate a database first.")
+    step = max(1, len(ids) // n)
+    return ids[::step][:n]
+
+
+def _time(reads: dict, cid: int, concurrent: bool) -> float:
+    from core.parallel import fetch_all
+    from services.client_folder import invalidate_client
+
+    invalidate_client(cid)
+    bound = {k: (lambda fn=fn: fn(cid)) for k, fn in reads.items()}
+    t0 = time.perf_counter()
+    if concurrent:
+        fetch_all(bound)
+    else:
+        for fn in bound.values():
+            fn()
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def _stats(ms: list[float]) -> dict:
+    s = sorted(ms)
+    return {
+        "n": len(s),
+        "p50_ms": round(statistics.median(s), 2),
+        "p95_ms": round(s[max(0, math.ceil(0.95 * len(s)) - 1)], 2),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="DuckDB file (ignored with DB_BACKEND=postgres)")
+    ap.add_argument("--generate", action="store_true", help="generate the database first (must not exist)")
+    add_scale_arguments(ap)
+    ap.add_argument("--clients-sampled", dest="sampled", type=int, default=50, help="clients to run each scenario for")
+    ap.add_argument("--rtt-ms", dest="rtt_ms", type=float, default=0.0, help="simulated round trip added to every read")
+    ap.add_argument("--workers", type=int, help="DB_READ_WORKERS for the concurrent runs")
+    ap.add_argument("--out", help="write results JSON here")
+    args = ap.parse_args(argv)
+
+    postgres = os.getenv("DB_BACKEND", "duckdb").lower() == "postgres"
+    if not postgres and not args.db:
+        ap.error("--db is required for DuckDB")
+    use_database(args.db)
+    if args.workers:
+        os.environ["DB_READ_WORKERS"] = str(args.workers)
+
+    if args.generate:
+        from benchmarks.generate import generate
+
+        if not postgres and os.path.exists(args.db):
+            ap.error(f"{args.db} already exists; drop --generate or pick a new path")
+        generate(**scale_args(args), seed=args.seed)
+
+    from core.migrations import ensure_schema
+    from core.parallel import read_workers
+
+    ensure_schema(include_migrations=postgres)
+    cids = _client_ids(args.sampled)
+    scenarios = _scenarios(args.rtt_ms)
+
+    results = {}
+    for name, reads in scenarios.items():
+        _time(reads, cids[0], True)  # warm-up (pool threads, imports)
+        serial = [_time(reads, cid, False) for cid in cids]
+        concurrent = [_time(reads, cid, True) for cid in cids]
+        s, c = _stats(serial), _stats(concurrent)
+        results[name] = {
+            "reads": len(reads),
+            "serial": s,
+            "concurrent": c,
+            "speedup_p50": round(s["p50_ms"] / c["p50_ms"], 2) if c["p50_ms"] else None,
+        }
+
+    print(f"{len(cids)} clients, rtt {args.rtt_ms:g} ms per read, {read_workers()} workers")
+    print(f"{'scenario':<14} {'reads':>5} {'serial p50':>11} {'p95':>8} {'concurrent p50':>15} {'p95':>8} {'speedup':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<14} {r['reads']:>5} {r['serial']['p50_ms']:>11.1f} {r['serial']['p95_ms']:>8.1f} "
+            f"{r['concurrent']['p50_ms']:>15.1f} {r['concurrent']['p95_ms']:>8.1f} {r['speedup_p50']:>7}x"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {"clients": len(cids), "rtt_ms": args.rtt_ms, "workers": read_workers(), "scenarios": results},
+                f,
+                indent=2,
+            )
+        print(f"results: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Per-query duckdb.connect() vs the shared per-process handle.
+
+Builds a throwaway DuckDB file with a few hundred clients/jobs and a
+factor_lookup table, then replays the statements a Job Folder render issues
+(job + client join, CRP details, job plan, scope config, payment terms,
+datasets, Level 1 cascade) both ways.
+
+Usage:
+    python -m benchmarks.duckdb_connections [--renders 200] [--factors 20000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import duckdb
+
+JOB_FOLDER_MIX = [
+    (
+        """
+        SELECT j.job_id, j.job_number, j.title, j.job_type, j.reporting_year, j.status,
+               j.start_date, j.due_date, j.client_db_id, c.client_name
+        FROM jobs j
+        JOIN clients c ON c.db_id = j.client_db_id
+        WHERE j.job_id=%s
+        """,
+        "job",
+    ),
+    ("SELECT * FROM crp_job_details WHERE job_id=%s", "job"),
+    ("SELECT data_collection_due, first_draft_due, final_report_due, override_dates FROM job_plan WHERE job_id=%s", "job"),
+    ("SELECT scope, include_scope, dataset_id, factor_method FROM job_scope_config WHERE job_id=%s ORDER BY scope", "job"),
+    ("SELECT term_id, name FROM payment_terms_lookup WHERE is_active=TRUE ORDER BY term_id", None),
+    ("SELECT dataset_id, name, year, analysis_type, country FROM datasets ORDER BY year DESC, name", None),
+    ("SELECT DISTINCT level_1 AS l1 FROM factor_lookup WHERE dataset_id=%s AND scope=%s ORDER BY l1", "cascade"),
+]
+
+
+def _seed(path: str, n_clients: int, n_factors: int):
+    con = duckdb.connect(path)
+    con.execute(
+        """
+        CREATE TABLE clients (db_id INTEGER PRIMARY KEY, client_name VARCHAR, status VARCHAR);
+        CREATE TABLE jobs (job_id INTEGER PRIMARY KEY, client_db_id INTEGER, job_type VARCHAR, job_number VARCHAR,
+                           title VARCHAR, reporting_year INTEGER, status VARCHAR, start_date DATE, due_date DATE);
+        CREATE TABLE crp_job_details (job_id INTEGER PRIMARY KEY, reporting_year INTEGER, payment_term_id INTEGER);
+        CREATE TABLE job_plan (job_id INTEGER PRIMARY KEY, data_collection_due DATE, first_draft_due DATE,
+                               final_report_due DATE, override_dates BOOLEAN);
+        CREATE TABLE job_scope_config (job_id INTEGER, scope VARCHAR, include_scope BOOLEAN, dataset_id INTEGER,
+                                       factor_method VARCHAR, PRIMARY KEY (job_id, scope));
+        CREATE TABLE payment_terms_lookup (term_id INTEGER PRIMARY KEY, name VARCHAR, is_active BOOLEAN);
+        CREATE TABLE datasets (dataset_id INTEGER PRIMARY KEY, name VARCHAR, year INTEGER, analysis_type VARCHAR, country VARCHAR);
+        CREATE TABLE factor_lookup (db_id INTEGER PRIMARY KEY, dataset_id INTEGER, scope VARCHAR, level_1 VARCHAR);
+        """
+    )
+    con.execute(f"INSERT INTO clients SELECT i, 'Client ' || i, 'Active' FROM range(1, {n_clients + 1}) t(i)")
+    con.execute(
+        f"""
+        INSERT INTO jobs SELECT i, i, 'CRP', 'NZI-2026-' || lpad(i::VARCHAR, 4, '0'), 'Job ' || i, 2026, 'Open',
+                                DATE '2026-01-01', DATE '2026-06-30'
+        FROM range(1, {n_clients + 1}) t(i)
+        """
+    )
+    con.execute(f"INSERT INTO crp_job_details SELECT i, 2026, 1 FROM range(1, {n_clients + 1}) t(i)")
+    con.execute(f"INSERT INTO job_plan SELECT i, NULL, NULL, NULL, FALSE FROM range(1, {n_clients + 1}) t(i)")
+    con.execute(
+        f"""
+        INSERT INTO job_scope_config
+        SELECT i, s, TRUE, 1, 'Activity' FROM range(1, {n_clients + 1}) t(i), (VALUES ('Scope 1'), ('Scope 2'), ('Scope 3')) v(s)
+        """
+    )
+    con.execute("INSERT INTO payment_terms_lookup VALUES (1, '100% in advance', TRUE)")
+    con.execute("INSERT INTO datasets VALUES (1, 'DESNZ Activity UK', 2025, 'Activity', 'UK')")
+    con.execute(
+        f"""
+        INSERT INTO factor_lookup
+        SELECT i, 1, 'Scope ' || (1 + i % 3), 'Category ' || (i % 40) FROM range(1, {n_factors + 1}) t(i)
+        """
+    )
+    con.close()
+
+
+def _params(kind, job_id):
+    if kind == "job":
+        return [job_id]
+    if kind == "cascade":
+        return [1, "Scope 3"]
+    return None
+
+
+def _render(get_conn, job_id: int):
+    for sql, kind in JOB_FOLDER_MIX:
+        with get_conn() as con:
+            con.execute(sql, _params(kind, job_id)).fetchall()
+
+
+def _time_renders(get_conn, renders: int, n_jobs: int) -> list[float]:
+    out = []
+    for i in range(renders):
+        t0 = time.perf_counter()
+        _render(get_conn, 1 + (i % n_jobs))
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def _summary(label: str, ms: list[float]) -> str:
+    ms_sorted = sorted(ms)
+    p95 = ms_sorted[int(0.95 * (len(ms_sorted) - 1))]
+    return f"{label:<28} mean {statistics.mean(ms):8.2f} ms   p50 {statistics.median(ms):8.2f} ms   p95 {p95:8.2f} ms"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--renders", type=int, default=200)
+    ap.add_argument("--clients", type=int, default=500)
+    ap.add_argument("--factors", type=int, default=20000)
+    args = ap.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="nzi_bench_")
+    path = os.path.join(tmpdir, "bench.duckdb")
+    _seed(path, args.clients, args.factors)
+
+    # Point the app at the benchmark file before core.database reads config.
+    os.environ["NZI_DB_PATH"] = path
+    os.environ["DB_BACKEND"] = "duckdb"
+    from core.database import _percent_s_to_qmark, close_duckdb, get_conn
+
+    class _PerQuery:
+        # The pre-pooling behaviour: open the file for every statement.
+        def __init__(self):
+            self._con = duckdb.connect(path)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._con.close()
+
+        def execute(self, sql, params=None):
+            return self._con.execute(_percent_s_to_qmark(sql), params or [])
+
+    print(f"DuckDB file: {path}  ({args.clients} jobs, {args.factors} factors, {len(JOB_FOLDER_MIX)} statements/render)")
+    per_query = _time_renders(_PerQuery, args.renders, args.clients)
+    shared = _time_renders(get_conn, args.renders, args.clients)
+    close_duckdb()
+
+    print(_summary("per-query duckdb.connect()", per_query))
+    print(_summary("shared handle + cursors", shared))
+    print(f"speed-up (mean): {statistics.mean(per_query) / max(statistics.mean(shared), 1e-9):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""Synthetic NZI database at configurable scale.
+
+Fills an empty database (the app's schema, created with ensure_schema) with
+clients, sites, contacts, jobs with their 1:1 CRP details / plan / scope
+config rows, factor datasets across years with a DESNZ-shaped Level 1-4
+hierarchy, job_scope_rows that reference real factors, and time_logs. All
+data is deterministic for a given --seed and is written through the app's
+own get_conn().insert_df(), so it works on DuckDB and on Postgres
+(DB_BACKEND=postgres, DATABASE_URL=...).
+
+Usage:
+    python -m benchmarks.generate --db /tmp/nzi_bench.duckdb --scale medium
+    python -m benchmarks.generate --db /tmp/nzi_bench.duckdb --clients 5000 --factors 250000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.units import tco2e
+
+SCALES = {
+    # clients, sites/client, jobs/client, factors, datasets, scope rows/job, time logs/job
+    "small": dict(clients=200, sites=2, jobs=2, factors=20_000, datasets=4, scope_rows=15, time_logs=10),
+    "medium": dict(clients=2_000, sites=3, jobs=3, factors=120_000, datasets=8, scope_rows=25, time_logs=20),
+    "large": dict(clients=10_000, sites=3, jobs=4, factors=400_000, datasets=12, scope_rows=40, time_logs=30),
+}
+
+SCOPES = ("Scope 1", "Scope 2", "Scope 3")
+SCOPE_WEIGHTS = (0.12, 0.06, 0.82)
+
+# Level 1 -> Level 2 vocabulary per scope (shaped like the DESNZ conversion factor tables).
+LEVELS = {
+    "Scope 1": {
+        "Fuels": ["Gaseous fuels", "Liquid fuels", "Solid fuels"],
+        "Bioenergy": ["Biofuel", "Biomass", "Biogas"],
+        "Refrigerant & other": ["Kyoto protocol - standard", "Kyoto protocol - blends", "Montreal protocol"],
+        "Passenger vehicles": ["Cars (by size)", "Cars (by market segment)", "Motorbike"],
+        "Delivery vehicles": ["Vans", "HGV (all diesel)", "HGV refrigerated (all diesel)"],
+    },
+    "Scope 2": {
+        "UK electricity": ["Electricity generated", "Electricity: UK"],
+        "Heat and steam": ["Onsite heat and steam", "District heat and steam"],
+        "Electricity for EVs": ["Cars (by size)", "Vans"],
+    },
+    "Scope 3": {
+        "Transmission and distribution": ["T&D- UK electricity", "Distribution - district heat & steam"],
+        "Water supply": ["Water supply"],
+        "Water treatment": ["Water treatment"],
+        "Material use": ["Construction", "Organic", "Electrical items", "Metal", "Plastic", "Paper"],
+        "Waste disposal": ["Construction", "Refuse", "Electrical items", "Metal", "Plastic", "Paper"],
+        "Business travel- air": ["Flights", "Flights (with RF)"],
+        "Business travel- sea": ["Ferry"],
+        "Business travel- land": ["Cars (by size)", "Taxis", "Bus", "Rail"],
+        "Freighting goods": ["Vans", "HGV (all diesel)", "Freight flights", "Rail", "Sea tanker", "Cargo ship"],
+        "Hotel stay": ["Hotel stay"],
+        "Homeworking": ["Homeworking"],
+        "Purchased goods & services": ["SIC 01-09", "SIC 10-33", "SIC 35-39", "SIC 41-43", "SIC 45-47", "SIC 49-53",
+                                       "SIC 55-56", "SIC 58-63", "SIC 64-66", "SIC 68-82", "SIC 84-99"],
+    },
+}
+LEVEL_3 = ["Average", "Small", "Medium", "Large", "Diesel", "Petrol", "Hybrid", "Battery electric", "Natural gas",
+           "LPG", "Domestic", "Short-haul", "Long-haul", "International", "Economy class", "Business class",
+           "Landfill", "Combustion", "Closed-loop", "Open-loop", "Composting", "Primary material production",
+           "Re-used", "National rail", "Light rail and tram", "Underground", "Average laden", "50% laden"]
+LEVEL_4 = [None, None, None, "Unknown", "Gross CV", "Net CV", "kWh (Net CV)", "tonnes", "litres", "passenger.km",
+           "tonne.km", "per room per night", "per FTE working hour"]
+UOMS = ["kWh", "litres", "tonnes", "km", "miles", "passenger.km", "tonne.km", "GBP", "cubic metres", "room per night"]
+
+ORG_WORDS_A = ["Northern", "Green", "Atlas", "Harbour", "Summit", "Riverside", "Oak", "Meridian", "Crown", "Pennine",
+               "Coastal", "Union", "Beacon", "Granite", "Willow", "Thames", "Highland", "Orbit", "Silver", "Vale"]
+ORG_WORDS_B = ["Logistics", "Foods", "Engineering", "Estates", "Energy", "Retail", "Textiles", "Digital", "Packaging",
+               "Brewing", "Construction", "Healthcare", "Software", "Metals", "Transport", "Hotels", "Farms",
+               "Plastics", "Consulting", "Printing"]
+ORG_SUFFIX = ["Ltd", "Limited", "Group", "plc", "Holdings", "LLP", "& Co"]
+INDUSTRIES = ["Manufacturing", "Construction", "Logistics", "Retail", "Hospitality", "Professional services",
+              "Technology", "Food & drink", "Healthcare", "Education", "Energy", "Real estate"]
+CITIES = ["London", "Manchester", "Leeds", "Bristol", "Birmingham", "Glasgow", "Cardiff", "Newcastle", "Sheffield",
+          "Nottingham", "Edinburgh", "Belfast", "Southampton", "Norwich", "York"]
+STAFF = [("Alex Morgan", "Admin"), ("Sam Patel", "Consultant"), ("Jordan Lee", "Consultant"),
+         ("Casey Brown", "Consultant"), ("Riley Evans", "Consultant"), ("Taylor Hughes", "ReadOnly")]
+SUBJECTS = ["Research", "Data Collection", "Analysis", "Reporting"]
+JOB_TYPES = ["CRP", "Consultancy", "LCA", "Training"]
+
+
+def _pick(rng, values, n, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def _frame(**cols) -> pd.DataFrame:
+    return pd.DataFrame(cols)
+
+
+def _datasets(n: int) -> pd.DataFrame:
+    years = [2026 - (i // 2) for i in range(n)]
+    kinds = ["Activity" if i % 2 == 0 else "Spend" for i in range(n)]
+    return _frame(
+        dataset_id=np.arange(1, n + 1),
+        name=[f"{'DESNZ' if k == 'Activity' else 'DEFRA Spend'} {y} (synthetic {i + 1})" for i, (k, y) in enumerate(zip(kinds, years))],
+        source=["DESNZ" if k == "Activity" else "DEFRA" for k in kinds],
+        analysis_type=kinds,
+        country="UK",
+        region="UK",
+        currency="GBP",
+        year=years,
+        version="1.0",
+    )
+
+
+def _factors(rng, n: int, datasets: pd.DataFrame) -> pd.DataFrame:
+    ds_idx = rng.integers(0, len(datasets), size=n)
+    ds_id = datasets["dataset_id"].to_numpy()[ds_idx]
+    scope = _pick(rng, SCOPES, n, p=SCOPE_WEIGHTS)
+
+    l1 = np.empty(n, dtype=object)
+    l2 = np.empty(n, dtype=object)
+    for s in SCOPES:
+        mask = scope == s
+        k = int(mask.sum())
+        tops = list(LEVELS[s])
+        top = _pick(rng, tops, k)
+        sub = np.empty(k, dtype=object)
+        for t in tops:
+            tm = top == t
+            sub[tm] = _pick(rng, LEVELS[s][t], int(tm.sum()))
+        l1[mask] = top
+        l2[mask] = sub
+    l3 = _pick(rng, LEVEL_3, n)
+    l4 = _pick(rng, LEVEL_4, n)
+    uom = _pick(rng, UOMS, n)
+    variant = rng.integers(1, 40, size=n)
+    column_text = [f"{b}: {c} ({u}) v{v}" for b, c, u, v in zip(l2, l3, uom, variant)]
+    years = datasets["year"].to_numpy()[ds_idx]
+    return _frame(
+        db_id=np.arange(1, n + 1),
+        dataset_id=ds_id,
+        file_name="synthetic.csv",
+        year=years,
+        original_id=[f"F{d:03d}_{i:07d}" for d, i in zip(ds_id, range(1, n + 1))],
+        scope=scope,
+        level_1=l1,
+        level_2=l2,
+        level_3=l3,
+        level_4=l4,
+        column_text=column_text,
+        uom=uom,
+        ghg_unit=_pick(rng, ["kgCO2e", "kgCO2e", "kgCO2e", "tCO2e"], n),
+        factor=np.round(rng.lognormal(mean=-1.5, sigma=1.4, size=n), 6),
+        source=datasets["source"].to_numpy()[ds_idx],
+        region="UK",
+        currency="GBP",
+    )
+
+
+def _clients(rng, n: int) -> pd.DataFrame:
+    a, b, s = _pick(rng, ORG_WORDS_A, n), _pick(rng, ORG_WORDS_B, n), _pick(rng, ORG_SUFFIX, n)
+    return _frame(
+        db_id=np.arange(1, n + 1),
+        client_name=[f"{x} {y} {z} {i}" for i, (x, y, z) in enumerate(zip(a, b, s), start=1)],
+        industry=_pick(rng, INDUSTRIES, n),
+        addr_city=_pick(rng, CITIES, n),
+        addr_country="United Kingdom",
+        crm_owner=_pick(rng, [name for name, _ in STAFF], n),
+        portfolio=_pick(rng, ["NZI", "NZI", "NZI", "Partner"], n),
+        status=_pick(rng, ["Active", "Archived"], n, p=(0.9, 0.1)),
+        net_zero_year=2050,
+        interim_year=2035,
+        interim_s1_pct=50,
+        interim_s2_pct=50,
+        interim_s3_pct=42,
+        benchmark_year=_pick(rng, [2022, 2023, 2024], n),
+    )
+
+
+def _load(con, table: str, df: pd.DataFrame, batch: int = 100_000) -> int:
+    for start in range(0, len(df), batch):
+        con.insert_df(table, df.iloc[start:start + batch])
+    return len(df)
+
+
+def generate(
+    *,
+    clients: int,
+    sites: int,
+    jobs: int,
+    factors: int,
+    datasets: int,
+    scope_rows: int,
+    time_logs: int,
+    seed: int = 42,
+    log=print,
+) -> dict:
+    """Populate the configured (empty) database; returns row counts per table."""
+    from core.database import db_backend, get_conn
+    from core.migrations import ensure_schema
+    from services.emissions import rebuild_summary
+    from services.factor_search import refresh_search_doc
+
+    ensure_schema(include_migrations=db_backend() == "postgres")
+    with get_conn() as con:
+        if int(con.execute("SELECT COUNT(*) FROM clients").fetchone()[0]):
+            raise RuntimeError("Target database already has clients; generate into a fresh database.")
+
+    rng = np.random.default_rng(seed)
+    counts: dict[str, int] = {}
+    t0 = time.perf_counter()
+
+    ds = _datasets(datasets)
+    fl = _factors(rng, factors, ds)
+    cl = _clients(rng, clients)
+    n_cl = len(cl)
+
+    site_client = np.repeat(cl["db_id"].to_numpy(), sites)
+    site_no = np.tile(np.arange(1, sites + 1), n_cl)
+    sites_df = _frame(
+        site_id=np.arange(1, len(site_client) + 1),
+        client_db_id=site_client,
+        site_name=[f"Site {k}" for k in site_no],
+        location=_pick(rng, CITIES, len(site_client)),
+        is_registered_office=site_no == 1,
+    )
+    contacts_df = _frame(
+        contact_id=cl["db_id"].to_numpy(),
+        client_db_id=cl["db_id"].to_numpy(),
+        full_name=_pick(rng, ["Chris Taylor", "Pat Jones", "Morgan Smith", "Jamie Wilson", "Robin Clarke"], n_cl),
+        job_title=_pick(rng, ["Sustainability Manager", "Finance Director", "Operations Manager"], n_cl),
+        email=[f"contact{i}@client{i}.example" for i in cl["db_id"]],
+    )
+
+    n_jobs = n_cl * jobs
+    job_client = np.repeat(cl["db_id"].to_numpy(), jobs)
+    job_ids = np.arange(1, n_jobs + 1)
+    job_year = _pick(rng, [2023, 2024, 2025, 2026], n_jobs)
+    start = pd.to_datetime(job_year.astype(str)) + pd.to_timedelta(rng.integers(0, 200, n_jobs), unit="D")
+    jobs_df = _frame(
+        job_id=job_ids,
+        client_db_id=job_client,
+        job_type=_pick(rng, JOB_TYPES, n_jobs, p=(0.7, 0.15, 0.1, 0.05)),
+        job_number=[f"NZI-{y}-{j:06d}" for y, j in zip(job_year, job_ids)],
+        title=[f"Carbon Reduction Plan {y}" for y in job_year],
+        reporting_year=job_year.astype(int),
+        status=_pick(rng, ["Open", "In Progress", "Closed"], n_jobs, p=(0.3, 0.3, 0.4)),
+        start_date=start.date,
+        due_date=(start + pd.Timedelta(days=90)).date,
+    )
+    details_df = _frame(job_id=job_ids, reporting_year=job_year.astype(int), payment_term_id=1)
+    plan_df = _frame(job_id=job_ids, override_dates=False)
+
+    activity_ds = ds.loc[ds["analysis_type"] == "Activity", "dataset_id"].to_numpy()
+    job_ds = activity_ds[rng.integers(0, len(activity_ds), n_jobs)]
+    config_df = _frame(
+        job_id=np.repeat(job_ids, 3),
+        scope=np.tile(np.asarray(SCOPES, dtype=object), n_jobs),
+        include_scope=True,
+        dataset_id=np.repeat(job_ds, 3),
+        factor_method="Activity",
+    )
+
+    # Scope rows: each job picks factors from its own dataset, by scope weight.
+    row_parts = []
+    per_scope = np.maximum(1, np.round(np.asarray(SCOPE_WEIGHTS) * scope_rows).astype(int))
+    for d in np.unique(job_ds):
+        jobs_d = job_ids[job_ds == d]
+        for s, k in zip(SCOPES, per_scope):
+            pool = fl.index[(fl["dataset_id"] == d) & (fl["scope"] == s)].to_numpy()
+            if len(pool) == 0 or len(jobs_d) == 0:
+                continue
+            pick = pool[rng.integers(0, len(pool), len(jobs_d) * k)]
+            part = fl.loc[pick, ["dataset_id", "db_id", "original_id", "level_1", "level_2", "level_3",
+                                 "level_4", "column_text", "uom", "factor", "ghg_unit"]].reset_index(drop=True)
+            part.insert(0, "job_id", np.repeat(jobs_d, k))
+            part.insert(1, "scope", s)
+            row_parts.append(part)
+    rows_df = pd.concat(row_parts, ignore_index=True) if row_parts else pd.DataFrame()
+    if not rows_df.empty:
+        rows_df = rows_df.rename(columns={"db_id": "factor_db_id"})
+        rows_df.insert(0, "row_id", np.arange(1, len(rows_df) + 1))
+        rows_df["qty"] = np.round(rng.lognormal(mean=6, sigma=1.5, size=len(rows_df)), 2)
+        rows_df["calc_tco2e"] = tco2e(rows_df["qty"], rows_df["factor"], rows_df["ghg_unit"])
+        override = rng.random(len(rows_df)) < 0.05
+        rows_df["override_tco2e"] = np.where(override, rows_df["calc_tco2e"] * 1.1, np.nan)
+        rows_df["override_reason"] = np.where(override, "Supplier-specific data", None)
+        rows_df["enabled"] = rng.random(len(rows_df)) >= 0.03
+        rows_df["report_label"] = rows_df["column_text"]
+
+    n_logs = n_jobs * time_logs
+    logs_df = _frame(
+        time_id=np.arange(1, n_logs + 1),
+        job_id=np.repeat(job_ids, time_logs),
+        user_id=_pick(rng, [f"{name.split()[0].lower()}@nzi.example" for name, _ in STAFF], n_logs),
+        subject=_pick(rng, SUBJECTS, n_logs),
+        work_date=(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 900, n_logs), unit="D")).date,
+        minutes=rng.integers(1, 17, n_logs) * 15,
+        notes=None,
+    )
+    users_df = _frame(
+        user_id=[f"{name.split()[0].lower()}@nzi.example" for name, _ in STAFF],
+        full_name=[name for name, _ in STAFF],
+        role=[role for _, role in STAFF],
+        email=[f"{name.split()[0].lower()}@nzi.example" for name, _ in STAFF],
+        status="Active",
+    )
+    log(f"built frames in {time.perf_counter() - t0:.1f}s; loading ...")
+
+    with get_conn() as con:
+        con.execute("DELETE FROM job_types")
+        con.execute("DELETE FROM time_subjects")
+        counts["job_types"] = _load(con, "job_types", _frame(job_type_id=np.arange(1, 5), name=JOB_TYPES, is_active=True))
+        counts["time_subjects"] = _load(con, "time_subjects", _frame(subject_id=np.arange(1, 5), name=SUBJECTS, is_active=True))
+        counts["users"] = _load(con, "users", users_df.loc[
+            ~users_df["email"].isin(con.execute("SELECT email FROM users").df().get("email", pd.Series(dtype=object)))
+        ])
+        counts["datasets"] = _load(con, "datasets", ds)
+        counts["factor_lookup"] = _load(con, "factor_lookup", fl)
+        counts["clients"] = _load(con, "clients", cl)
+        counts["client_sites"] = _load(con, "client_sites", sites_df)
+        counts["client_contacts"] = _load(con, "client_contacts", contacts_df)
+        counts["jobs"] = _load(con, "jobs", jobs_df)
+        counts["crp_job_details"] = _load(con, "crp_job_details", details_df)
+        counts["job_plan"] = _load(con, "job_plan", plan_df)
+        counts["job_scope_config"] = _load(con, "job_scope_config", config_df)
+        counts["job_scope_rows"] = _load(con, "job_scope_rows", rows_df)
+        counts["time_logs"] = _load(con, "time_logs", logs_df)
+
+        for d in ds["dataset_id"]:
+            refresh_search_doc(con, int(d))
+        _advance_sequences(con, db_backend())
+    # Bulk loads bypass the write paths that keep the summary current on DuckDB.
+    counts["job_emissions_summary"] = rebuild_summary()
+
+    log(f"loaded in {time.perf_counter() - t0:.1f}s")
+    return counts
+
+
+def _advance_sequences(con, backend: str) -> None:
+    """Move id sequences past the explicit ids we inserted, so the app can keep adding rows."""
+    if backend == "postgres":
+        for table, col in (("clients", "db_id"), ("client_sites", "site_id"), ("client_contacts", "contact_id"),
+                           ("jobs", "job_id"), ("datasets", "dataset_id"), ("factor_lookup", "db_id"),
+                           ("job_scope_rows", "row_id"), ("time_logs", "time_id")):
+            con.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{col}'), (SELECT MAX({col}) FROM {table}))"
+            )
+        return
+    # DuckDB sequences cannot be altered; draw them up to MAX(id) instead.
+    for seq, table, col in (("job_scope_rows_seq", "job_scope_rows", "row_id"),):
+        top = int(con.execute(f"SELECT COALESCE(MAX({col}), 0) FROM {table}").fetchone()[0])
+        if top:
+            con.execute(f"SELECT MAX(nextval('{seq}')) FROM range({top})")
+
+
+def scale_args(args) -> dict:
+    out = dict(SCALES[args.scale])
+    for k in out:
+        v = getattr(args, k, None)
+        if v is not None:
+            out[k] = v
+    return out
+
+
+def add_scale_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    ap.add_argument("--clients", type=int)
+    ap.add_argument("--sites", type=int, help="sites per client")
+    ap.add_argument("--jobs", type=int, help="jobs per client")
+    ap.add_argument("--factors", type=int, help="factor_lookup rows (all datasets)")
+    ap.add_argument("--datasets", type=int)
+    ap.add_argument("--scope-rows", dest="scope_rows", type=int, help="job_scope_rows per job")
+    ap.add_argument("--time-logs", dest="time_logs", type=int, help="time_logs per job")
+    ap.add_argument("--seed", type=int, default=42)
+
+
+def use_database(db: str | None) -> None:
+    """Point the app at `db` (a DuckDB file) before core.database/config are imported."""
+    if db:
+        os.environ["NZI_DB_PATH"] = os.path.abspath(db)
+        os.environ.setdefault("DB_BACKEND", "duckdb")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="DuckDB file to create (ignored with DB_BACKEND=postgres)")
+    add_scale_arguments(ap)
+    args = ap.parse_args(argv)
+
+    if os.getenv("DB_BACKEND", "duckdb").lower() != "postgres":
+        if not args.db:
+            ap.error("--db is required for DuckDB")
+        if os.path.exists(args.db):
+            ap.error(f"{args.db} already exists; pick a new path")
+    use_database(args.db)
+
+    counts = generate(**scale_args(args), seed=args.seed)
+    for table, n in counts.items():
+        print(f"{table:<20} {n:>10,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Time the app's hot functions against a generated database and record JSON.
+
+Each case runs once to warm up, then --repeat times; the result file holds
+min / p50 / p95 / mean milliseconds and the number of queries one call
+issues (counted with core.profiling). Pass --compare with an earlier result
+file to print the p50 change per case; with --fail-on-regression the exit
+code is 1 when any case got slower than --threshold.
+
+Cases map to the functions the pages call:
+  search_factors.*   nzi_pages.scope_common._search_factors (Add Row search)
+  factor_tree.*      services.factor_hierarchy (Level 1-4 cascade; replaced _factor_rows_for_levels)
+  job_scope_rows_df  nzi_pages.scope_common._job_scope_rows_df
+  ingest_factors.*   services.factor_import.ingest_factor_csv (replaced admin _ingest_factors)
+  list_clients.*     models.clients.list_clients
+  build_forecast_df  utils.forecasting.build_forecast_df
+  recalc.dry_run     services.recalc.recalc_scope_rows (one dataset, no writes)
+
+Usage:
+    python -m benchmarks.suite --db /tmp/nzi_bench.duckdb --generate --scale medium
+    python -m benchmarks.suite --db /tmp/nzi_bench.duckdb --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from benchmarks.generate import add_scale_arguments, scale_args, use_database
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class Case:
+    def __init__(self, name: str, fn, *, repeat: int | None = None, after=None):
+        self.name = name
+        self.fn = fn          # fn(i) -> anything; i is the iteration number
+        self.repeat = repeat  # overrides --repeat for slow cases
+        self.after = after    # untimed cleanup after each call
+
+
+def _ms_stats(ms: list[float]) -> dict:
+    s = sorted(ms)
+    return {
+        "n": len(s),
+        "min_ms": round(s[0], 3),
+        "p50_ms": round(statistics.median(s), 3),
+        "p95_ms": round(s[max(0, math.ceil(0.95 * len(s)) - 1)], 3),
+        "mean_ms": round(statistics.mean(s), 3),
+    }
+
+
+def _count_queries(fn) -> int:
+    from core import profiling
+
+    old = os.environ.get("QUERY_PROFILE")
+    os.environ["QUERY_PROFILE"] = "1"
+    try:
+        prof = profiling.begin_rerun("benchmark")
+        fn()
+        return len(prof.records) if prof else 0
+    finally:
+        if old is None:
+            os.environ.pop("QUERY_PROFILE", None)
+        else:
+            os.environ["QUERY_PROFILE"] = old
+        profiling.begin_rerun()
+
+
+def run_case(case: Case, repeat: int) -> dict:
+    n = case.repeat or repeat
+    case.fn(0)
+    if case.after:
+        case.after()
+    ms = []
+    for i in range(1, n + 1):
+        t0 = time.perf_counter()
+        case.fn(i)
+        ms.append((time.perf_counter() - t0) * 1000.0)
+        if case.after:
+            case.after()
+    out = _ms_stats(ms)
+    out["queries"] = _count_queries(lambda: case.fn(n + 1))
+    if case.after:
+        case.after()
+    return out
+
+
+def _factor_csv(rows: int, seed: int = 7) -> bytes:
+    import numpy as np
+    import pandas as pd
+
+    from benchmarks.generate import LEVEL_3, LEVELS, UOMS
+
+    rng = np.random.default_rng(seed)
+    l1 = list(LEVELS["Scope 3"])
+    top = np.asarray(l1, dtype=object)[rng.integers(0, len(l1), rows)]
+    df = pd.DataFrame(
+        {
+            "Year": 2026,
+            "ID": [f"BENCH_{i:07d}" for i in range(rows)],
+            "Scope": "Scope 3",
+            "Level 1": top,
+            "Level 2": [LEVELS["Scope 3"][t][i % len(LEVELS["Scope 3"][t])] for i, t in enumerate(top)],
+            "Level 3": np.asarray(LEVEL_3, dtype=object)[rng.integers(0, len(LEVEL_3), rows)],
+            "Level 4": None,
+            "Column Text": [f"Benchmark factor {i}" for i in range(rows)],
+            "UOM": np.asarray(UOMS, dtype=object)[rng.integers(0, len(UOMS), rows)],
+            "GHG Unit": "kg CO2e",
+            "Factor": np.round(rng.random(rows) * 5, 6),
+        }
+    )
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue().encode("utf-8")
+
+
+def build_cases(ingest_rows: int) -> tuple[list[Case], Callable[[], None]]:
+    """Benchmark cases plus a cleanup callable (drops the scratch ingest dataset)."""
+    from core.database import get_conn
+    from models.clients import list_clients
+    from nzi_pages.scope_common import _job_scope_rows_df, _search_factors
+    from services.factor_hierarchy import get_factor_hierarchy, invalidate_dataset
+    from services.factor_import import ingest_factor_csv
+    from services.recalc import recalc_scope_rows
+    from utils.forecasting import build_forecast_df
+
+    with get_conn() as con:
+        ds, year = con.execute(
+            "SELECT dataset_id, year FROM datasets WHERE analysis_type='Activity' ORDER BY year DESC, dataset_id LIMIT 1"
+        ).fetchone()
+        n_jobs = int(con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0])
+        scratch_ds = int(con.execute("SELECT COALESCE(MAX(dataset_id), 0) + 1000 FROM datasets").fetchone()[0])
+    ds, year = int(ds), int(year)
+
+    tree = get_factor_hierarchy(ds, "Scope 3")
+    l1s = tree.options() or [None]
+    queries = ["electricity", "hgv diesel", "flights long-haul", "waste landfill", "hotel", "paper", "sic 10-33"]
+
+    def tree_lines(i):
+        t = get_factor_hierarchy(ds, "Scope 3")
+        l1 = l1s[i % len(l1s)]
+        l2s = t.options(l1) or [None]
+        return t.lines(l1, l2s[i % len(l2s)])
+
+    def tree_cold(i):
+        invalidate_dataset(ds)
+        return get_factor_hierarchy(ds, "Scope 3")
+
+    csv_bytes = _factor_csv(ingest_rows)
+    scratch_meta = {"year": 2026, "source": "bench", "region": "UK", "currency": "GBP"}
+    seeded = {"upsert": False}
+
+    def drop_scratch():
+        with get_conn() as con:
+            con.execute("DELETE FROM factor_lookup WHERE dataset_id=%s", [scratch_ds])
+            con.execute("DELETE FROM factor_import_runs WHERE dataset_id=%s", [scratch_ds])
+
+    def ingest(mode):
+        def fn(i):
+            res = ingest_factor_csv(csv_bytes, "bench.csv", scratch_ds, scratch_meta, mode=mode)
+            if res.error:
+                raise RuntimeError(res.error)
+            return res
+
+        return fn
+
+    def ingest_unchanged(i):
+        # Second upsert of the same file: every row matches and is left alone.
+        if not seeded["upsert"]:
+            ingest("upsert")(i)
+            seeded["upsert"] = True
+        return ingest("upsert")(i)
+
+    baseline = {"Scope 1": 120.0, "Scope 2": 45.5, "Scope 3": 980.25}
+    return [
+        Case("search_factors.phrase", lambda i: _search_factors(ds, "Scope 3", queries[i % len(queries)], year)),
+        Case("search_factors.all_years", lambda i: _search_factors(ds, "Scope 3", queries[i % len(queries)], year, all_years=True)),
+        Case("factor_tree.cold", tree_cold, repeat=5),
+        Case("factor_tree.lines", tree_lines),
+        Case("job_scope_rows_df", lambda i: _job_scope_rows_df(1 + (i * 7919) % max(1, n_jobs), "Scope 3")),
+        Case("ingest_factors.append", ingest("append"), repeat=3, after=drop_scratch),
+        Case("ingest_factors.upsert_unchanged", ingest_unchanged, repeat=3),
+        Case("list_clients.first_page", lambda i: list_clients("", page=0, page_size=50)),
+        Case("list_clients.search", lambda i: list_clients(["green", "logistics", "oak", "ltd 1"][i % 4], page=0, page_size=50)),
+        Case("list_clients.deep_page", lambda i: list_clients("", page=20, page_size=50, sort="name")),
+        Case("build_forecast_df", lambda i: build_forecast_df(2023, 2050, 2035, 50, 50, 42, baseline)),
+        Case("recalc.dry_run", lambda i: recalc_scope_rows(ds), repeat=5),
+    ], drop_scratch
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(RESULTS_DIR), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _table_counts() -> dict:
+    from core.database import get_conn
+
+    out = {}
+    with get_conn() as con:
+        for t in ("clients", "jobs", "factor_lookup", "job_scope_rows", "time_logs"):
+            out[t] = int(con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0])
+    return out
+
+
+def compare(current: dict, previous: dict, threshold: float) -> list[str]:
+    """Print p50 deltas against an earlier run; return the names of regressed cases."""
+    regressed = []
+    print(f"\n{'case':<34} {'prev p50':>10} {'p50':>10} {'change':>8}")
+    for name, cur in current["cases"].items():
+        prev = previous.get("cases", {}).get(name)
+        if not prev or "p50_ms" not in prev or "p50_ms" not in cur:
+            print(f"{name:<34} {'-':>10} {cur.get('p50_ms', '-'):>10}")
+            continue
+        change = (cur["p50_ms"] - prev["p50_ms"]) / max(prev["p50_ms"], 1e-9)
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<34} {prev['p50_ms']:>10.2f} {cur['p50_ms']:>10.2f} {change:>+7.0%}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="DuckDB file to benchmark (ignored with DB_BACKEND=postgres)")
+    ap.add_argument("--generate", action="store_true", help="generate the database first (must not exist)")
+    add_scale_arguments(ap)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--ingest-rows", type=int, default=20000)
+    ap.add_argument("--only", help="comma-separated case name prefixes")
+    ap.add_argument("--out", help=f"result file (default {RESULTS_DIR}/<timestamp>.json)")
+    ap.add_argument("--compare", help="earlier result file to compare against")
+    ap.add_argument("--threshold", type=float, default=0.20, help="p50 slowdown counted as a regression")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args(argv)
+
+    postgres = os.getenv("DB_BACKEND", "duckdb").lower() == "postgres"
+    if not postgres and not args.db:
+        ap.error("--db is required for DuckDB")
+    use_database(args.db)
+
+    from core.database import db_backend
+    from core.migrations import ensure_schema
+
+    scale = None
+    if args.generate:
+        from benchmarks.generate import generate
+
+        if not postgres and os.path.exists(args.db):
+            ap.error(f"{args.db} already exists; drop --generate or pick a new path")
+        scale = scale_args(args)
+        generate(**scale, seed=args.seed)
+    ensure_schema(include_migrations=postgres)
+
+    cases, cleanup = build_cases(args.ingest_rows)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+        cases = [c for c in cases if c.name.startswith(prefixes)]
+
+    result = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "backend": db_backend(),
+        "db": os.environ.get("NZI_DB_PATH") if not postgres else "postgres",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "generated_with": scale,
+        "rows": _table_counts(),
+        "cases": {},
+    }
+    print(f"{'case':<34} {'p50 ms':>9} {'p95 ms':>9} {'min ms':>9} {'queries':>8}")
+    try:
+        for case in cases:
+            try:
+                stats = run_case(case, args.repeat)
+            except Exception as e:
+                stats = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{case.name:<34} ERROR {stats['error']}")
+            else:
+                print(f"{case.name:<34} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['min_ms']:>9.2f} {stats['queries']:>8}")
+            result["cases"][case.name] = stats
+    finally:
+        cleanup()
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nresults: {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressed = compare(result, json.load(f), args.threshold)
+        if regressed and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
 
+import os
+
 import streamlit as st
 import pandas as pd
+from core.cache import TTLCache
 from core.constants import DISPLAY_NAMES
+from core.database import get_conn
 
 def prettify(df: pd.DataFrame) -> pd.DataFrame:
     return df.rename(columns={k:v for k,v in DISPLAY_NAMES.items() if k in df.columns})
@@ -45,3 +49,125 @@ def table_with_pager(df: pd.DataFrame, title: str, key: str):
     start, end = _pager(len(df), key, "top")
     st.dataframe(prettify(df.iloc[start:end].copy()), use_container_width=True)
     _pager(len(df), key, "bottom")
+
+
+# -------------------------
+# Query-backed pager: only the visible page is fetched
+# -------------------------
+_PAGE_SIZES = [50, 100, 150, 200]
+_COUNTS = TTLCache(maxsize=256, ttl=float(os.getenv("PAGER_COUNT_TTL_SECONDS", "30")))
+
+
+def invalidate_pager(key: str) -> None:
+    """Forget cached row counts for a pager (call after inserting/deleting its rows)."""
+    _COUNTS.invalidate_where(lambda k: k[0] == key)
+
+
+def _set_page_size(key: str, where: str):
+    ps_key, pg_key = _init_pager_state(key)
+    size = st.session_state[f"{key}_psel_{where}"]
+    st.session_state[ps_key] = size
+    st.session_state[pg_key] = 0
+    for w in ("top", "bottom"):
+        st.session_state[f"{key}_psel_{w}"] = size
+
+
+def _step_page(key: str, delta: int, total_pages: int):
+    _, pg_key = _init_pager_state(key)
+    st.session_state[pg_key] = min(max(0, st.session_state[pg_key] + delta), total_pages - 1)
+
+
+def _query_pager(total: int, key: str, where: str, shown: int):
+    ps_key, pg_key = _init_pager_state(key)
+    psize = st.session_state[ps_key]
+    page = st.session_state[pg_key]
+    total_pages = max(1, (total + psize - 1)//psize)
+
+    cols = st.columns([6,3,3])
+    with cols[0]: st.caption(f"{total:,} rows total")
+    with cols[1]:
+        st.session_state.setdefault(f"{key}_psel_{where}", psize)
+        st.selectbox("Rows", _PAGE_SIZES, key=f"{key}_psel_{where}", on_change=_set_page_size, args=(key, where))
+    with cols[2]:
+        c1, c2, c3 = st.columns([1,2,1])
+        c1.button("◀", key=f"{key}_prev_{where}", on_click=_step_page, args=(key, -1, total_pages), disabled=page <= 0)
+        c2.markdown(f"<div style='text-align:center'>Page {page+1} of {total_pages}</div>", unsafe_allow_html=True)
+        c3.button("▶", key=f"{key}_next_{where}", on_click=_step_page, args=(key, 1, total_pages), disabled=page >= total_pages-1)
+    start = page*psize
+    st.caption(f"Showing {start+1:,}–{start+shown:,}")
+
+
+def paged_table(title: str, key: str, fetch_page, transform=None) -> pd.DataFrame:
+    """Render a table whose rows are fetched one page at a time.
+
+    fetch_page(offset, limit) -> (page_df, total_rows). Page buttons update
+    session state in callbacks, so each rerun issues exactly one page fetch.
+    Returns the visible page (before transform).
+    """
+    st.markdown(f"#### {title}")
+    ps_key, pg_key = _init_pager_state(key)
+    psize = st.session_state[ps_key]
+    page = st.session_state[pg_key]
+
+    df, total = fetch_page(page*psize, psize)
+    if (df is None or df.empty) and page > 0 and total > 0:
+        # Filters shrank the result set: jump to its last page.
+        page = (total - 1)//psize
+        st.session_state[pg_key] = page
+        df, total = fetch_page(page*psize, psize)
+    if df is None or df.empty:
+        st.info("No rows.")
+        return pd.DataFrame() if df is None else df
+
+    _query_pager(total, key, "top", len(df))
+    shown = transform(df.copy()) if transform else df.copy()
+    st.dataframe(prettify(shown), use_container_width=True)
+    _query_pager(total, key, "bottom", len(df))
+    return df
+
+
+def query_table_with_pager(
+    sql: str,
+    params,
+    title: str,
+    key: str,
+    order_by: dict[str, str] | None = None,
+    transform=None,
+) -> pd.DataFrame:
+    """Server-side paged table over a SELECT (no ORDER BY / LIMIT in `sql`).
+
+    `order_by` maps sort labels to ORDER BY clauses over the query's output
+    columns (the first is the default). Only the visible page is fetched with
+    LIMIT/OFFSET; the COUNT is cached per (key, sql, params) for a short TTL.
+    """
+    params = list(params or [])
+    order_by = order_by or {}
+    order_sql = ""
+    if order_by:
+        labels = list(order_by)
+        label = labels[0]
+        if len(labels) > 1:
+            label = st.selectbox(
+                "Sort by",
+                labels,
+                key=f"{key}_sort",
+                on_change=lambda: st.session_state.__setitem__(f"{key}_page", 0),
+            )
+        order_sql = f"ORDER BY {order_by[label]}"
+
+    def _count() -> int:
+        with get_conn() as con:
+            return int(con.execute(f"SELECT COUNT(*) FROM ({sql}) AS _src", params).fetchone()[0])
+
+    def _fetch(offset: int, limit: int):
+        # Count first, on its own connection: get_or_load may queue on a shared
+        # load lock, and a session waiting there must not hold a pooled connection.
+        total = _COUNTS.get_or_load((key, sql, tuple(params)), _count)
+        with get_conn() as con:
+            df = con.execute(
+                f"SELECT * FROM ({sql}) AS _src {order_sql} LIMIT %s OFFSET %s",
+                params + [int(limit), int(offset)],
+            ).df()
+        return df, total
+
+    return paged_table(title, key, _fetch, transform=transform)
@@ -1,9 +1,22 @@
 import os
+import threading
+import time
+
 import streamlit as st
 from core.database import get_conn
 
 ROLE_ORDER = {"ReadOnly": 1, "Consultant": 2, "Admin": 3}
 
+# Resolved identity is cached in session state for AUTH_CACHE_TTL_SECONDS.
+# Admin changes to users bump the revocation revision (schema_meta
+# 'auth_revision'); each process polls it at most every
+# AUTH_REVISION_POLL_SECONDS, so revocations apply everywhere within seconds
+# while a normal rerun costs no auth queries.
+_SESSION_KEY = "_auth_user_cache"
+_REVISION_KEY = "auth_revision"
+_REVISION = {"value": 0, "checked": 0.0}
+_REVISION_LOCK = threading.Lock()
+
 
 def _norm_email(x: str | None) -> str | None:
     if not x:
@@ -67,7 +80,99 @@ def current_email() -> str | None:
     return None
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _read_revision() -> int | None:
+    try:
+        with get_conn() as con:
+            r = con.execute("SELECT meta_value FROM schema_meta WHERE meta_key=%s", [_REVISION_KEY]).fetchone()
+    except Exception:
+        return None
+    try:
+        return int(r[0]) if r and r[0] is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def auth_revision() -> int:
+    """Current revocation revision (polled from the DB at most every few seconds per process)."""
+    now = time.monotonic()
+    if now - _REVISION["checked"] < _env_float("AUTH_REVISION_POLL_SECONDS", 5.0):
+        return _REVISION["value"]
+    with _REVISION_LOCK:
+        if now - _REVISION["checked"] >= _env_float("AUTH_REVISION_POLL_SECONDS", 5.0):
+            stored = _read_revision()
+            if stored is not None:
+                _REVISION["value"] = max(_REVISION["value"], stored)
+            _REVISION["checked"] = now
+        return _REVISION["value"]
+
+
+def revoke_cached_identities() -> int:
+    """Invalidate every session's cached user (call after changing users/roles).
+
+    This process applies the new revision at once. Raises if it cannot be
+    stored in schema_meta, since other processes would then keep serving
+    cached identities until AUTH_CACHE_TTL_SECONDS runs out.
+    """
+    with _REVISION_LOCK:
+        _REVISION["value"] += 1
+        _REVISION["checked"] = time.monotonic()
+        value = _REVISION["value"]
+    st.session_state.pop(_SESSION_KEY, None)
+
+    # Outside the lock: auth_revision() polls must not wait on this round trip.
+    with get_conn() as con:
+        stored = con.execute("SELECT meta_value FROM schema_meta WHERE meta_key=%s", [_REVISION_KEY]).fetchone()
+        try:
+            value = max(value, int(stored[0]) + 1) if stored else value
+        except (TypeError, ValueError):
+            pass
+        con.execute(
+            """
+            INSERT INTO schema_meta (meta_key, meta_value, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (meta_key) DO UPDATE SET
+                meta_value = EXCLUDED.meta_value,
+                updated_at = EXCLUDED.updated_at
+            """,
+            [_REVISION_KEY, str(value)],
+        )
+    with _REVISION_LOCK:
+        _REVISION["value"] = max(_REVISION["value"], value)
+    return value
+
+
 def get_current_user() -> dict:
+    """Resolved identity for this session (cached in session state, see module notes)."""
+    basic = st.session_state.get("basic_auth_ok") is True
+    rev = auth_revision()
+    cached = st.session_state.get(_SESSION_KEY)
+    if (
+        cached
+        and cached["basic"] == basic
+        and cached["rev"] == rev
+        and cached["expires"] > time.monotonic()
+    ):
+        return dict(cached["user"])
+
+    user = _resolve_user()
+    if user["status"] != "MissingIdentity":
+        st.session_state[_SESSION_KEY] = {
+            "user": dict(user),
+            "basic": basic,
+            "rev": rev,
+            "expires": time.monotonic() + _env_float("AUTH_CACHE_TTL_SECONDS", 60.0),
+        }
+    return user
+
+
+def _resolve_user() -> dict:
     email = current_email()
 
     # STRICT: no email means no access
@@ -83,7 +188,7 @@ def get_current_user() -> dict:
             """
             SELECT email, full_name, role, status
             FROM users
-            WHERE lower(email) = lower(%s)
+            WHERE email = %s
             LIMIT 1
             """,
             [email],
@@ -106,6 +211,11 @@ def get_current_user() -> dict:
     }
 
 
+def current_user_email() -> str | None:
+    """Email of the signed-in user (from the cached identity)."""
+    return get_current_user().get("email")
+
+
 def require_role(min_role: str = "ReadOnly"):
     user = get_current_user()
 
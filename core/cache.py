@@ -0,0 +1,113 @@
+"""Small process-wide cache with LRU eviction and a TTL.
+
+Streamlit reruns the whole script on every interaction, so anything that is
+expensive to rebuild and cheap to keep (factor trees, lookups) lives in a
+module-level TTLCache. Entries expire after `ttl` seconds, the least recently
+used entry is evicted once `maxsize` is reached, and writers call
+invalidate()/invalidate_where() after changing the underlying data.
+
+get_or_load() builds a missing value once under concurrent reruns. Loads are
+serialised on one of a fixed set of striped locks, and a load that an
+invalidation overtook returns its value without storing it, so a writer's
+invalidate() is never undone by a reader that queried just before the write.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+_LOAD_STRIPES = 64
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 128, ttl: float = 3600.0):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = tuple(threading.Lock() for _ in range(_LOAD_STRIPES))
+        # key -> generation for loads in flight; bumped by invalidation.
+        self._loading: dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            expires, value = item
+            if self.ttl > 0 and expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key: Hashable, value) -> None:
+        # Caller holds self._lock.
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]):
+        """Return the cached value, building it once per key under concurrent reruns.
+
+        A loader result of None is returned but not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._load_locks[hash(key) % _LOAD_STRIPES]:
+            with self._lock:
+                item = self._data.get(key, _MISSING)
+                if item is not _MISSING and (self.ttl <= 0 or item[0] >= time.monotonic()):
+                    return item[1]
+                self._loading[key] = 0
+            value = _MISSING
+            try:
+                value = loader()
+            finally:
+                with self._lock:
+                    generation = self._loading.pop(key)
+                    if generation == 0 and value is not _MISSING and value is not None:
+                        self._store(key, value)
+            return value
+
+    def _bump_loading(self, keys) -> None:
+        # Caller holds self._lock.
+        for k in keys:
+            self._loading[k] += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            if key in self._loading:
+                self._bump_loading([key])
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            self._bump_loading([k for k in self._loading if predicate(k)])
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bump_loading(list(self._loading))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import os
+import re
+import threading
+import time
 from dataclasses import dataclass
 from typing import Any, Iterable, Sequence
 
@@ -8,6 +11,7 @@ import duckdb
 import pandas as pd
 
 from config import DB_PATH
+from core import profiling
 
 
 def db_backend() -> str:
@@ -34,6 +38,14 @@ def _qmark_to_percent_s(sql: str) -> str:
     return sql.replace("?", "%s")
 
 
+_PERCENT_PLACEHOLDER = re.compile(r"%([%s])")
+
+
+def _percent_s_to_qmark(sql: str) -> str:
+    # Reverse translation for DuckDB: most pages are written against psycopg ('%s', '%%').
+    return _PERCENT_PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", sql)
+
+
 @dataclass
 class _PgResult:
     cursor: Any
@@ -53,8 +65,10 @@ class _PgResult:
 
 
 class _PgConn:
-    def __init__(self, conn):
+    def __init__(self, conn, pool=None, trace: profiling.ConnTrace | None = None):
         self._conn = conn
+        self._pool = pool
+        self._trace = trace
 
     def __enter__(self):
         return self
@@ -66,35 +80,321 @@ class _PgConn:
             else:
                 self._conn.rollback()
         finally:
-            self._conn.close()
+            if self._trace is not None:
+                self._trace.close()
+            if self._pool is not None:
+                # Hand the connection back; the pool resets/discards it as needed.
+                self._pool.putconn(self._conn)
+            else:
+                self._conn.close()
 
     def execute(self, sql: str, params: Sequence[Any] | None = None):
         q = _qmark_to_percent_s(sql)
         cur = self._conn.cursor()
+        if self._trace is None:
+            cur.execute(q, params or [])
+            return _PgResult(cur)
+        t0 = time.perf_counter()
         cur.execute(q, params or [])
-        return _PgResult(cur)
+        rowcount = cur.rowcount if cur.description is None else None
+        return self._trace.wrap(sql, params, _PgResult(cur), profiling.elapsed_ms(t0), rowcount)
 
+    def insert_df(self, table: str, df: pd.DataFrame) -> int:
+        """Bulk-load a DataFrame with COPY FROM STDIN (columns are taken from df)."""
+        if df is None or df.empty:
+            return 0
+        cols = ", ".join(df.columns)
+        t0 = time.perf_counter()
+        rows = df.astype(object).where(df.notna(), None).values.tolist()
+        with self._conn.cursor() as cur:
+            with cur.copy(f"COPY {table} ({cols}) FROM STDIN") as cp:
+                for row in rows:
+                    cp.write_row(row)
+        if self._trace is not None:
+            self._trace.record(f"COPY {table} ({cols}) FROM STDIN", (), profiling.elapsed_ms(t0), len(rows))
+        return len(rows)
 
-def get_conn():
-    backend = db_backend()
-    if backend == "postgres":
+
+# -------------------------
+# Postgres connection pool (process-wide)
+# -------------------------
+_PG_POOL = None
+_PG_POOL_LOCK = threading.Lock()
+_PG_POOL_STATS = {"checkouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(str(os.getenv(name, default) or default).strip())
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(str(os.getenv(name, default) or default).strip())
+    except Exception:
+        return default
+
+
+def _pg_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DB_BACKEND=postgres but DATABASE_URL is not set")
+    return _ensure_sslmode(url)
+
+
+def _pg_reset(conn) -> None:
+    # Run by the pool when a connection is returned: the next user never gets an
+    # open transaction or session-level settings left behind by the previous one.
+    from psycopg.pq import TransactionStatus
+
+    if conn.info.transaction_status != TransactionStatus.IDLE:
+        conn.rollback()
+    conn.execute("RESET ALL")
+    conn.commit()
+
+
+def _pg_pool():
+    """Return the process-wide psycopg pool, creating it on first use.
+
+    Env:
+      - DB_POOL_MIN_SIZE: connections kept open (default 1)
+      - DB_POOL_MAX_SIZE: hard cap on open connections (default 10)
+      - DB_POOL_MAX_IDLE: seconds before an idle surplus connection is closed (default 300)
+      - DB_POOL_TIMEOUT: seconds to wait for a free connection (default 30)
+      - DB_POOL_CHECK: health-check connections on checkout (default true)
+    """
+    global _PG_POOL
+    if _PG_POOL is not None:
+        return _PG_POOL
+
+    with _PG_POOL_LOCK:
+        if _PG_POOL is not None:
+            return _PG_POOL
         try:
-            import psycopg
+            from psycopg_pool import ConnectionPool
         except Exception as e:
             raise RuntimeError(
-                "Postgres backend selected but psycopg is not installed. Add psycopg[binary] to requirements."
+                "Postgres backend selected but psycopg_pool is not installed. Add psycopg[binary,pool] to requirements."
             ) from e
 
-        url = os.getenv("DATABASE_URL")
-        if not url:
-            raise RuntimeError("DB_BACKEND=postgres but DATABASE_URL is not set")
-        url = _ensure_sslmode(url)
-        # For web apps / poolers, keep connections short-lived.
-        conn = psycopg.connect(url)
-        return _PgConn(conn)
+        min_size = max(0, _env_int("DB_POOL_MIN_SIZE", 1))
+        max_size = max(1, min_size, _env_int("DB_POOL_MAX_SIZE", 10))
+        check = str(os.getenv("DB_POOL_CHECK", "true") or "").strip().lower() in ("1", "true", "yes", "y", "on")
+
+        _PG_POOL = ConnectionPool(
+            _pg_url(),
+            min_size=min_size,
+            max_size=max_size,
+            max_idle=_env_float("DB_POOL_MAX_IDLE", 300.0),
+            timeout=_env_float("DB_POOL_TIMEOUT", 30.0),
+            check=ConnectionPool.check_connection if check else None,
+            reset=_pg_reset,
+            name="nzi-pro",
+            open=True,
+        )
+        return _PG_POOL
+
+
+def pool_stats() -> dict:
+    """Pool sizing metrics: checkouts, time spent waiting for a connection, pool occupancy."""
+    out = {
+        "checkouts": _PG_POOL_STATS["checkouts"],
+        "wait_ms_total": round(_PG_POOL_STATS["wait_ms_total"], 2),
+        "wait_ms_avg": round(_PG_POOL_STATS["wait_ms_total"] / _PG_POOL_STATS["checkouts"], 3)
+        if _PG_POOL_STATS["checkouts"]
+        else 0.0,
+        "wait_ms_max": round(_PG_POOL_STATS["wait_ms_max"], 2),
+    }
+    if _PG_POOL is not None:
+        out.update(_PG_POOL.get_stats())
+    return out
+
+
+def close_pool() -> None:
+    global _PG_POOL
+    with _PG_POOL_LOCK:
+        if _PG_POOL is not None:
+            _PG_POOL.close()
+            _PG_POOL = None
+
+
+def get_conn(transactional: bool = False):
+    """Open a connection context.
+
+    Postgres connections always run the block in one transaction (commit on
+    success, rollback on error). DuckDB cursors autocommit each statement
+    unless `transactional=True` is passed.
+    """
+    backend = db_backend()
+    if backend == "postgres":
+        pool = _pg_pool()
+        t0 = time.perf_counter()
+        conn = pool.getconn()
+        waited_ms = (time.perf_counter() - t0) * 1000.0
+        with _PG_POOL_LOCK:
+            _PG_POOL_STATS["checkouts"] += 1
+            _PG_POOL_STATS["wait_ms_total"] += waited_ms
+            _PG_POOL_STATS["wait_ms_max"] = max(_PG_POOL_STATS["wait_ms_max"], waited_ms)
+        trace = profiling.ConnTrace(waited_ms) if profiling.enabled() else None
+        return _PgConn(conn, pool, trace)
 
     # Default: DuckDB
-    return duckdb.connect(DB_PATH)
+    if not profiling.enabled():
+        return _DuckConn(_duck_db().cursor(), transactional=transactional)
+    t0 = time.perf_counter()
+    cur = _duck_db().cursor()
+    return _DuckConn(cur, transactional=transactional, trace=profiling.ConnTrace(profiling.elapsed_ms(t0)))
+
+
+# -------------------------
+# DuckDB shared database handle (process-wide)
+# -------------------------
+_DUCK_DB = None
+_DUCK_DB_LOCK = threading.Lock()
+
+
+def _duck_db():
+    """Return the process-wide DuckDB handle, opening DB_PATH on first use.
+
+    Keeping one handle open means the catalog and buffer cache survive across
+    queries and Streamlit reruns, and sessions in this process never fight over
+    the file lock. Callers get their own cursor (a lightweight duplicate
+    connection), which is the unit DuckDB allows per thread.
+    """
+    global _DUCK_DB
+    if _DUCK_DB is not None:
+        return _DUCK_DB
+    with _DUCK_DB_LOCK:
+        if _DUCK_DB is None:
+            _DUCK_DB = duckdb.connect(DB_PATH)
+        return _DUCK_DB
+
+
+def close_duckdb() -> None:
+    global _DUCK_DB
+    with _DUCK_DB_LOCK:
+        if _DUCK_DB is not None:
+            _DUCK_DB.close()
+            _DUCK_DB = None
+
+
+class _DuckConn:
+    """Context-managed cursor on the shared DuckDB handle.
+
+    Mirrors the old `with duckdb.connect(...) as con` contract: statements
+    autocommit, and leaving the block closes the cursor (not the database).
+    With transactional=True the block runs in one transaction, like _PgConn.
+    """
+
+    def __init__(self, cur, transactional: bool = False, trace: profiling.ConnTrace | None = None):
+        self._cur = cur
+        self._transactional = transactional
+        self._trace = trace
+
+    def __enter__(self):
+        if self._transactional:
+            self._cur.execute("BEGIN TRANSACTION")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._transactional:
+                self._cur.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            if self._trace is not None:
+                self._trace.close()
+            self._cur.close()
+
+    def execute(self, sql: str, params: Sequence[Any] | None = None):
+        q = _percent_s_to_qmark(sql)
+        if self._trace is None:
+            return self._cur.execute(q, params) if params else self._cur.execute(q)
+        t0 = time.perf_counter()
+        res = self._cur.execute(q, params) if params else self._cur.execute(q)
+        return self._trace.wrap(sql, params, res, profiling.elapsed_ms(t0))
+
+    def insert_df(self, table: str, df: pd.DataFrame) -> int:
+        """Bulk-load a DataFrame through DuckDB's native DataFrame scan."""
+        if df is None or df.empty:
+            return 0
+        cols = ", ".join(df.columns)
+        t0 = time.perf_counter()
+        self._cur.register("_insert_df_src", df)
+        try:
+            self._cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM _insert_df_src")
+        finally:
+            self._cur.unregister("_insert_df_src")
+        if self._trace is not None:
+            self._trace.record(f"INSERT INTO {table} ({cols}) <DataFrame>", (), profiling.elapsed_ms(t0), len(df))
+        return len(df)
+
+    def __getattr__(self, name):
+        # register(), append(), fetch*() etc. go straight to the cursor.
+        return getattr(self._cur, name)
+
+
+# Lower-cased text that factor search matches against (level_1..4 + column_text).
+# Postgres stores it as a generated column; DuckDB stores it as a plain column
+# that the factor import path fills (services.factor_search.refresh_search_doc).
+FACTOR_SEARCH_DOC_SQL = (
+    "lower(coalesce(level_1,'') || ' ' || coalesce(level_2,'') || ' ' || coalesce(level_3,'') || ' ' || "
+    "coalesce(level_4,'') || ' ' || coalesce(column_text,''))"
+)
+
+
+# Fresh per-(job_id, scope, level_1) emissions totals from job_scope_rows
+# (enabled) and the legacy crp_scope_entries (non-archived, category as
+# level_1); {where} filters each source on job_id / scope. level_1 is '' when
+# unset because it is part of job_emissions_summary's key. Postgres keeps the
+# same logic in refresh_job_emissions_summary() (core.migrations).
+EMISSIONS_SUMMARY_SOURCE_SQL = """
+    SELECT job_id, scope, level_1, SUM(n) AS row_count, SUM(t) AS tco2e
+    FROM (
+        SELECT job_id, scope, COALESCE(level_1, '') AS level_1,
+               COUNT(*) AS n, COALESCE(SUM(COALESCE(override_tco2e, calc_tco2e)), 0) AS t
+        FROM job_scope_rows
+        WHERE enabled = TRUE {where}
+        GROUP BY job_id, scope, COALESCE(level_1, '')
+        UNION ALL
+        SELECT job_id, scope, COALESCE(category, '') AS level_1,
+               COUNT(*) AS n, COALESCE(SUM(tco2e), 0) AS t
+        FROM crp_scope_entries
+        WHERE is_archived = FALSE {where}
+        GROUP BY job_id, scope, COALESCE(category, '')
+    ) src
+    GROUP BY job_id, scope, level_1
+"""
+
+
+# The Job Folder's 1:1 rows (crp_job_details, job_plan, one job_scope_config
+# row per scope) for jobs that do not have them yet; {where} filters jobs j
+# (e.g. "AND j.job_id = %s" at creation, "" for the boot-time backfill).
+JOB_FOLDER_ROWS_SQL = (
+    """
+    INSERT INTO crp_job_details (job_id, reporting_year, payment_term_id, is_benchmark, is_renewal, free_training_place)
+    SELECT j.job_id, COALESCE(j.reporting_year, CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS INTEGER)), 1, FALSE, FALSE, FALSE
+    FROM jobs j
+    WHERE NOT EXISTS (SELECT 1 FROM crp_job_details d WHERE d.job_id = j.job_id) {where}
+    ON CONFLICT (job_id) DO NOTHING
+    """,
+    """
+    INSERT INTO job_plan (job_id, override_dates)
+    SELECT j.job_id, FALSE
+    FROM jobs j
+    WHERE NOT EXISTS (SELECT 1 FROM job_plan p WHERE p.job_id = j.job_id) {where}
+    ON CONFLICT (job_id) DO NOTHING
+    """,
+    """
+    INSERT INTO job_scope_config (job_id, scope, include_scope, dataset_id, factor_method)
+    SELECT j.job_id, s.scope, TRUE, NULL, NULL
+    FROM jobs j
+    CROSS JOIN (VALUES ('Scope 1'), ('Scope 2'), ('Scope 3')) AS s(scope)
+    WHERE NOT EXISTS (SELECT 1 FROM job_scope_config c WHERE c.job_id = j.job_id AND c.scope = s.scope) {where}
+    ON CONFLICT (job_id, scope) DO NOTHING
+    """,
+)
 
 
 def run_ddl():
@@ -190,10 +490,28 @@ def run_ddl():
         CREATE TABLE IF NOT EXISTS client_notes (
           note_id INTEGER PRIMARY KEY, client_db_id INTEGER, author VARCHAR, note_text TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+
+        CREATE TABLE IF NOT EXISTS factor_import_runs (
+          run_id VARCHAR PRIMARY KEY, dataset_id INTEGER, file_name VARCHAR, file_sha256 VARCHAR,
+          chunk_rows INTEGER, chunks_done INTEGER DEFAULT 0, rows_inserted INTEGER DEFAULT 0, rows_rejected INTEGER DEFAULT 0,
+          status VARCHAR, error VARCHAR, started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
         """
         )
 
         con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS dataset_id INTEGER")
+        con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS level_4 VARCHAR")
+        con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS ghg_unit VARCHAR")
+        con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE")
+        con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS search_doc VARCHAR")
+        con.execute(f"UPDATE factor_lookup SET search_doc={FACTOR_SEARCH_DOC_SQL} WHERE search_doc IS NULL")
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS factor_lookup_dataset_key_idx ON factor_lookup (dataset_id, original_id, year)"
+        )
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS mode VARCHAR DEFAULT 'append'")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_updated INTEGER DEFAULT 0")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_unchanged INTEGER DEFAULT 0")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_retired INTEGER DEFAULT 0")
         con.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS portfolio VARCHAR")
 
         # Seed portfolios
@@ -211,6 +529,94 @@ def run_ddl():
         con.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS target_s2_pct INTEGER")
         con.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS target_s3_pct INTEGER")
 
+        # Job Folder / scope tables (mirrors core.migrations.run_migrations for Postgres).
+        con.execute(
+            """
+        CREATE TABLE IF NOT EXISTS industries_lookup (
+          industry_id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, is_active BOOLEAN DEFAULT TRUE
+        );
+
+        CREATE TABLE IF NOT EXISTS payment_terms_lookup (
+          term_id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, is_active BOOLEAN DEFAULT TRUE
+        );
+
+        CREATE TABLE IF NOT EXISTS crp_job_details (
+          job_id INTEGER PRIMARY KEY,
+          reporting_period_from DATE, reporting_period_to DATE,
+          is_benchmark BOOLEAN DEFAULT FALSE, reporting_year INTEGER NOT NULL,
+          is_renewal BOOLEAN DEFAULT FALSE, client_order_number VARCHAR,
+          client_contact_name VARCHAR, client_contact_email VARCHAR,
+          report_signee_name VARCHAR, report_signee_position VARCHAR,
+          payment_term_id INTEGER DEFAULT 1, free_training_place BOOLEAN DEFAULT FALSE,
+          num_employees INTEGER, turnover_gbp DOUBLE, premises_size_m2 DOUBLE,
+          vehicles_owned INTEGER, vehicles_leased INTEGER, premises_owned INTEGER, premises_leased INTEGER,
+          updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS job_plan (
+          job_id INTEGER PRIMARY KEY, data_collection_due DATE, first_draft_due DATE, final_report_due DATE,
+          override_dates BOOLEAN DEFAULT FALSE, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS job_scope_config (
+          job_id INTEGER NOT NULL, scope VARCHAR NOT NULL, include_scope BOOLEAN DEFAULT TRUE,
+          dataset_id INTEGER, factor_method VARCHAR, PRIMARY KEY (job_id, scope)
+        );
+
+        CREATE SEQUENCE IF NOT EXISTS crp_scope_entries_seq;
+        CREATE TABLE IF NOT EXISTS crp_scope_entries (
+          entry_id INTEGER PRIMARY KEY DEFAULT nextval('crp_scope_entries_seq'),
+          job_id INTEGER NOT NULL, scope VARCHAR NOT NULL,
+          category VARCHAR, subcategory VARCHAR, description VARCHAR, amount DOUBLE, unit VARCHAR,
+          dataset_id INTEGER, factor_id INTEGER, factor_value DOUBLE, tco2e DOUBLE,
+          method VARCHAR, notes VARCHAR, is_archived BOOLEAN DEFAULT FALSE,
+          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE SEQUENCE IF NOT EXISTS job_scope_rows_seq;
+        CREATE TABLE IF NOT EXISTS job_scope_rows (
+          row_id INTEGER PRIMARY KEY DEFAULT nextval('job_scope_rows_seq'),
+          job_id INTEGER NOT NULL, scope VARCHAR NOT NULL,
+          dataset_id INTEGER, factor_db_id INTEGER, original_id VARCHAR NOT NULL,
+          level_1 VARCHAR, level_2 VARCHAR, level_3 VARCHAR, level_4 VARCHAR, column_text VARCHAR,
+          report_label VARCHAR, notes VARCHAR, enabled BOOLEAN DEFAULT TRUE,
+          qty DOUBLE, uom VARCHAR, factor DOUBLE, ghg_unit VARCHAR,
+          calc_tco2e DOUBLE, override_tco2e DOUBLE, override_reason VARCHAR,
+          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        )
+        con.execute("INSERT INTO payment_terms_lookup (term_id, name, is_active) VALUES (1, '100%% in advance', TRUE) ON CONFLICT (term_id) DO NOTHING")
+        con.execute("CREATE INDEX IF NOT EXISTS crp_scope_entries_job_scope_idx ON crp_scope_entries (job_id, scope, is_archived)")
+        con.execute("CREATE INDEX IF NOT EXISTS job_scope_rows_job_scope_idx ON job_scope_rows (job_id, scope)")
+        con.execute("CREATE INDEX IF NOT EXISTS job_scope_rows_factor_idx ON job_scope_rows (factor_db_id)")
+        # Jobs created before their 1:1 rows were made at creation time.
+        for sql in JOB_FOLDER_ROWS_SQL:
+            con.execute(sql.format(where=""))
+
+        # Pre-aggregated emissions per job/scope/level_1, kept current by the
+        # write paths (services.emissions.sync_summary); backfilled when empty.
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_emissions_summary (
+              job_id INTEGER NOT NULL, scope VARCHAR NOT NULL, level_1 VARCHAR NOT NULL DEFAULT '',
+              row_count INTEGER NOT NULL DEFAULT 0, tco2e DOUBLE NOT NULL DEFAULT 0,
+              updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (job_id, scope, level_1)
+            )
+            """
+        )
+        if con.execute("SELECT COUNT(*) FROM job_emissions_summary").fetchone()[0] == 0:
+            con.execute(
+                "INSERT INTO job_emissions_summary (job_id, scope, level_1, row_count, tco2e) "
+                "SELECT job_id, scope, level_1, row_count, tco2e FROM ("
+                + EMISSIONS_SUMMARY_SOURCE_SQL.format(where="")
+                + ") fresh"
+            )
+
+    from core.schema import bump_schema_version
+    bump_schema_version()
+
 
 def next_id(table, pk):
     """DuckDB-only helper.
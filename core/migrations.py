@@ -1,5 +1,19 @@
 # nzi_pro/core/migrations.py
-from core.database import db_backend, get_conn
+import hashlib
+import inspect
+import threading
+import time
+from datetime import datetime, timezone
+
+from core.database import (
+    EMISSIONS_SUMMARY_SOURCE_SQL,
+    FACTOR_SEARCH_DOC_SQL,
+    JOB_FOLDER_ROWS_SQL,
+    db_backend,
+    get_conn,
+    run_ddl,
+)
+from core.schema import bump_schema_version
 
 
 def run_migrations():
@@ -468,6 +482,87 @@ def run_migrations():
         con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS year INTEGER")
         con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS level_4 VARCHAR")
         con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS ghg_unit VARCHAR")
+        # Upsert re-imports retire vanished factors instead of deleting them (job rows reference db_id).
+        con.execute("ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE")
+        con.execute(
+            """
+            CREATE INDEX IF NOT EXISTS factor_lookup_dataset_key_idx
+            ON factor_lookup (dataset_id, original_id, year)
+            """
+        )
+
+        # Factor search (services.factor_search): a lower-cased search document over
+        # level_1..4 + column_text, indexed for trigram LIKE and ranked full-text.
+        con.execute(
+            f"ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS search_doc TEXT "
+            f"GENERATED ALWAYS AS ({FACTOR_SEARCH_DOC_SQL}) STORED"
+        )
+        con.execute(
+            f"ALTER TABLE factor_lookup ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, {FACTOR_SEARCH_DOC_SQL})) STORED"
+        )
+        con.execute("CREATE INDEX IF NOT EXISTS factor_lookup_search_tsv_idx ON factor_lookup USING GIN (search_tsv)")
+        con.execute(
+            """
+            DO $$
+            BEGIN
+                BEGIN
+                    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                EXCEPTION WHEN insufficient_privilege THEN
+                    RAISE NOTICE 'pg_trgm unavailable: factor substring search will not be indexed';
+                END;
+                IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                    EXECUTE 'CREATE INDEX IF NOT EXISTS factor_lookup_search_trgm_idx '
+                            'ON factor_lookup USING GIN (search_doc gin_trgm_ops)';
+                END IF;
+            END $$;
+            """
+        )
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS factor_lookup_dataset_scope_idx ON factor_lookup (dataset_id, scope, year)"
+        )
+
+        # =========================
+        # CLIENT LIST (models.clients.list_clients: paged, ILIKE search)
+        # =========================
+        con.execute("CREATE INDEX IF NOT EXISTS clients_status_name_idx ON clients (status, client_name)")
+        con.execute(
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                    EXECUTE 'CREATE INDEX IF NOT EXISTS clients_name_trgm_idx '
+                            'ON clients USING GIN (client_name gin_trgm_ops)';
+                END IF;
+            END $$;
+            """
+        )
+
+        # =========================
+        # FACTOR IMPORT CHECKPOINTS (resumable chunked ingestion)
+        # =========================
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS factor_import_runs (
+              run_id VARCHAR PRIMARY KEY,
+              dataset_id INTEGER,
+              file_name VARCHAR,
+              file_sha256 VARCHAR,
+              chunk_rows INTEGER,
+              chunks_done INTEGER NOT NULL DEFAULT 0,
+              rows_inserted INTEGER NOT NULL DEFAULT 0,
+              rows_rejected INTEGER NOT NULL DEFAULT 0,
+              status VARCHAR,
+              error VARCHAR,
+              started_at TIMESTAMP DEFAULT NOW(),
+              updated_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS mode VARCHAR NOT NULL DEFAULT 'append'")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_updated INTEGER NOT NULL DEFAULT 0")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_unchanged INTEGER NOT NULL DEFAULT 0")
+        con.execute("ALTER TABLE factor_import_runs ADD COLUMN IF NOT EXISTS rows_retired INTEGER NOT NULL DEFAULT 0")
 
         # =========================
         # CRP Scope data entries (NEW)
@@ -562,3 +657,251 @@ def run_migrations():
             ON job_scope_rows (job_id, scope, enabled)
             """
         )
+
+        # services.recalc: rows that depend on a changed factor.
+        con.execute(
+            """
+            CREATE INDEX IF NOT EXISTS job_scope_rows_factor_idx
+            ON job_scope_rows (factor_db_id)
+            """
+        )
+
+        # Job Folder 1:1 rows are created with the job (services.job_context);
+        # backfill jobs created before that.
+        for sql in JOB_FOLDER_ROWS_SQL:
+            con.execute(sql.format(where=""))
+
+        # =========================
+        # job_emissions_summary: totals per (job_id, scope, level_1), kept
+        # current by statement-level triggers on job_scope_rows and
+        # crp_scope_entries. Each trigger recomputes only the (job_id, scope)
+        # pairs its statement touched, once per pair.
+        # =========================
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_emissions_summary (
+              job_id INTEGER NOT NULL,
+              scope VARCHAR NOT NULL,
+              level_1 VARCHAR NOT NULL DEFAULT '',
+              row_count INTEGER NOT NULL DEFAULT 0,
+              tco2e NUMERIC NOT NULL DEFAULT 0,
+              updated_at TIMESTAMP DEFAULT NOW(),
+              PRIMARY KEY (job_id, scope, level_1)
+            )
+            """
+        )
+
+        con.execute(
+            """
+            CREATE OR REPLACE FUNCTION refresh_job_emissions_summary(p_job_id INTEGER, p_scope VARCHAR)
+            RETURNS VOID LANGUAGE sql AS $fn$
+              -- Serialise refreshes of one job so two writers can't interleave
+              -- and leave a total computed from the older snapshot.
+              SELECT pg_advisory_xact_lock(hashtext('job_emissions_summary'), p_job_id);
+              INSERT INTO job_emissions_summary (job_id, scope, level_1, row_count, tco2e, updated_at)
+              SELECT p_job_id, p_scope, level_1, SUM(n), SUM(t), NOW()
+              FROM (
+                SELECT COALESCE(level_1, '') AS level_1, COUNT(*) AS n,
+                       COALESCE(SUM(COALESCE(override_tco2e, calc_tco2e)), 0) AS t
+                FROM job_scope_rows
+                WHERE job_id = p_job_id AND scope = p_scope AND enabled = TRUE
+                GROUP BY 1
+                UNION ALL
+                SELECT COALESCE(category, ''), COUNT(*), COALESCE(SUM(tco2e), 0)
+                FROM crp_scope_entries
+                WHERE job_id = p_job_id AND scope = p_scope AND is_archived = FALSE
+                GROUP BY 1
+              ) src
+              GROUP BY level_1
+              ON CONFLICT (job_id, scope, level_1) DO UPDATE SET
+                row_count = EXCLUDED.row_count,
+                tco2e = EXCLUDED.tco2e,
+                updated_at = EXCLUDED.updated_at;
+              -- Keys whose count dropped to 0.
+              DELETE FROM job_emissions_summary s
+              WHERE s.job_id = p_job_id AND s.scope = p_scope
+                AND NOT EXISTS (
+                  SELECT 1 FROM job_scope_rows r
+                  WHERE r.job_id = p_job_id AND r.scope = p_scope AND r.enabled = TRUE
+                    AND COALESCE(r.level_1, '') = s.level_1
+                )
+                AND NOT EXISTS (
+                  SELECT 1 FROM crp_scope_entries e
+                  WHERE e.job_id = p_job_id AND e.scope = p_scope AND e.is_archived = FALSE
+                    AND COALESCE(e.category, '') = s.level_1
+                );
+            $fn$
+            """
+        )
+
+        con.execute(
+            """
+            CREATE OR REPLACE FUNCTION job_emissions_summary_sync() RETURNS TRIGGER
+            LANGUAGE plpgsql AS $fn$
+            DECLARE
+              k RECORD;
+            BEGIN
+              IF TG_OP = 'INSERT' THEN
+                FOR k IN SELECT DISTINCT job_id, scope FROM new_rows LOOP
+                  PERFORM refresh_job_emissions_summary(k.job_id, k.scope);
+                END LOOP;
+              ELSIF TG_OP = 'DELETE' THEN
+                FOR k IN SELECT DISTINCT job_id, scope FROM old_rows LOOP
+                  PERFORM refresh_job_emissions_summary(k.job_id, k.scope);
+                END LOOP;
+              ELSE
+                FOR k IN
+                  SELECT job_id, scope FROM new_rows UNION SELECT job_id, scope FROM old_rows
+                LOOP
+                  PERFORM refresh_job_emissions_summary(k.job_id, k.scope);
+                END LOOP;
+              END IF;
+              RETURN NULL;
+            END
+            $fn$
+            """
+        )
+
+        # Transition tables allow one event per trigger, hence three per table.
+        for table in ("job_scope_rows", "crp_scope_entries"):
+            for event, refs in (
+                ("INSERT", "NEW TABLE AS new_rows"),
+                ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+                ("DELETE", "OLD TABLE AS old_rows"),
+            ):
+                trigger = f"{table}_summary_{event.lower()}"
+                con.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+                con.execute(
+                    f"""
+                    CREATE TRIGGER {trigger}
+                    AFTER {event} ON {table}
+                    REFERENCING {refs}
+                    FOR EACH STATEMENT EXECUTE FUNCTION job_emissions_summary_sync()
+                    """
+                )
+
+        # Backfill once (triggers only see changes from here on).
+        con.execute(
+            """
+            DO $fn$
+            BEGIN
+              IF NOT EXISTS (SELECT 1 FROM job_emissions_summary) THEN
+                PERFORM refresh_job_emissions_summary(k.job_id, k.scope)
+                FROM (
+                  SELECT DISTINCT job_id, scope FROM job_scope_rows
+                  UNION
+                  SELECT DISTINCT job_id, scope FROM crp_scope_entries
+                ) k;
+              END IF;
+            END
+            $fn$
+            """
+        )
+
+    bump_schema_version()
+
+
+# =========================
+# BOOT GUARD: run DDL / migrations once per process
+# =========================
+_BOOT_LOCK = threading.Lock()
+_BOOT_DONE: set[str] = set()
+_BOOT_INFO: dict = {}
+
+
+def _sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def schema_fingerprint(step: str) -> str:
+    """Hash of the DDL source for a boot step ('ddl' or 'migrations').
+
+    Any edit to run_ddl()/run_migrations(), or to the module-level SQL they
+    execute, changes the fingerprint, which is what tells a booting process
+    that the stored schema is out of date.
+    """
+    fn = run_ddl if step == "ddl" else run_migrations
+    sql = "\n".join([FACTOR_SEARCH_DOC_SQL, EMISSIONS_SUMMARY_SOURCE_SQL, *JOB_FOLDER_ROWS_SQL])
+    return _sha256_text(f"{db_backend()}\n{inspect.getsource(fn)}\n{sql}")
+
+
+def _ensure_meta_table(con):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_meta (
+          meta_key VARCHAR PRIMARY KEY,
+          meta_value VARCHAR,
+          updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def _stored_fingerprint(step: str) -> str | None:
+    with get_conn() as con:
+        _ensure_meta_table(con)
+        r = con.execute(
+            "SELECT meta_value FROM schema_meta WHERE meta_key=%s",
+            [f"{step}_fingerprint"],
+        ).fetchone()
+    return r[0] if r else None
+
+
+def _store_fingerprint(step: str, fp: str):
+    with get_conn() as con:
+        con.execute(
+            """
+            INSERT INTO schema_meta (meta_key, meta_value, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (meta_key) DO UPDATE SET
+                meta_value = EXCLUDED.meta_value,
+                updated_at = EXCLUDED.updated_at
+            """,
+            [f"{step}_fingerprint", fp],
+        )
+
+
+def ensure_schema(include_migrations: bool = False) -> dict:
+    """Boot-time schema setup, safe to call at the top of every rerun.
+
+    The first call in a process compares the stored fingerprint of each step
+    with the current code and only runs run_ddl()/run_migrations() when they
+    differ. Later calls return the cached boot info without touching the DB.
+    """
+    steps = ["ddl"] + (["migrations"] if include_migrations else [])
+    if all(s in _BOOT_DONE for s in steps):
+        return _BOOT_INFO
+
+    with _BOOT_LOCK:
+        t_boot = time.perf_counter()
+        for step in steps:
+            if step in _BOOT_DONE:
+                continue
+            t0 = time.perf_counter()
+            fp = schema_fingerprint(step)
+            try:
+                stored = _stored_fingerprint(step)
+            except Exception:
+                stored = None
+
+            if stored == fp:
+                action = "skipped (fingerprint match)"
+            else:
+                (run_ddl if step == "ddl" else run_migrations)()
+                _store_fingerprint(step, fp)
+                action = "applied"
+
+            _BOOT_INFO[step] = {
+                "action": action,
+                "fingerprint": fp[:12],
+                "ms": round((time.perf_counter() - t0) * 1000.0, 1),
+            }
+            _BOOT_DONE.add(step)
+
+        _BOOT_INFO["boot_ms"] = round((time.perf_counter() - t_boot) * 1000.0, 1)
+        _BOOT_INFO["booted_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return _BOOT_INFO
+
+
+def boot_info() -> dict:
+    return dict(_BOOT_INFO)
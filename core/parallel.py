@@ -0,0 +1,96 @@
+"""Run independent reads concurrently on a bounded, process-wide thread pool.
+
+A page that needs several unrelated reads (a header row plus a section's
+table, a job context plus its totals) hands them to fetch_all() and waits
+for the slowest one instead of the sum. Each read opens its own get_conn()
+connection (a pooled psycopg connection or a DuckDB cursor on the shared
+handle); psycopg network waits and DuckDB query execution both release the
+GIL, so the reads overlap.
+
+Reads run in a copy of the caller's contextvars, so core.profiling charges
+their queries to the current rerun. They must not call Streamlit: worker
+threads have no ScriptRunContext.
+
+Env:
+  - DB_READ_WORKERS: worker threads shared by every session in the process
+    (default 4; 1 runs reads one after another in the calling thread). On
+    Postgres each running read holds a pool connection, so keep it below
+    DB_POOL_MAX_SIZE.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Mapping
+
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+_IN_WORKER = threading.local()
+
+
+def read_workers() -> int:
+    try:
+        return max(1, int(os.getenv("DB_READ_WORKERS", "4")))
+    except (TypeError, ValueError):
+        return 4
+
+
+def _mark_worker() -> None:
+    _IN_WORKER.active = True
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is not None:
+        return _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(
+                max_workers=read_workers(),
+                thread_name_prefix="nzi-read",
+                initializer=_mark_worker,
+            )
+        return _POOL
+
+
+def fetch_all(reads: Mapping[str, Callable[[], Any]]) -> dict[str, Any]:
+    """Call every zero-argument read concurrently; returns {name: result}.
+
+    The first read runs in the calling thread and the rest on the pool.
+    Everything runs serially when there is one read, when DB_READ_WORKERS
+    is 1, or when called from inside a read (a nested call could otherwise
+    wait on its own pool). If reads raise, all of them still finish and the
+    first failure in `reads` order is re-raised.
+    """
+    items = list(reads.items())
+    if len(items) <= 1 or read_workers() <= 1 or getattr(_IN_WORKER, "active", False):
+        return {name: fn() for name, fn in items}
+
+    pool = _pool()
+    futures = [(name, pool.submit(contextvars.copy_context().run, fn)) for name, fn in items[1:]]
+    results: dict[str, Any] = {}
+    errors: list[BaseException] = []
+    first_name, first_fn = items[0]
+    try:
+        results[first_name] = first_fn()
+    except Exception as e:
+        errors.append(e)
+    for name, fut in futures:
+        try:
+            results[name] = fut.result()
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return {name: results[name] for name, _ in items}
+
+
+def shutdown() -> None:
+    """Stop the worker threads (tests / benchmarks that change DB_READ_WORKERS)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True)
+            _POOL = None
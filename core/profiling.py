@@ -0,0 +1,360 @@
+"""Optional query instrumentation: per-rerun profile, per-page totals, slow-query log.
+
+Env:
+  - QUERY_PROFILE: record every query issued through core.database.get_conn()
+    (default false). The app shows the current rerun's queries, and the
+    process-wide totals for the page, in the Diagnostics expander.
+  - SLOW_QUERY_LOG: file that queries slower than SLOW_QUERY_MS are appended
+    to (default unset = no log). Setting it also turns instrumentation on.
+  - SLOW_QUERY_MS: slow-query threshold in milliseconds (default 250).
+
+Each record holds the SQL fingerprint (literals and placeholders folded to ?),
+parameter count, rows returned, execute + fetch wall time, and the time spent
+acquiring the connection (charged to the first query on that connection).
+When instrumentation is off, get_conn() hands out plain connections.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import pandas as pd
+
+
+def _env_truthy(name: str, default: str = "false") -> bool:
+    v = str(os.getenv(name, default) or "").strip().lower()
+    return v in ("1", "true", "yes", "y", "on")
+
+
+def _slow_log_path() -> str | None:
+    return str(os.getenv("SLOW_QUERY_LOG", "") or "").strip() or None
+
+
+def _slow_ms() -> float:
+    try:
+        return float(os.getenv("SLOW_QUERY_MS", "250"))
+    except (TypeError, ValueError):
+        return 250.0
+
+
+def enabled() -> bool:
+    return _env_truthy("QUERY_PROFILE") or _slow_log_path() is not None
+
+
+# -------------------------
+# Fingerprints
+# -------------------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER = re.compile(r"%s|\?|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalised SQL: whitespace collapsed, literals and placeholders replaced by ?."""
+    s = _STRING.sub("?", str(sql or ""))
+    s = _PLACEHOLDER.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(?, ...)", s)
+    return _SPACE.sub(" ", s).strip()
+
+
+# -------------------------
+# Records
+# -------------------------
+@dataclass
+class QueryRecord:
+    fingerprint: str
+    params: int
+    acquire_ms: float
+    exec_ms: float
+    fetch_ms: float = 0.0
+    rows: int | None = None
+    page: str | None = None
+
+    @property
+    def wall_ms(self) -> float:
+        return self.exec_ms + self.fetch_ms
+
+
+@dataclass
+class RerunProfile:
+    page: str | None = None
+    started: float = field(default_factory=time.perf_counter)
+    records: list[QueryRecord] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, rec: QueryRecord) -> None:
+        with self._lock:
+            self.records.append(rec)
+
+    def summary(self) -> dict:
+        with self._lock:
+            recs = list(self.records)
+        return {
+            "page": self.page,
+            "queries": len(recs),
+            "db_ms": round(sum(r.wall_ms for r in recs), 2),
+            "acquire_ms": round(sum(r.acquire_ms for r in recs), 2),
+            "rerun_ms": round((time.perf_counter() - self.started) * 1000.0, 2),
+        }
+
+
+_CURRENT: contextvars.ContextVar[RerunProfile | None] = contextvars.ContextVar("nzi_query_profile", default=None)
+
+# (page, fingerprint) -> running totals for this process
+_PAGE_TOTALS: dict[tuple, dict] = {}
+_PAGE_LOCK = threading.Lock()
+_SLOW_LOCK = threading.Lock()
+_RERUN_SEQ = [0]
+
+# session key -> summaries of its last RECENT_PER_SESSION reruns (oldest sessions evicted)
+RECENT_PER_SESSION = 20
+_RECENT_SESSIONS = 500
+_RECENT: OrderedDict[str, deque] = OrderedDict()
+
+
+def begin_rerun(page: str | None = None) -> RerunProfile | None:
+    """Start collecting queries for this script run (None when instrumentation is off)."""
+    if not enabled():
+        _CURRENT.set(None)
+        return None
+    prof = RerunProfile(page=page)
+    _CURRENT.set(prof)
+    return prof
+
+
+def set_page(page: str | None) -> None:
+    prof = _CURRENT.get()
+    if prof is not None:
+        prof.page = page
+
+
+def current() -> RerunProfile | None:
+    return _CURRENT.get()
+
+
+def end_rerun(prof: RerunProfile | None, session_key: str | None = None) -> dict | None:
+    """Fold a finished rerun into the per-page totals; returns its summary.
+
+    With session_key the summary is also kept for recent_reruns(). It is kept
+    here rather than in st.session_state because app.py calls this from a
+    finally block, where any st.* access re-raises after st.stop() /
+    st.rerun(); this function touches no Streamlit state.
+    """
+    if prof is None:
+        return None
+    page = prof.page or "(none)"
+    with prof._lock:
+        recs = list(prof.records)
+    with _PAGE_LOCK:
+        reruns = _PAGE_TOTALS.setdefault((page, None), {"reruns": 0})
+        reruns["reruns"] += 1
+        for r in recs:
+            t = _PAGE_TOTALS.setdefault(
+                (page, r.fingerprint), {"calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0, "acquire_ms": 0.0}
+            )
+            t["calls"] += 1
+            t["rows"] += r.rows or 0
+            t["total_ms"] += r.wall_ms
+            t["max_ms"] = max(t["max_ms"], r.wall_ms)
+            t["acquire_ms"] += r.acquire_ms
+        _RERUN_SEQ[0] += 1
+        summary = {"seq": _RERUN_SEQ[0], **prof.summary()}
+        if session_key is not None:
+            recent = _RECENT.pop(session_key, None) or deque(maxlen=RECENT_PER_SESSION)
+            recent.append(summary)
+            _RECENT[session_key] = recent
+            while len(_RECENT) > _RECENT_SESSIONS:
+                _RECENT.popitem(last=False)
+    return summary
+
+
+def recent_reruns(session_key: str | None) -> list[dict]:
+    """Summaries of a session's latest reruns, oldest first (see end_rerun)."""
+    with _PAGE_LOCK:
+        return list(_RECENT.get(session_key, ()))
+
+
+def _write_slow(rec: QueryRecord) -> None:
+    path = _slow_log_path()
+    if path is None or rec.wall_ms < _slow_ms():
+        return
+    ts = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    line = (
+        f"{ts}\twall_ms={rec.wall_ms:.1f}\tacquire_ms={rec.acquire_ms:.1f}\trows={rec.rows}"
+        f"\tparams={rec.params}\tpage={rec.page or '-'}\t{rec.fingerprint}\n"
+    )
+    try:
+        with _SLOW_LOCK, open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError:
+        pass
+
+
+# -------------------------
+# Connection hooks (used by core.database)
+# -------------------------
+def _row_count(value) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, dict):  # fetchnumpy()
+        return len(next(iter(value.values()), []))
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return None
+
+
+class TracedResult:
+    """Proxy for a query result that charges fetch time and row counts to its record."""
+
+    _FETCHERS = ("df", "fetchdf", "fetchall", "fetchmany", "fetchnumpy", "fetch_df")
+
+    def __init__(self, result, rec: QueryRecord):
+        self._result = result
+        self._rec = rec
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = self._result.fetchone()
+        self._rec.fetch_ms += (time.perf_counter() - t0) * 1000.0
+        if row is not None:
+            self._rec.rows = (self._rec.rows or 0) + 1
+        return row
+
+    def __getattr__(self, name):
+        attr = getattr(self._result, name)
+        if name not in self._FETCHERS:
+            return attr
+
+        def fetch(*args, **kwargs):
+            t0 = time.perf_counter()
+            out = attr(*args, **kwargs)
+            self._rec.fetch_ms += (time.perf_counter() - t0) * 1000.0
+            n = _row_count(out)
+            if n is not None:
+                self._rec.rows = (self._rec.rows or 0) + n
+            return out
+
+        return fetch
+
+
+class ConnTrace:
+    """Per-connection collector; core.database creates one when enabled()."""
+
+    def __init__(self, acquire_ms: float):
+        self._acquire_ms = acquire_ms
+        self._profile = _CURRENT.get()
+        self._records: list[QueryRecord] = []
+
+    def record(self, sql: str, params, exec_ms: float, rows: int | None = None) -> QueryRecord:
+        rec = QueryRecord(
+            fingerprint=fingerprint(sql),
+            params=len(params or ()),
+            acquire_ms=0.0 if self._records else self._acquire_ms,
+            exec_ms=exec_ms,
+            rows=rows,
+            page=self._profile.page if self._profile is not None else None,
+        )
+        self._records.append(rec)
+        if self._profile is not None:
+            self._profile.add(rec)
+        return rec
+
+    def wrap(self, sql: str, params, result, exec_ms: float, rowcount: int | None = None):
+        rows = rowcount if rowcount is not None and rowcount >= 0 else None
+        return TracedResult(result, self.record(sql, params, exec_ms, rows))
+
+    def close(self) -> None:
+        for rec in self._records:
+            _write_slow(rec)
+        self._records = []
+
+
+def elapsed_ms(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000.0
+
+
+# -------------------------
+# Reporting
+# -------------------------
+_RERUN_COLUMNS = ["fingerprint", "calls", "params", "rows", "total_ms", "max_ms", "acquire_ms"]
+_PAGE_COLUMNS = ["fingerprint", "calls", "calls_per_rerun", "rows", "total_ms", "avg_ms", "max_ms", "acquire_ms"]
+
+
+def rerun_table(prof: RerunProfile | None) -> pd.DataFrame:
+    """This rerun's queries grouped by fingerprint, slowest total first."""
+    if prof is None or not prof.records:
+        return pd.DataFrame(columns=_RERUN_COLUMNS)
+    with prof._lock:
+        recs = list(prof.records)
+    df = pd.DataFrame(
+        {
+            "fingerprint": [r.fingerprint for r in recs],
+            "params": [r.params for r in recs],
+            "rows": [r.rows or 0 for r in recs],
+            "wall_ms": [r.wall_ms for r in recs],
+            "acquire_ms": [r.acquire_ms for r in recs],
+        }
+    )
+    out = (
+        df.groupby("fingerprint", sort=False)
+        .agg(
+            calls=("wall_ms", "size"),
+            params=("params", "max"),
+            rows=("rows", "sum"),
+            total_ms=("wall_ms", "sum"),
+            max_ms=("wall_ms", "max"),
+            acquire_ms=("acquire_ms", "sum"),
+        )
+        .reset_index()
+        .sort_values("total_ms", ascending=False, ignore_index=True)
+    )
+    return out[_RERUN_COLUMNS].round(2)
+
+
+def page_table(page: str | None) -> pd.DataFrame:
+    """Process-wide totals for one page across all finished reruns, slowest total first."""
+    page = page or "(none)"
+    with _PAGE_LOCK:
+        reruns = _PAGE_TOTALS.get((page, None), {}).get("reruns", 0)
+        items = [(fp, dict(t)) for (pg, fp), t in _PAGE_TOTALS.items() if pg == page and fp is not None]
+    if not items:
+        return pd.DataFrame(columns=_PAGE_COLUMNS)
+    df = pd.DataFrame([{"fingerprint": fp, **t} for fp, t in items])
+    df["calls_per_rerun"] = df["calls"] / max(1, reruns)
+    df["avg_ms"] = df["total_ms"] / df["calls"]
+    return df.sort_values("total_ms", ascending=False, ignore_index=True)[_PAGE_COLUMNS].round(2)
+
+
+def reset_page_totals() -> None:
+    with _PAGE_LOCK:
+        _PAGE_TOTALS.clear()
+
+
+def render_panel(prof: RerunProfile | None) -> None:
+    """Query profile tables for the Diagnostics expander."""
+    import streamlit as st
+
+    if prof is None:
+        st.caption("Query profile: off (set QUERY_PROFILE=true or SLOW_QUERY_LOG to enable).")
+        return
+    s = prof.summary()
+    st.caption(
+        f"Query profile — this rerun: {s['queries']} queries, {s['db_ms']} ms in the DB, "
+        f"{s['acquire_ms']} ms acquiring connections, {s['rerun_ms']} ms total"
+    )
+    st.dataframe(rerun_table(prof), use_container_width=True, hide_index=True)
+    st.caption(f"Page totals (this process): {s['page'] or '(none)'}")
+    st.dataframe(page_table(s["page"]), use_container_width=True, hide_index=True)
+    if _slow_log_path():
+        st.caption(f"Slow queries (≥ {_slow_ms():g} ms) are logged to {_slow_log_path()}")
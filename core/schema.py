@@ -0,0 +1,66 @@
+"""Process-wide schema catalog.
+
+Loads every table's column set with a single information_schema query and
+keeps it in memory, so "does factor_lookup have level_4?" checks cost a set
+lookup instead of a round trip. run_ddl()/run_migrations() bump the schema
+version, which makes the next lookup reload the catalog.
+"""
+from __future__ import annotations
+
+import threading
+
+from core.database import get_conn
+
+_LOCK = threading.Lock()
+_SCHEMA_VERSION = 0
+_CATALOG: dict[str, frozenset[str]] | None = None
+_CATALOG_VERSION = -1
+
+
+def schema_version() -> int:
+    return _SCHEMA_VERSION
+
+
+def bump_schema_version() -> int:
+    """Mark the cached catalog stale (call after any DDL)."""
+    global _SCHEMA_VERSION
+    with _LOCK:
+        _SCHEMA_VERSION += 1
+        return _SCHEMA_VERSION
+
+
+def _load_catalog() -> dict[str, frozenset[str]]:
+    with get_conn() as con:
+        df = con.execute(
+            """
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
+            """
+        ).df()
+    out: dict[str, set[str]] = {}
+    for t, c in zip(df["table_name"].tolist(), df["column_name"].tolist()) if not df.empty else []:
+        out.setdefault(str(t).lower(), set()).add(str(c).lower())
+    return {t: frozenset(cols) for t, cols in out.items()}
+
+
+def catalog() -> dict[str, frozenset[str]]:
+    global _CATALOG, _CATALOG_VERSION
+    cat, ver = _CATALOG, _CATALOG_VERSION
+    if cat is not None and ver == _SCHEMA_VERSION:
+        return cat
+    with _LOCK:
+        if _CATALOG is None or _CATALOG_VERSION != _SCHEMA_VERSION:
+            target = _SCHEMA_VERSION
+            _CATALOG = _load_catalog()
+            _CATALOG_VERSION = target
+        return _CATALOG
+
+
+def table_columns(table: str) -> frozenset[str]:
+    """Column names for a table (empty if the table does not exist)."""
+    return catalog().get(str(table).lower(), frozenset())
+
+
+def has_column(table: str, col: str) -> bool:
+    return str(col).lower() in table_columns(table)
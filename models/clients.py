@@ -1,30 +1,54 @@
 
 from core.database import db_backend, get_conn, next_id
+from services import job_context, lookups
 
 def list_crm_owners():
     """Distinct CRM owners from users + existing clients. Keeps dropdown stable without hardcoding."""
-    with get_conn() as con:
-        a = con.execute("SELECT DISTINCT crm_owner AS v FROM clients WHERE crm_owner IS NOT NULL AND crm_owner <> ''").df()
-        b = con.execute("SELECT DISTINCT full_name AS v FROM users WHERE status='Active' AND full_name IS NOT NULL AND full_name <> ''").df()
-    vals = sorted({str(x) for x in list(a["v"]) + list(b["v"]) if x is not None and str(x).strip() != ""})
-    return ["(Unassigned)"] + vals
+    return lookups.crm_owners()
 
 def list_portfolios():
     """Distinct portfolios already in use (plus default NZI)."""
-    with get_conn() as con:
-        a = con.execute("SELECT DISTINCT portfolio AS v FROM clients WHERE portfolio IS NOT NULL AND portfolio <> ''").df()
-    vals = sorted({str(x) for x in list(a["v"]) if x is not None and str(x).strip() != ""})
-    if "NZI" not in vals:
-        vals = ["NZI"] + vals
-    return vals
+    return lookups.portfolios()
+
+# list_clients() sort keys -> ORDER BY (db_id keeps pages stable on ties).
+CLIENT_SORTS = {
+    "name": "client_name, db_id",
+    "name_desc": "client_name DESC, db_id DESC",
+    "newest": "db_id DESC",
+    "portfolio": "portfolio, client_name, db_id",
+    "crm_owner": "crm_owner, client_name, db_id",
+}
 
-def list_clients(search:str=""):
+def list_clients(search:str="", page:int=0, page_size:int=50, sort:str="name"):
+    """One page of active clients matching `search` (substring, case-insensitive) plus the total.
+
+    Returns (page_df, total). `page` is 0-based; names starting with the search
+    text sort ahead of other matches.
+    """
+    order = CLIENT_SORTS.get(sort, CLIENT_SORTS["name"])
+    search = (search or "").strip()
+    where, where_params, rank, rank_params = "status='Active'", [], "", []
+    if search:
+        where += " AND client_name ILIKE ?"
+        where_params.append(f"%{search}%")
+        rank = "CASE WHEN client_name ILIKE ? THEN 0 ELSE 1 END, "
+        rank_params.append(f"{search}%")
     with get_conn() as con:
-        return con.execute('''
-          SELECT db_id, client_name, crm_owner, portfolio, industry, addr_city, addr_country
-          FROM clients WHERE status='Active' AND client_name ILIKE ?
-          ORDER BY client_name
-        ''', [f"%{search}%"]).df()
+        df = con.execute(f'''
+          SELECT db_id, client_name, crm_owner, portfolio, industry, addr_city, addr_country,
+                 COUNT(*) OVER () AS total_rows
+          FROM clients WHERE {where}
+          ORDER BY {rank}{order}
+          LIMIT ? OFFSET ?
+        ''', where_params + rank_params + [int(page_size), int(page) * int(page_size)]).df()
+        if df.empty:
+            # Past the last page (or nothing matches): still report the real total.
+            total = 0 if page <= 0 else int(
+                con.execute(f"SELECT COUNT(*) FROM clients WHERE {where}", where_params).fetchone()[0]
+            )
+            return df.drop(columns=["total_rows"], errors="ignore"), total
+    total = int(df["total_rows"].iloc[0])
+    return df.drop(columns=["total_rows"]), total
 
 def get_client(client_id:int):
     with get_conn() as con:
@@ -54,13 +78,15 @@ def create_client(payload:dict):
     with get_conn() as con:
         if backend == "postgres":
             row = con.execute(q + " RETURNING db_id", vals).fetchone()
-            return int(row[0])
-
-        # DuckDB fallback
-        nid = next_id("clients", "db_id")
-        q2 = f"INSERT INTO clients (db_id, {cols}) VALUES ({','.join(['?']*(len(vals)+1))})"
-        con.execute(q2, [nid] + vals)
-        return int(nid)
+            nid = int(row[0])
+        else:
+            # DuckDB fallback
+            nid = next_id("clients", "db_id")
+            q2 = f"INSERT INTO clients (db_id, {cols}) VALUES ({','.join(['?']*(len(vals)+1))})"
+            con.execute(q2, [nid] + vals)
+    # CRM owner / portfolio dropdowns are derived from clients.
+    lookups.bump_lookup_version()
+    return int(nid)
 
 def update_client(client_id:int, payload:dict):
     # Minimal update helper for Client Profile edits
@@ -83,17 +109,26 @@ def update_client(client_id:int, payload:dict):
     vals.append(client_id)
     with get_conn() as con:
         con.execute(f"UPDATE clients SET {', '.join(sets)} WHERE db_id=?", vals)
+    if "crm_owner" in payload or "portfolio" in payload:
+        lookups.bump_lookup_version()
+    if "client_name" in payload:
+        # Job Folder / scope page headers show the client name.
+        job_context.invalidate_all()
 
 def archive_client(client_id:int):
     with get_conn() as con:
         con.execute("UPDATE clients SET status='Archived' WHERE db_id=?", [client_id])
-def list_archived_clients(search: str = ""):
-    with get_conn() as con:
-        return con.execute('''
+def archived_clients_query(search: str = ""):
+    """(sql, params) for archived clients, unordered, for query-backed pagers."""
+    return ('''
           SELECT db_id, client_name, crm_owner, portfolio, industry, addr_city, addr_country
           FROM clients WHERE status='Archived' AND client_name ILIKE ?
-          ORDER BY client_name
-        ''', [f"%{search}%"]).df()
+        ''', [f"%{search}%"])
+
+def list_archived_clients(search: str = ""):
+    sql, params = archived_clients_query(search)
+    with get_conn() as con:
+        return con.execute(sql + " ORDER BY client_name", params).df()
 
 def reactivate_client(client_id: int):
     with get_conn() as con:
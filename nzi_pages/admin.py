@@ -3,9 +3,13 @@ import streamlit as st
 import pandas as pd
 
 from core.database import get_conn
-from components.tables import table_with_pager
+from components.tables import invalidate_pager, paged_table, query_table_with_pager
 from models import clients as m_clients
-from core.auth import require_role, show_user_badge
+from core.auth import require_role, revoke_cached_identities, show_user_badge
+from services.factor_import import FactorImportResult, ingest_factor_csv
+from services.factor_search import search_factors
+from services.recalc import recalc_scope_rows
+from services import lookups
 
 
 def render():
@@ -52,8 +56,10 @@ def render():
                             """,
                             [em_norm, fn.strip(), rl, em_norm, status],
                         )
-                    st.success("Saved.")
-                    st.rerun()
+                    lookups.bump_lookup_version()
+                    if _revoke_identities():
+                        st.success("Saved.")
+                        st.rerun()
                 else:
                     st.error("Full Name and Email required.")
 
@@ -104,8 +110,10 @@ def render():
                 if c[5].button("🗄️", key=f"staff_arch_{email}", disabled=(status == "Disabled")):
                     with get_conn() as con:
                         con.execute("UPDATE users SET status='Disabled' WHERE email=%s", [email])
-                    st.toast("User disabled")
-                    st.rerun()
+                    lookups.bump_lookup_version()
+                    if _revoke_identities():
+                        st.toast("User disabled")
+                        st.rerun()
 
                 st.markdown(
                     "<div style='height:1px;background:rgba(120,120,120,0.15);margin:6px 0 6px 0;'></div>",
@@ -149,9 +157,11 @@ def render():
                             """,
                             [(fn or "").strip(), rl, stt, edit["email"]],
                         )
+                    lookups.bump_lookup_version()
                     st.session_state["staff_edit"] = None
-                    st.success("Saved.")
-                    st.rerun()
+                    if _revoke_identities():
+                        st.success("Saved.")
+                        st.rerun()
 
     # =========================
     # LOOKUPS
@@ -208,14 +218,12 @@ def render():
                                 ],
                             ).fetchone()
                             dsid = int(row[0])
+                        lookups.bump_lookup_version()
                         st.success(f"Dataset created with ID {dsid}.")
                         st.rerun()
 
         with right:
-            with get_conn() as con:
-                ddf = con.execute(
-                    "SELECT dataset_id, name, source, analysis_type, country, year, version FROM datasets ORDER BY year DESC, name"
-                ).df()
+            ddf = lookups.datasets()
 
             if ddf.empty:
                 st.warning("Create a dataset first.")
@@ -230,13 +238,92 @@ def render():
                 selected_ds = int(choice.split("]")[0].strip("[")) if choice else None
 
             file = st.file_uploader("Upload Factors CSV", type=["csv"], key="fac_csv")
+            mode_label = st.radio(
+                "Import mode",
+                ["Append rows", "Update existing (match ID + year)"],
+                horizontal=True,
+                key="fac_import_mode",
+                help="Update mode inserts new IDs, updates changed factors in place and skips identical rows.",
+            )
+            import_mode = "upsert" if mode_label.startswith("Update") else "append"
+            retire_missing = st.checkbox(
+                "Retire factors missing from this file",
+                value=False,
+                disabled=(import_mode != "upsert"),
+                key="fac_retire_missing",
+            )
             disabled_ingest = (selected_ds is None) or (file is None)
+
+            last = st.session_state.pop("fac_ingest_msg", None)
+            if last:
+                st.success(last)
+            _warn_unknown_units(st.session_state.pop("fac_ingest_unknown_units", None))
+
             if st.button("Ingest CSV", disabled=disabled_ingest):
                 if not file:
                     st.error("Upload a CSV first.")
                 else:
-                    count = _ingest_factors(file, selected_ds, ddf)
-                    st.success(f"Ingested {count} rows into dataset {selected_ds}.")
+                    bar = st.progress(0.0, text="Importing…")
+
+                    def _progress(frac, res):
+                        bar.progress(
+                            frac,
+                            text=f"{res.chunks} chunk(s) • {res.inserted:,} rows • {res.rejected:,} rejected",
+                        )
+
+                    res = _ingest_factors(
+                        file,
+                        selected_ds,
+                        ddf,
+                        mode=import_mode,
+                        retire_missing=(import_mode == "upsert" and retire_missing),
+                        on_progress=_progress,
+                    )
+                    if res.error:
+                        st.error(f"{res.error} ({res.inserted:,} rows loaded, {res.rejected:,} rejected)")
+                        _warn_unknown_units(res.unknown_units)
+                    elif res.mode == "upsert":
+                        st.session_state["fac_ingest_unknown_units"] = res.unknown_units
+                        st.session_state["fac_ingest_msg"] = (
+                            f"Dataset {selected_ds}: {res.inserted:,} inserted, {res.updated:,} updated, "
+                            f"{res.unchanged:,} unchanged, {res.retired:,} retired in {res.seconds:.2f}s; "
+                            f"{res.rejected:,} rows rejected (no ID or non-numeric factor)."
+                        )
+                        st.rerun()
+                    else:
+                        resumed = f" (resumed at chunk {res.resumed_from_chunk + 1})" if res.resumed_from_chunk else ""
+                        st.session_state["fac_ingest_unknown_units"] = res.unknown_units
+                        st.session_state["fac_ingest_msg"] = (
+                            f"Ingested {res.inserted:,} rows into dataset {selected_ds}{resumed} "
+                            f"in {res.seconds:.2f}s ({res.rows_per_sec:,.0f} rows/s); "
+                            f"{res.rejected:,} rows rejected (non-numeric factor)."
+                        )
+                        st.rerun()
+
+            st.markdown("**Recalculate job rows**")
+            st.caption(
+                "Job scope rows keep the factor value they were entered with. After correcting a "
+                "dataset, preview which rows would change, then apply the new factors in one batch."
+            )
+            rc1, rc2 = st.columns(2)
+            if rc1.button("Preview recalculation", disabled=selected_ds is None, key="recalc_preview"):
+                st.session_state["recalc_preview_result"] = (selected_ds, recalc_scope_rows(selected_ds))
+            preview = st.session_state.get("recalc_preview_result")
+            if preview and preview[0] == selected_ds:
+                res = preview[1]
+                st.write(
+                    f"{res.rows_checked:,} job rows use this dataset; {res.rows_changed:,} would change "
+                    f"(net {res.delta_tco2e:+,.4f} tCO2e calculated)."
+                )
+                if not res.diff.empty:
+                    st.dataframe(res.diff.head(500), use_container_width=True, hide_index=True)
+                if rc2.button("Apply recalculation", disabled=res.rows_changed == 0, key="recalc_apply"):
+                    done = recalc_scope_rows(selected_ds, apply=True)
+                    st.session_state.pop("recalc_preview_result", None)
+                    st.session_state["fac_ingest_msg"] = (
+                        f"Recalculated {done.rows_changed:,} job rows for dataset {selected_ds} "
+                        f"in {done.seconds:.2f}s."
+                    )
                     st.rerun()
 
         st.markdown("---")
@@ -253,8 +340,7 @@ def render():
         q = qcol1.text_input("Search text", value="")
         ds_filter = None
 
-        with get_conn() as con:
-            dlist = con.execute("SELECT dataset_id, name, year FROM datasets ORDER BY year DESC, name").df()
+        dlist = lookups.datasets()
 
         if not dlist.empty:
             disp = ["All datasets"] + dlist.apply(
@@ -264,35 +350,16 @@ def render():
             if pick != "All datasets":
                 ds_filter = int(pick.split("]")[0].strip("["))
 
-        with get_conn() as con:
-            if ds_filter:
-                df = con.execute(
-                    """
-                    SELECT fl.db_id, d.name AS dataset, d.analysis_type, d.country,
-                           fl.year, fl.scope, fl.level_1, fl.level_2, fl.level_3, fl.level_4,
-                           fl.column_text, fl.uom, fl.ghg_unit, fl.factor
-                    FROM factor_lookup fl
-                    LEFT JOIN datasets d ON d.dataset_id = fl.dataset_id
-                    WHERE fl.dataset_id = %s AND fl.column_text ILIKE %s
-                    ORDER BY fl.year DESC, fl.column_text
-                    """,
-                    [ds_filter, f"%{q}%"],
-                ).df()
-            else:
-                df = con.execute(
-                    """
-                    SELECT fl.db_id, d.name AS dataset, d.analysis_type, d.country,
-                           fl.year, fl.scope, fl.level_1, fl.level_2, fl.level_3, fl.level_4,
-                           fl.column_text, fl.uom, fl.ghg_unit, fl.factor
-                    FROM factor_lookup fl
-                    LEFT JOIN datasets d ON d.dataset_id = fl.dataset_id
-                    WHERE fl.column_text ILIKE %s
-                    ORDER BY fl.year DESC, fl.column_text
-                    """,
-                    [f"%{q}%"],
-                ).df()
-
-        table_with_pager(df, "Factors", key="factors_tbl")
+        def _factor_page(offset, limit):
+            res = search_factors(q, dataset_id=ds_filter, page=offset // limit + 1, page_size=limit)
+            return res.df, res.total
+
+        paged_table(
+            "Factors",
+            key="factors_tbl",
+            fetch_page=_factor_page,
+            transform=lambda d: d.drop(columns=["dataset_id", "original_id", "score"], errors="ignore"),
+        )
 
     # =========================
     # ARCHIVED CLIENTS
@@ -300,8 +367,14 @@ def render():
     with t4:
         st.subheader("Archived Clients")
         q = st.text_input("Search archived clients", key="archived_clients_search")
-        df = m_clients.list_archived_clients(q)
-        table_with_pager(df, "Archived Clients", key="archived_clients_tbl")
+        sql, params = m_clients.archived_clients_query(q)
+        df = query_table_with_pager(
+            sql,
+            params,
+            "Archived Clients",
+            key="archived_clients_tbl",
+            order_by={"Name": "client_name, db_id", "Newest first": "db_id DESC"},
+        )
 
         if df.empty:
             st.info("No archived clients.")
@@ -316,6 +389,7 @@ def render():
 
         if st.button("Reactivate client"):
             m_clients.reactivate_client(cid)
+            invalidate_pager("archived_clients_tbl")
             st.success("Client reactivated.")
             st.rerun()
 
@@ -323,21 +397,21 @@ def render():
 # -------------------------
 # Helpers
 # -------------------------
+def _revoke_identities() -> bool:
+    """Revoke cached identities everywhere; show an error and return False if that failed."""
+    try:
+        revoke_cached_identities()
+        return True
+    except Exception as e:
+        st.error(
+            f"User saved, but other app processes could not be told to drop cached logins ({e}). "
+            "They pick up the change when their cache expires."
+        )
+        return False
+
+
 def _roles():
-    with get_conn() as con:
-        df = con.execute(
-            "SELECT role_name FROM roles_lookup WHERE is_active=TRUE ORDER BY role_name"
-        ).df()
-    rows = df["role_name"].tolist() if not df.empty else []
-    if not rows:
-        with get_conn() as con:
-            con.execute("""
-                INSERT INTO roles_lookup (role_name, is_active)
-                VALUES ('Admin',TRUE),('Consultant',TRUE),('ReadOnly',TRUE),('CRM',TRUE),('QA',TRUE),('Support',TRUE)
-                ON CONFLICT (role_name) DO NOTHING
-            """)
-        rows = ["Admin", "Consultant", "ReadOnly", "CRM", "QA", "Support"]
-    return rows
+    return lookups.roles()
 
 
 def _lookup_editor(table, columns, id_col, name_col, title: str):
@@ -382,6 +456,7 @@ def _lookup_editor(table, columns, id_col, name_col, title: str):
             if c[3].button("🗄️", key=f"{table}_arch_{rid}", disabled=(not active)):
                 with get_conn() as con:
                     con.execute(f"UPDATE {table} SET is_active=FALSE WHERE {id_col}=%s", [rid])
+                lookups.bump_lookup_version()
                 st.toast("Archived")
                 st.rerun()
 
@@ -410,6 +485,7 @@ def _lookup_editor(table, columns, id_col, name_col, title: str):
                             f"UPDATE {table} SET name=%s, is_active=%s WHERE {id_col}=%s",
                             [nn, bool(new_active), int(edit["id"])],
                         )
+                    lookups.bump_lookup_version()
                     st.session_state[edit_key] = None
                     st.success("Saved.")
                     st.rerun()
@@ -429,6 +505,7 @@ def _lookup_editor(table, columns, id_col, name_col, title: str):
                         f"INSERT INTO {table} ({id_col}, name, is_active) VALUES (%s,%s,%s)",
                         [new_id, nn, bool(active)],
                     )
+                lookups.bump_lookup_version()
                 st.success("Added.")
                 st.rerun()
 
@@ -447,153 +524,38 @@ def _dl_sample(label, path):
         st.warning(f"Missing sample file {path}")
 
 
-def _ingest_factors(file, dataset_id: int, datasets_df: pd.DataFrame) -> int:
+def _warn_unknown_units(units):
+    if units:
+        st.warning(
+            f"Unrecognised GHG unit(s) {', '.join(units)}: these factors were loaded but are "
+            "converted as kgCO2e. Fix the units in the CSV and re-import in update mode."
+        )
+
+
+def _ingest_factors(
+    file,
+    dataset_id: int,
+    datasets_df: pd.DataFrame,
+    mode: str = "append",
+    retire_missing: bool = False,
+    on_progress=None,
+) -> FactorImportResult:
     """
-    Ingest factors CSV into factor_lookup.
+    Ingest factors CSV into factor_lookup (streamed in chunks, see services.factor_import).
     Supports DESNZ 2025+ format with:
       - Year column (optional, overrides dataset year)
       - Level 4 column (optional)
       - GHG Unit column (defaults to kgCO2e)
     Backwards compatible with older samples.
     """
-    import io
-    import numpy as np
-
-    def norm_col(c: str) -> str:
-        return c.lower().strip().replace("_", " ")
-
-    def norm_ghg_unit(v):
-        if v is None or (isinstance(v, float) and np.isnan(v)):
-            return "kgCO2e"
-        s = str(v).strip()
-        if not s or s.lower() == "nan":
-            return "kgCO2e"
-        s = s.replace(" ", "")
-        if s.lower() in ("kgco2e", "kgco₂e"):
-            return "kgCO2e"
-        return s
-
-    # Read CSV
-    content = file.read()
-    # Read CSV bytes with robust encoding fallback (DESNZ files are sometimes Windows-1252)
-    try:
-        df = pd.read_csv(io.BytesIO(content), encoding="utf-8")
-    except UnicodeDecodeError:
-        try:
-            df = pd.read_csv(io.BytesIO(content), encoding="cp1252")
-        except UnicodeDecodeError:
-            df = pd.read_csv(io.BytesIO(content), encoding="latin1")
-
-    # Column map (case / underscore / spacing tolerant)
-    cols = {norm_col(c): c for c in df.columns}
-
-    def pick(*names):
-        for n in names:
-            k = norm_col(n)
-            if k in cols:
-                return cols[k]
-        return None
-
-    # Core columns
-    c_year = pick("Year")
-    c_id = pick("ID", "Code")
-    c_scope = pick("Scope")
-    c_l1 = pick("Level 1", "Category", "SIC Section", "Product Group")
-    c_l2 = pick("Level 2", "Subcategory", "SIC Division", "Product")
-    c_l3 = pick("Level 3", "Detail", "Item")
-    c_l4 = pick("Level 4")
-    c_text = pick("Column Text", "Description", "Name", "Activity")
-    c_uom = pick("UOM", "Unit", "Units")
-    c_ghg = pick("GHG Unit", "GHGUnit")
-    c_fac = pick(
-        "Factor",
-        "GHG Conversion Factor",
-        "kgCO2e per unit",
-        "kgco2e_per_unit",
-        "kgCO2e per GBP",
-        "kgCO2e_per_GBP",
+    meta = datasets_df.loc[datasets_df["dataset_id"] == dataset_id].iloc[0].to_dict()
+    file.seek(0)
+    return ingest_factor_csv(
+        file,
+        file.name,
+        int(dataset_id),
+        meta,
+        mode=mode,
+        retire_missing=retire_missing,
+        on_progress=on_progress,
     )
-
-    if c_text is None or c_fac is None:
-        st.error("CSV missing required columns (Column Text / Factor).")
-        return 0
-
-    # Dataset metadata fallback
-    meta = datasets_df.loc[datasets_df["dataset_id"] == dataset_id].iloc[0]
-    ds_year = int(meta["year"])
-    src = str(meta["source"])
-    region = str(meta.get("region", "") or "")
-    currency = str(meta.get("currency", "GBP") or "GBP")
-
-    rows = []
-
-    for _, r in df.iterrows():
-        # Year precedence: CSV > dataset
-        yr = None
-        if c_year and not pd.isna(r[c_year]):
-            try:
-                yr = int(r[c_year])
-            except Exception:
-                yr = ds_year
-        else:
-            yr = ds_year
-
-        # Factor (skip invalid)
-        try:
-            factor = float(r[c_fac])
-        except Exception:
-            continue
-
-        rows.append(
-            [
-                dataset_id,
-                file.name,
-                yr,
-                r[c_id] if c_id else None,
-                r[c_scope] if c_scope else None,
-                r[c_l1] if c_l1 else None,
-                r[c_l2] if c_l2 else None,
-                r[c_l3] if c_l3 else None,
-                r[c_l4] if c_l4 else None,
-                str(r[c_text]).strip(),
-                r[c_uom] if c_uom else None,
-                norm_ghg_unit(r[c_ghg]) if c_ghg else "kgCO2e",
-                factor,
-                src,
-                region,
-                currency,
-            ]
-        )
-
-    if not rows:
-        st.warning("No valid factor rows found.")
-        return 0
-
-    with get_conn() as con:
-        sql = """
-            INSERT INTO factor_lookup
-            (
-              dataset_id,
-              file_name,
-              year,
-              original_id,
-              scope,
-              level_1,
-              level_2,
-              level_3,
-              level_4,
-              column_text,
-              uom,
-              ghg_unit,
-              factor,
-              source,
-              region,
-              currency
-            )
-            VALUES
-            (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """
-        for params in rows:
-            con.execute(sql, params)
-
-    return len(rows)
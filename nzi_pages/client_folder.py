@@ -3,14 +3,16 @@ import plotly.express as px
 import pandas as pd
 
 from models.clients import get_client, update_client, list_crm_owners, list_portfolios
-from components.tables import table_with_pager
+from components.tables import query_table_with_pager, table_with_pager
 from core.database import get_conn
+from core.parallel import fetch_all
 from utils.forecasting import build_forecast_df
 
 # Phase 1 service extraction (MCP-ready): keep DB ops out of Streamlit pages
-from services.sites import add_site, list_sites
-from services.contacts import add_contact, list_contacts
-from services.notes import add_note, list_notes
+from services import client_folder as folder
+from services.sites import add_site
+from services.contacts import add_contact
+from services.notes import add_note
 
 
 def is_blank(x) -> bool:
@@ -51,7 +53,12 @@ def render():
         st.info("Select a client from the Clients page.")
         return
 
-    c = get_client(cid)
+    # The client row and the open section's data are independent reads.
+    section = st.session_state.get("client_folder_tab", next(iter(SECTIONS)))
+    reads = {"client": lambda: get_client(cid)}
+    if section in SECTION_DATA:
+        reads["section"] = lambda: SECTION_DATA[section](int(cid))
+    c = fetch_all(reads)["client"]
     if c is None:
         st.error("Client not found.")
         return
@@ -138,238 +145,204 @@ def render():
                         st.success("Client profile updated.")
                         _stop_edit()
 
-    tabs = st.tabs(["🏢 Sites", "📞 Contacts", "🧵 Jobs", "📄 CRP", "🎯 Targets", "🧾 Activity", "🧪 Datasets Used", "📝 Notes"])
-
-    # --------------------
-    # SITES (ADD + LIST)
-    # --------------------
-    with tabs[0]:
-        with st.expander("➕ Add Site", expanded=False):
-            with st.form("add_site_form", clear_on_submit=True):
-                s1, s2 = st.columns(2)
-                site_name = s1.text_input("Site Name *")
-                location = s2.text_input("Location")
-                is_reg = st.checkbox("Registered Office", value=False)
-
-                if st.form_submit_button("Add Site"):
-                    if is_blank(site_name):
-                        st.error("Site Name is required.")
-                    else:
-                        add_site(int(cid), site_name, (location or None), bool(is_reg))
-                        st.success("Site added.")
-                        st.rerun()
-
-        df = list_sites(int(cid))
-        table_with_pager(df, "Sites", key="sites")
-
-    # -----------------------
-    # CONTACTS (ADD + LIST)
-    # -----------------------
-    with tabs[1]:
-        with st.expander("➕ Add Contact", expanded=False):
-            with st.form("add_contact_form", clear_on_submit=True):
-                c1, c2, c3 = st.columns(3)
-                full_name = c1.text_input("Full Name *")
-                job_title = c2.text_input("Job Title")
-                email = c3.text_input("Email")
-
-                if st.form_submit_button("Add Contact"):
-                    if is_blank(full_name):
-                        st.error("Full Name is required.")
-                    else:
-                        add_contact(int(cid), full_name, (job_title or None), (email or None))
-                        st.success("Contact added.")
-                        st.rerun()
-
-        df = list_contacts(int(cid))
-        table_with_pager(df, "Contacts", key="contacts")
+    # One section at a time: only the selected one queries (services.client_folder caches it).
+    section = st.radio(
+        "Section",
+        list(SECTIONS),
+        horizontal=True,
+        key="client_folder_tab",
+        label_visibility="collapsed",
+    )
+    SECTIONS[section](int(cid), c)
+
+
+# --------------------
+# SITES (ADD + LIST)
+# --------------------
+def _render_sites(cid: int, c):
+    with st.expander("➕ Add Site", expanded=False):
+        with st.form("add_site_form", clear_on_submit=True):
+            s1, s2 = st.columns(2)
+            site_name = s1.text_input("Site Name *")
+            location = s2.text_input("Location")
+            is_reg = st.checkbox("Registered Office", value=False)
+
+            if st.form_submit_button("Add Site"):
+                if is_blank(site_name):
+                    st.error("Site Name is required.")
+                else:
+                    add_site(cid, site_name, (location or None), bool(is_reg))
+                    st.success("Site added.")
+                    st.rerun()
+
+    table_with_pager(folder.sites(cid), "Sites", key="sites")
+
+
+# -----------------------
+# CONTACTS (ADD + LIST)
+# -----------------------
+def _render_contacts(cid: int, c):
+    with st.expander("➕ Add Contact", expanded=False):
+        with st.form("add_contact_form", clear_on_submit=True):
+            c1, c2, c3 = st.columns(3)
+            full_name = c1.text_input("Full Name *")
+            job_title = c2.text_input("Job Title")
+            email = c3.text_input("Email")
+
+            if st.form_submit_button("Add Contact"):
+                if is_blank(full_name):
+                    st.error("Full Name is required.")
+                else:
+                    add_contact(cid, full_name, (job_title or None), (email or None))
+                    st.success("Contact added.")
+                    st.rerun()
+
+    table_with_pager(folder.contacts(cid), "Contacts", key="contacts")
+
+
+# --------------------
+# JOBS (LIST)
+# --------------------
+def _render_jobs(cid: int, c):
+    query_table_with_pager(
+        """
+        SELECT job_number, job_type, title, reporting_year, status, start_date, due_date, created_at
+        FROM jobs
+        WHERE client_db_id=?
+        """,
+        [cid],
+        "Client Jobs",
+        key="client_jobs",
+        order_by={
+            "Newest first": "created_at DESC",
+            "Due date": "due_date NULLS LAST, created_at DESC",
+            "Job number": "job_number",
+        },
+        transform=lambda d: d.drop(columns=["created_at"]),
+    )
 
-    # --------------------
-    # JOBS (LIST)
-    # --------------------
-    with tabs[2]:
-        with get_conn() as con:
-            df = con.execute(
-                """
-                SELECT job_number, job_type, title, reporting_year, status, start_date, due_date
-                FROM jobs
-                WHERE client_db_id=?
-                ORDER BY created_at DESC
-                """,
-                [cid]
-            ).df()
-        table_with_pager(df, "Client Jobs", key="client_jobs")
-
-    # --------------------
-    # CRP (LIST)
-    # --------------------
-    with tabs[3]:
-        with get_conn() as con:
-            df = con.execute(
-                "SELECT reporting_year, is_benchmark, status, created_at FROM crp_reports WHERE client_db_id=? ORDER BY reporting_year",
-                [cid]
-            ).df()
-        table_with_pager(df, "CRP Years", key="crp_years")
-
-    # --------------------
-    # TARGETS (EDIT + CHART)
-    # --------------------
-    with tabs[4]:
-        st.subheader("Net Zero Targets")
-        nz_col, it_col = st.columns(2)
-        nz_year = nz_col.number_input(
-            "Net Zero Year",
-            min_value=2025,
-            max_value=2100,
-            value=int(coalesce(c.get("net_zero_year"), 2050)),
-        )
-        interim_year = it_col.number_input(
-            "Interim Year",
-            min_value=2025,
-            max_value=2100,
-            value=int(coalesce(c.get("interim_year"), 2035)),
-        )
-
-        s1, s2, s3 = st.columns(3)
-        s1p = s1.slider(
-            "Scope 1 reduction by Interim (%)",
-            0,
-            100,
-            int(coalesce(c.get("interim_s1_pct"), 50)),
-        )
-        s2p = s2.slider(
-            "Scope 2 reduction by Interim (%)",
-            0,
-            100,
-            int(coalesce(c.get("interim_s2_pct"), 50)),
-        )
-        s3p = s3.slider(
-            "Scope 3 reduction by Interim (%)",
-            0,
-            100,
-            int(coalesce(c.get("interim_s3_pct"), 50)),
-        )
-
-        if st.button("Save Targets"):
-            with get_conn() as con:
-                con.execute(
-                    "UPDATE clients SET net_zero_year=?, interim_year=?, interim_s1_pct=?, interim_s2_pct=?, interim_s3_pct=? WHERE db_id=?",
-                    [int(nz_year), int(interim_year), int(s1p), int(s2p), int(s3p), cid]
-                )
-            st.success("Targets updated.")
 
-        # Baseline year resolution (robust vs pd.NA/None)
-        with get_conn() as con:
-            bmy = c.get("benchmark_year")
+# --------------------
+# CRP (LIST)
+# --------------------
+def _render_crp(cid: int, c):
+    table_with_pager(folder.crp_years(cid), "CRP Years", key="crp_years")
+
+
+# --------------------
+# TARGETS (EDIT + CHART)
+# --------------------
+def _render_targets(cid: int, c):
+    st.subheader("Net Zero Targets")
+    nz_col, it_col = st.columns(2)
+    nz_year = nz_col.number_input(
+        "Net Zero Year",
+        min_value=2025,
+        max_value=2100,
+        value=int(coalesce(c.get("net_zero_year"), 2050)),
+    )
+    interim_year = it_col.number_input(
+        "Interim Year",
+        min_value=2025,
+        max_value=2100,
+        value=int(coalesce(c.get("interim_year"), 2035)),
+    )
 
-            if is_blank(bmy):
-                row = con.execute(
-                    "SELECT MIN(reporting_year) FROM crp_reports WHERE client_db_id=?",
-                    [cid]
-                ).fetchone()
-                min_year = row[0] if row else None
+    s1, s2, s3 = st.columns(3)
+    s1p = s1.slider(
+        "Scope 1 reduction by Interim (%)",
+        0,
+        100,
+        int(coalesce(c.get("interim_s1_pct"), 50)),
+    )
+    s2p = s2.slider(
+        "Scope 2 reduction by Interim (%)",
+        0,
+        100,
+        int(coalesce(c.get("interim_s2_pct"), 50)),
+    )
+    s3p = s3.slider(
+        "Scope 3 reduction by Interim (%)",
+        0,
+        100,
+        int(coalesce(c.get("interim_s3_pct"), 50)),
+    )
 
-                if is_blank(min_year):
-                    bmy = int(st.session_state.get("working_year", 2026))
-                else:
-                    bmy = int(min_year)
-            else:
-                bmy = int(bmy)
-
-            base = con.execute(
-                """
-                SELECT scope, SUM(emissions_tco2e) AS t
-                FROM activity_data
-                WHERE client_db_id=?
-                  AND crp_id IN (
-                    SELECT crp_id
-                    FROM crp_reports
-                    WHERE client_db_id=? AND reporting_year=?
-                  )
-                GROUP BY scope
-                """,
-                [cid, cid, bmy]
-            ).df()
-
-        baseline = {"Scope 1": 0.0, "Scope 2": 0.0, "Scope 3": 0.0}
-        if not base.empty:
-            for _, r in base.iterrows():
-                s = str(r["scope"]).strip().lower()
-                if s.startswith("scope 1"):
-                    baseline["Scope 1"] = float(coalesce(r["t"], 0.0))
-                elif s.startswith("scope 2"):
-                    baseline["Scope 2"] = float(coalesce(r["t"], 0.0))
-                elif s.startswith("scope 3"):
-                    baseline["Scope 3"] = float(coalesce(r["t"], 0.0))
-
-        fdf = build_forecast_df(int(bmy), int(nz_year), int(interim_year), int(s1p), int(s2p), int(s3p), baseline)
-        st.caption(f"Baseline year: {bmy}")
-        st.plotly_chart(px.area(fdf, x="Year", y=["Scope 1", "Scope 2", "Scope 3"], title="Emissions Forecast to Net Zero"), use_container_width=True)
-        table_with_pager(fdf, "Forecast Table", key="forecast_tbl")
-
-    # --------------------
-    # ACTIVITY (LIST)
-    # --------------------
-    with tabs[5]:
-        with get_conn() as con:
-            df = con.execute(
-                """
-                SELECT COALESCE(s.site_name,'(Unassigned)') AS site,
-                       ad.scope,
-                       SUM(ad.emissions_tco2e) AS tCO2e
-                FROM activity_data ad
-                LEFT JOIN client_sites s ON s.site_id = ad.site_id
-                WHERE ad.client_db_id=?
-                GROUP BY 1,2
-                ORDER BY 1,2
-                """,
-                [cid]
-            ).df()
-        table_with_pager(df, "Activity Summary (by Site & Scope)", key="activity_summary")
-
-    # --------------------
-    # DATASETS USED (LIST)
-    # --------------------
-    with tabs[6]:
-        st.subheader("Datasets used in client calculations")
+    if st.button("Save Targets"):
         with get_conn() as con:
-            df = con.execute(
-                """
-                SELECT d.name, d.source, d.analysis_type, d.country, d.year, d.version,
-                       COUNT(*) AS lines, SUM(ad.emissions_tco2e) AS total_tco2e
-                FROM activity_data ad
-                JOIN factor_lookup fl ON fl.db_id = ad.factor_id
-                LEFT JOIN datasets d ON d.dataset_id = fl.dataset_id
-                WHERE ad.client_db_id = ?
-                GROUP BY 1,2,3,4,5,6
-                ORDER BY d.year DESC, d.name
-                """,
-                [cid]
-            ).df()
-        table_with_pager(df, "Datasets Used", key="datasets_used")
-
-    # --------------------
-    # NOTES (ADD + LIST)
-    # --------------------
-    with tabs[7]:
-        with st.expander("➕ Add Note", expanded=False):
-            with st.form("add_note_form", clear_on_submit=True):
-                note_text = st.text_area("Note", height=120, placeholder="Type your note here...")
-
-                if st.form_submit_button("Add Note"):
-                    if is_blank(note_text):
-                        st.error("Note cannot be blank.")
-                    else:
-                        author = (
-                            st.session_state.get("user_full_name")
-                            or st.session_state.get("user_name")
-                            or st.session_state.get("user_email")
-                            or "(Unknown)"
-                        )
-                        add_note(int(cid), str(author), str(note_text))
-
-                        st.success("Note added.")
-                        st.rerun()
-
-        df = list_notes(int(cid))
-        table_with_pager(df, "Notes", key="notes")
+            con.execute(
+                "UPDATE clients SET net_zero_year=?, interim_year=?, interim_s1_pct=?, interim_s2_pct=?, interim_s3_pct=? WHERE db_id=?",
+                [int(nz_year), int(interim_year), int(s1p), int(s2p), int(s3p), cid]
+            )
+        st.success("Targets updated.")
+
+    # Baseline year: benchmark_year, else the first CRP year, else the working year.
+    bmy, baseline = folder.baseline(cid, c.get("benchmark_year"), int(st.session_state.get("working_year", 2026)))
+
+    fdf = build_forecast_df(int(bmy), int(nz_year), int(interim_year), int(s1p), int(s2p), int(s3p), baseline)
+    st.caption(f"Baseline year: {bmy}")
+    st.plotly_chart(px.area(fdf, x="Year", y=["Scope 1", "Scope 2", "Scope 3"], title="Emissions Forecast to Net Zero"), use_container_width=True)
+    table_with_pager(fdf, "Forecast Table", key="forecast_tbl")
+
+
+# --------------------
+# ACTIVITY (LIST)
+# --------------------
+def _render_activity(cid: int, c):
+    table_with_pager(folder.activity_summary(cid), "Activity Summary (by Site & Scope)", key="activity_summary")
+
+
+# --------------------
+# DATASETS USED (LIST)
+# --------------------
+def _render_datasets(cid: int, c):
+    st.subheader("Datasets used in client calculations")
+    table_with_pager(folder.datasets_used(cid), "Datasets Used", key="datasets_used")
+
+
+# --------------------
+# NOTES (ADD + LIST)
+# --------------------
+def _render_notes(cid: int, c):
+    with st.expander("➕ Add Note", expanded=False):
+        with st.form("add_note_form", clear_on_submit=True):
+            note_text = st.text_area("Note", height=120, placeholder="Type your note here...")
+
+            if st.form_submit_button("Add Note"):
+                if is_blank(note_text):
+                    st.error("Note cannot be blank.")
+                else:
+                    author = (
+                        st.session_state.get("user_full_name")
+                        or st.session_state.get("user_name")
+                        or st.session_state.get("user_email")
+                        or "(Unknown)"
+                    )
+                    add_note(cid, str(author), str(note_text))
+
+                    st.success("Note added.")
+                    st.rerun()
+
+    table_with_pager(folder.notes(cid), "Notes", key="notes")
+
+
+SECTIONS = {
+    "🏢 Sites": _render_sites,
+    "📞 Contacts": _render_contacts,
+    "🧵 Jobs": _render_jobs,
+    "📄 CRP": _render_crp,
+    "🎯 Targets": _render_targets,
+    "🧾 Activity": _render_activity,
+    "🧪 Datasets Used": _render_datasets,
+    "📝 Notes": _render_notes,
+}
+
+# Sections whose data render() loads alongside the client row (cached in services.client_folder).
+SECTION_DATA = {
+    "🏢 Sites": folder.sites,
+    "📞 Contacts": folder.contacts,
+    "📄 CRP": folder.crp_years,
+    "🧾 Activity": folder.activity_summary,
+    "🧪 Datasets Used": folder.datasets_used,
+    "📝 Notes": folder.notes,
+}
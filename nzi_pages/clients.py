@@ -2,7 +2,17 @@ import streamlit as st
 import pandas as pd
 
 from models import clients as m_clients
-from core.database import get_conn
+from components.tables import invalidate_pager
+from services import lookups
+
+
+_CLIENT_SORT_LABELS = {
+    "Name (A–Z)": "name",
+    "Name (Z–A)": "name_desc",
+    "Newest": "newest",
+    "Portfolio": "portfolio",
+    "CRM owner": "crm_owner",
+}
 
 
 def _init_clients_pager():
@@ -10,7 +20,22 @@ def _init_clients_pager():
     st.session_state.setdefault("clients_tbl_page", 0)
 
 
+def _reset_clients_page():
+    st.session_state["clients_tbl_page"] = 0
+
+
+def _set_clients_page_size():
+    st.session_state["clients_tbl_psize"] = st.session_state["clients_tbl_psel"]
+    _reset_clients_page()
+
+
+def _step_clients_page(delta: int, total_pages: int):
+    page = st.session_state["clients_tbl_page"] + delta
+    st.session_state["clients_tbl_page"] = min(max(0, page), total_pages - 1)
+
+
 def _render_clients_pager(n_rows: int):
+    """Pager controls; callbacks update state before the next rerun queries its page."""
     _init_clients_pager()
     psize = st.session_state["clients_tbl_psize"]
     page = st.session_state["clients_tbl_page"]
@@ -20,34 +45,25 @@ def _render_clients_pager(n_rows: int):
     with c1:
         st.caption(f"{n_rows:,} rows total")
     with c2:
-        new_size = st.selectbox(
+        st.session_state.setdefault("clients_tbl_psel", psize)
+        st.selectbox(
             "Rows",
             [50, 100, 150, 200],
-            index=[50, 100, 150, 200].index(psize),
             key="clients_tbl_psel",
+            on_change=_set_clients_page_size,
         )
-        if new_size != psize:
-            st.session_state["clients_tbl_psize"] = new_size
-            st.session_state["clients_tbl_page"] = 0
-            psize, page = new_size, 0
-            total_pages = max(1, (n_rows + psize - 1) // psize)
 
     with c3:
         b1, b2, b3 = st.columns([1, 2, 1])
-        if b1.button("◀", key="clients_tbl_prev", disabled=(page <= 0)):
-            st.session_state["clients_tbl_page"] = max(0, page - 1)
-            st.rerun()
+        b1.button("◀", key="clients_tbl_prev", disabled=(page <= 0), on_click=_step_clients_page, args=(-1, total_pages))
         b2.caption(f"Page {page + 1} / {total_pages}")
-        if b3.button("▶", key="clients_tbl_next", disabled=(page >= total_pages - 1)):
-            st.session_state["clients_tbl_page"] = min(total_pages - 1, page + 1)
-            st.rerun()
-
-    # Re-read after any changes
-    psize = st.session_state["clients_tbl_psize"]
-    page = st.session_state["clients_tbl_page"]
-    start = page * psize
-    end = start + psize
-    return start, end
+        b3.button(
+            "▶",
+            key="clients_tbl_next",
+            disabled=(page >= total_pages - 1),
+            on_click=_step_clients_page,
+            args=(1, total_pages),
+        )
 
 
 def _cell_str(v) -> str:
@@ -76,6 +92,7 @@ def _edit_client(cid_i: int):
 
 def _archive_client(cid_i: int):
     m_clients.archive_client(int(cid_i))
+    invalidate_pager("archived_clients_tbl")
     st.session_state["active_page"] = "Clients"
     if "nav_page" in st.session_state:
         st.session_state["nav_page"] = "Clients"
@@ -83,17 +100,10 @@ def _archive_client(cid_i: int):
 
 def _list_industries():
     """
-    Reads industries from industries_lookup (active only).
+    Reads industries from industries_lookup (active only, cached).
     If the table doesn't exist yet, returns [] safely.
     """
-    try:
-        with get_conn() as con:
-            df = con.execute(
-                "SELECT name FROM industries_lookup WHERE is_active=TRUE ORDER BY name"
-            ).df()
-        return df["name"].tolist() if not df.empty else []
-    except Exception:
-        return []
+    return lookups.industries()
 
 
 def _clients_table_buttons(df: pd.DataFrame):
@@ -163,16 +173,27 @@ def _clients_table_buttons(df: pd.DataFrame):
 
 def render():
     st.title("👥 Clients")
-    search = st.text_input("Search Clients")
-    df = m_clients.list_clients(search)
+    s1, s2 = st.columns([3, 1])
+    search = s1.text_input("Search Clients", key="clients_search", on_change=_reset_clients_page)
+    sort_label = s2.selectbox("Sort by", list(_CLIENT_SORT_LABELS), key="clients_sort", on_change=_reset_clients_page)
+
+    _init_clients_pager()
+    psize = st.session_state["clients_tbl_psize"]
+    page = st.session_state["clients_tbl_page"]
+    sort = _CLIENT_SORT_LABELS[sort_label]
+    df, total = m_clients.list_clients(search, page=page, page_size=psize, sort=sort)
+    if df.empty and total > 0:
+        # The result set shrank under the current page: show its last page.
+        page = (total - 1) // psize
+        st.session_state["clients_tbl_page"] = page
+        df, total = m_clients.list_clients(search, page=page, page_size=psize, sort=sort)
 
-    start, end = _render_clients_pager(len(df))
-    df_slice = df.iloc[start:end].copy() if not df.empty else df
+    _render_clients_pager(total)
 
-    if df_slice.empty:
+    if df.empty:
         st.info("No clients found.")
     else:
-        _clients_table_buttons(df_slice)
+        _clients_table_buttons(df)
 
     with st.expander("➕ New Client"):
         crm_owners = m_clients.list_crm_owners()
@@ -1,6 +1,17 @@
 import streamlit as st
+from dataclasses import astuple
 from datetime import datetime, timedelta
-from core.database import get_conn
+from core.parallel import fetch_all
+from services import emissions, lookups
+from services.job_context import (
+    CrpDetails,
+    JobPlan,
+    ScopeConfig,
+    get_job_context,
+    save_crp_details,
+    save_job_plan,
+    save_scope_config,
+)
 
 
 def fmt_date(d):
@@ -18,67 +29,21 @@ def parse_ddmmyyyy(label: str, s: str):
 
 
 def _payment_terms():
-    with get_conn() as con:
-        df = con.execute(
-            "SELECT term_id, name FROM payment_terms_lookup WHERE is_active=TRUE ORDER BY term_id"
-        ).df()
-    if df.empty:
-        return [(1, "100% in advance")]
-    return list(df.itertuples(index=False, name=None))
+    return lookups.payment_terms()
 
 
 def _datasets():
     try:
-        with get_conn() as con:
-            df = con.execute(
-                "SELECT dataset_id, name, year, analysis_type, country FROM datasets ORDER BY year DESC, name"
-            ).df()
-        if df.empty:
-            return []
-        out = []
-        for _, r in df.iterrows():
-            out.append(
-                (
-                    int(r["dataset_id"]),
-                    f'[{int(r["dataset_id"])}] {r["name"]} — {r["analysis_type"]} — {r["country"]} {int(r["year"])}',
-                )
-            )
-        return out
+        df = lookups.datasets()
     except Exception:
         return []
-
-
-def _ensure_crp_rows(job_id: int, default_reporting_year: int):
-    with get_conn() as con:
-        con.execute(
-            """
-            INSERT INTO crp_job_details
-              (job_id, reporting_year, payment_term_id, is_benchmark, is_renewal, free_training_place)
-            VALUES
-              (%s, %s, 1, FALSE, FALSE, FALSE)
-            ON CONFLICT (job_id) DO NOTHING
-            """,
-            [job_id, int(default_reporting_year)],
+    return [
+        (
+            int(r["dataset_id"]),
+            f'[{int(r["dataset_id"])}] {r["name"]} — {r["analysis_type"]} — {r["country"]} {int(r["year"])}',
         )
-
-        con.execute(
-            """
-            INSERT INTO job_plan (job_id, override_dates)
-            VALUES (%s, FALSE)
-            ON CONFLICT (job_id) DO NOTHING
-            """,
-            [job_id],
-        )
-
-        for scope in ("Scope 1", "Scope 2", "Scope 3"):
-            con.execute(
-                """
-                INSERT INTO job_scope_config (job_id, scope, include_scope, dataset_id, factor_method)
-                VALUES (%s, %s, TRUE, NULL, NULL)
-                ON CONFLICT (job_id, scope) DO NOTHING
-                """,
-                [job_id, scope],
-            )
+        for _, r in df.iterrows()
+    ]
 
 
 def _calc_plan_dates(start_date):
@@ -102,62 +67,20 @@ def render():
             st.rerun()
         return
 
-    with get_conn() as con:
-        row = con.execute(
-            """
-            SELECT j.job_id, j.job_number, j.title, j.job_type, j.reporting_year, j.status,
-                   j.start_date, j.due_date, j.client_db_id, c.client_name
-            FROM jobs j
-            JOIN clients c ON c.db_id = j.client_db_id
-            WHERE j.job_id=%s
-            """,
-            [int(job_id)],
-        ).fetchone()
-
-    if not row:
+    loaded = fetch_all(
+        {
+            "ctx": lambda: get_job_context(int(job_id)),
+            "totals": lambda: emissions.job_scope_totals(int(job_id)),
+        }
+    )
+    ctx = loaded["ctx"]
+    if ctx is None:
         st.warning("Job not found.")
         st.session_state["selected_job_id"] = None
         return
 
-    (jid, job_number, title, job_type, reporting_year, status,
-     start_date, due_date, client_db_id, client_name) = row
-
-    _ensure_crp_rows(int(jid), int(reporting_year or st.session_state.get("working_year", 2026)))
-
-    with get_conn() as con:
-        crp = con.execute(
-            """
-            SELECT reporting_period_from, reporting_period_to, is_benchmark, reporting_year,
-                   is_renewal, client_order_number,
-                   client_contact_name, client_contact_email,
-                   report_signee_name, report_signee_position,
-                   payment_term_id, free_training_place,
-                   num_employees, turnover_gbp, premises_size_m2,
-                   vehicles_owned, vehicles_leased, premises_owned, premises_leased
-            FROM crp_job_details
-            WHERE job_id=%s
-            """,
-            [int(jid)],
-        ).fetchone()
-
-        plan = con.execute(
-            """
-            SELECT data_collection_due, first_draft_due, final_report_due, override_dates
-            FROM job_plan
-            WHERE job_id=%s
-            """,
-            [int(jid)],
-        ).fetchone()
-
-        scopes = con.execute(
-            """
-            SELECT scope, include_scope, dataset_id, factor_method
-            FROM job_scope_config
-            WHERE job_id=%s
-            ORDER BY scope
-            """,
-            [int(jid)],
-        ).df()
+    jid, job_number, client_name, start_date = ctx.job_id, ctx.job_number, ctx.client_name, ctx.start_date
+    crp, plan = ctx.crp, ctx.plan
 
     st.caption(f"**{job_number}** — {client_name}")
 
@@ -175,7 +98,7 @@ def render():
          signee_name, signee_pos,
          payment_term_id, free_training,
          num_emp, turnover_gbp, prem_m2,
-         veh_own, veh_lease, prem_own, prem_lease) = crp
+         veh_own, veh_lease, prem_own, prem_lease) = astuple(crp)
 
         pt = _payment_terms()
         pt_ids = [p[0] for p in pt]
@@ -248,58 +171,30 @@ def render():
                     st.error(str(e))
                     st.stop()
 
-                with get_conn() as con:
-                    con.execute(
-                        "UPDATE jobs SET reporting_year=%s WHERE job_id=%s",
-                        [int(new_year), int(jid)],
-                    )
-
-                    con.execute(
-                        """
-                        UPDATE crp_job_details
-                        SET reporting_period_from=%s,
-                            reporting_period_to=%s,
-                            is_benchmark=%s,
-                            reporting_year=%s,
-                            is_renewal=%s,
-                            client_order_number=%s,
-                            client_contact_name=%s,
-                            client_contact_email=%s,
-                            report_signee_name=%s,
-                            report_signee_position=%s,
-                            payment_term_id=%s,
-                            free_training_place=%s,
-                            num_employees=%s,
-                            turnover_gbp=%s,
-                            premises_size_m2=%s,
-                            vehicles_owned=%s,
-                            vehicles_leased=%s,
-                            premises_owned=%s,
-                            premises_leased=%s,
-                            updated_at=NOW()
-                        WHERE job_id=%s
-                        """,
-                        [
-                            new_rp_from, new_rp_to,
-                            bool(new_is_bench), int(new_year),
-                            bool(new_is_renewal),
-                            (new_client_order or "").strip() or None,
-                            (new_contact_name or "").strip() or None,
-                            (new_contact_email or "").strip() or None,
-                            (new_signee_name or "").strip() or None,
-                            (new_signee_pos or "").strip() or None,
-                            int(new_payment_term_id),
-                            bool(new_free_training),
-                            int(new_num_emp) if new_num_emp is not None else None,
-                            float(new_turnover) if new_turnover is not None else None,
-                            float(new_prem_m2) if new_prem_m2 is not None else None,
-                            int(new_veh_own) if new_veh_own is not None else None,
-                            int(new_veh_lease) if new_veh_lease is not None else None,
-                            int(new_prem_own) if new_prem_own is not None else None,
-                            int(new_prem_lease) if new_prem_lease is not None else None,
-                            int(jid),
-                        ],
-                    )
+                save_crp_details(
+                    jid,
+                    CrpDetails(
+                        reporting_period_from=new_rp_from,
+                        reporting_period_to=new_rp_to,
+                        is_benchmark=bool(new_is_bench),
+                        reporting_year=int(new_year),
+                        is_renewal=bool(new_is_renewal),
+                        client_order_number=(new_client_order or "").strip() or None,
+                        client_contact_name=(new_contact_name or "").strip() or None,
+                        client_contact_email=(new_contact_email or "").strip() or None,
+                        report_signee_name=(new_signee_name or "").strip() or None,
+                        report_signee_position=(new_signee_pos or "").strip() or None,
+                        payment_term_id=int(new_payment_term_id),
+                        free_training_place=bool(new_free_training),
+                        num_employees=int(new_num_emp) if new_num_emp is not None else None,
+                        turnover_gbp=float(new_turnover) if new_turnover is not None else None,
+                        premises_size_m2=float(new_prem_m2) if new_prem_m2 is not None else None,
+                        vehicles_owned=int(new_veh_own) if new_veh_own is not None else None,
+                        vehicles_leased=int(new_veh_lease) if new_veh_lease is not None else None,
+                        premises_owned=int(new_prem_own) if new_prem_own is not None else None,
+                        premises_leased=int(new_prem_lease) if new_prem_lease is not None else None,
+                    ),
+                )
                 st.success("Saved.")
                 st.rerun()
 
@@ -308,7 +203,7 @@ def render():
     # -------------------------
     with tab2:
         st.subheader("Milestones")
-        data_due, draft_due, final_due, override_dates = plan
+        data_due, draft_due, final_due, override_dates = astuple(plan)
         def_data, def_draft, def_final = _calc_plan_dates(start_date)
 
         with st.form("job_plan_form", clear_on_submit=False):
@@ -344,19 +239,7 @@ def render():
                 st.rerun()
 
             if save:
-                with get_conn() as con:
-                    con.execute(
-                        """
-                        UPDATE job_plan
-                        SET data_collection_due=%s,
-                            first_draft_due=%s,
-                            final_report_due=%s,
-                            override_dates=%s,
-                            updated_at=NOW()
-                        WHERE job_id=%s
-                        """,
-                        [save_data, save_draft, save_final, bool(new_override), int(jid)],
-                    )
+                save_job_plan(jid, JobPlan(save_data, save_draft, save_final, bool(new_override)))
                 st.success("Saved.")
                 st.rerun()
 
@@ -371,15 +254,15 @@ def render():
         ds_labels = [d[1] for d in ds]
         methods = ["Activity", "Spend", "Custom"]
 
-        if scopes.empty:
+        if not ctx.scopes:
             st.info("No scope config rows found. (They will be auto-created on load.)")
         else:
             with st.form("scope_cfg_form", clear_on_submit=False):
                 for scope_name in ["Scope 1", "Scope 2", "Scope 3"]:
-                    row = scopes[scopes["scope"] == scope_name]
-                    include = bool(row.iloc[0]["include_scope"]) if not row.empty else True
-                    dataset_id = row.iloc[0]["dataset_id"] if not row.empty else None
-                    method = row.iloc[0]["factor_method"] if not row.empty else None
+                    cfg = ctx.scope(scope_name)
+                    include = cfg.include_scope if cfg else True
+                    dataset_id = cfg.dataset_id if cfg else None
+                    method = cfg.factor_method if cfg else None
 
                     st.markdown(f"#### {scope_name}")
                     c1, c2, c3 = st.columns([1.2, 4, 1.5])
@@ -406,24 +289,17 @@ def render():
                 save = st.form_submit_button("Save scope configuration")
 
             if save:
-                with get_conn() as con:
-                    for scope_name in ["Scope 1", "Scope 2", "Scope 3"]:
-                        inc = bool(st.session_state.get(f"inc_{scope_name}", True))
-                        ds_pick = st.session_state.get(f"ds_{scope_name}")
-                        if ds_pick and ds_pick != "(None)" and ds_pick in ds_labels:
-                            dsid = ds_ids[ds_labels.index(ds_pick)]
-                        else:
-                            dsid = None
-                        meth = st.session_state.get(f"m_{scope_name}", "Activity")
-
-                        con.execute(
-                            """
-                            UPDATE job_scope_config
-                            SET include_scope=%s, dataset_id=%s, factor_method=%s
-                            WHERE job_id=%s AND scope=%s
-                            """,
-                            [inc, dsid, meth, int(jid), scope_name],
-                        )
+                configs = []
+                for scope_name in ["Scope 1", "Scope 2", "Scope 3"]:
+                    inc = bool(st.session_state.get(f"inc_{scope_name}", True))
+                    ds_pick = st.session_state.get(f"ds_{scope_name}")
+                    if ds_pick and ds_pick != "(None)" and ds_pick in ds_labels:
+                        dsid = ds_ids[ds_labels.index(ds_pick)]
+                    else:
+                        dsid = None
+                    meth = st.session_state.get(f"m_{scope_name}", "Activity")
+                    configs.append(ScopeConfig(scope_name, inc, dsid, meth))
+                save_scope_config(jid, configs)
                 st.success("Saved.")
                 st.rerun()
 
@@ -432,12 +308,12 @@ def render():
         st.subheader("Open scope data entry")
 
         include_flags = {"Scope 1": True, "Scope 2": True, "Scope 3": True}
-        try:
-            if not scopes.empty:
-                for _, rr in scopes.iterrows():
-                    include_flags[str(rr["scope"])] = bool(rr["include_scope"])
-        except Exception:
-            pass
+        include_flags.update({cfg.scope: cfg.include_scope for cfg in ctx.scopes})
+
+        totals = loaded["totals"]
+        m = st.columns(3)
+        for i, scope_name in enumerate(["Scope 1", "Scope 2", "Scope 3"]):
+            m[i].metric(f"{scope_name} tCO2e", round(totals.get(scope_name, 0.0), 4))
 
         b = st.columns(3)
         if b[0].button("📦 Open Scope 1", disabled=not include_flags.get("Scope 1", True)):
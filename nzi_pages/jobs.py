@@ -1,6 +1,8 @@
 import streamlit as st
 from datetime import datetime
 from core.database import get_conn
+from services import lookups
+from services.job_context import create_job_rows, invalidate_job
 
 
 # ---------- Date helpers ----------
@@ -20,15 +22,11 @@ def parse_ddmmyyyy(label: str, s: str):
 
 # ---------- Lookups ----------
 def _job_types():
-    with get_conn() as con:
-        df = con.execute("SELECT name FROM job_types WHERE is_active=TRUE ORDER BY name").df()
-    return df["name"].tolist() if not df.empty else ["CRP", "Consultancy", "LCA", "Training"]
+    return lookups.job_types()
 
 
 def _subjects():
-    with get_conn() as con:
-        df = con.execute("SELECT name FROM time_subjects WHERE is_active=TRUE ORDER BY name").df()
-    return df["name"].tolist() if not df.empty else ["Research", "Data Collection", "Analysis", "Reporting"]
+    return lookups.time_subjects()
 
 
 def _clients():
@@ -99,7 +97,7 @@ def render():
                     client_id = int(cdf.loc[cdf["client_name"] == client_name, "db_id"].iloc[0])
 
                     # Insert first to get job_id (Postgres IDENTITY/SERIAL)
-                    with get_conn() as con:
+                    with get_conn(transactional=True) as con:
                         row = con.execute(
                             """
                             INSERT INTO jobs
@@ -127,7 +125,10 @@ def render():
                             "UPDATE jobs SET job_number=%s WHERE job_id=%s",
                             [job_number, job_id],
                         )
+                        create_job_rows(con, job_id)
 
+                    from components.tables import invalidate_pager
+                    invalidate_pager("client_jobs")
                     st.success(f"Job {job_number} created.")
                     st.rerun()
 
@@ -174,6 +175,7 @@ def render():
             if c[7].button("🗄️", key=f"job_arch_{jid}", disabled=(str(r["status"]) == "Archived")):
                 with get_conn() as con:
                     con.execute("UPDATE jobs SET status='Archived' WHERE job_id=%s", [jid])
+                invalidate_job(jid)
                 st.toast("Job archived")
                 st.rerun()
 
@@ -252,6 +254,7 @@ def render():
                                 int(edit_id),
                             ],
                         )
+                    invalidate_job(int(edit_id))
                     st.success("Saved.")
                     st.session_state["edit_job_id"] = None
                     st.rerun()
@@ -292,27 +295,32 @@ def render():
                         [jid, user_id, subj, wdate, minutes, notes or None],
                     )
 
+                from components.tables import invalidate_pager
+                invalidate_pager("time_logs_tbl")
                 st.success("Time logged.")
                 st.rerun()
 
-    with get_conn() as con:
-        logs = con.execute(
-            """
-            SELECT tl.time_id, tl.work_date, tl.minutes, tl.subject, tl.notes,
-                   j.job_number, c.client_name
-            FROM time_logs tl
-            JOIN jobs j ON j.job_id = tl.job_id
-            JOIN clients c ON c.db_id = j.client_db_id
-            ORDER BY tl.work_date DESC, tl.time_id DESC
-            """
-        ).df()
-
-    if not logs.empty:
+    def _fmt_logs(logs):
         logs["hours"] = (logs["minutes"] / 60).round(2)
         logs["work_date"] = logs["work_date"].apply(lambda d: fmt_date(d))
-
-    try:
-        from components.tables import table_with_pager
-        table_with_pager(logs, "Time Logs", key="time_logs_tbl")
-    except Exception:
-        st.dataframe(logs, use_container_width=True)
+        return logs
+
+    from components.tables import query_table_with_pager
+    query_table_with_pager(
+        """
+        SELECT tl.time_id, tl.work_date, tl.minutes, tl.subject, tl.notes,
+               j.job_number, c.client_name
+        FROM time_logs tl
+        JOIN jobs j ON j.job_id = tl.job_id
+        JOIN clients c ON c.db_id = j.client_db_id
+        """,
+        [],
+        "Time Logs",
+        key="time_logs_tbl",
+        order_by={
+            "Newest first": "work_date DESC, time_id DESC",
+            "Oldest first": "work_date, time_id",
+            "Longest first": "minutes DESC, time_id DESC",
+        },
+        transform=_fmt_logs,
+    )
@@ -1,92 +1,36 @@
+import pandas as pd
 import streamlit as st
 from datetime import datetime
 from core.database import get_conn
+from core.schema import has_column, table_columns
+from services import emissions
+from services.factor_hierarchy import get_factor_hierarchy
+from services.factor_search import search_factors
+from services.job_context import get_job_context
+from utils.units import normalise_ghg_unit
+from services.scope_rows import (
+    calc_row_tco2e as _calc_row_tco2e,
+    insert_job_scope_row as _insert_job_scope_row,
+    save_scope_row_edits as _save_scope_row_edits,
+    set_rows_enabled as _set_rows_enabled,
+)
 
 
-def _ghg_unit_default(u: str | None) -> str:
-    s = (u or "").strip()
-    return s or "kgCO2e"
-
-
-def _kg_to_t(value: float) -> float:
-    return value / 1000.0
-
-
-def _to_tco2e(amount: float, factor: float, ghg_unit: str | None) -> float:
-    """Convert amount*factor to tonnes CO2e based on ghg_unit."""
-    ghg = (_ghg_unit_default(ghg_unit)).replace(" ", "").lower()
-    emissions = float(amount) * float(factor)
-    # Default DESNZ factors are kgCO2e
-    if ghg.startswith("kg"):
-        return _kg_to_t(emissions)
-    # if already tonnes
-    if ghg.startswith("t") or "tonne" in ghg:
-        return emissions
-    # conservative fallback: assume kg if unknown
-    return _kg_to_t(emissions)
-
 
 
 def _col_exists(*args) -> bool:
-    """Check whether a column exists.
+    """Check whether a column exists (resolved from the in-memory schema catalog).
     Supports two call styles:
       - _col_exists(table, col)
-      - _col_exists(con, table, col)
+      - _col_exists(con, table, col)   (con is accepted for compatibility, not used)
     """
     if len(args) == 2:
         table, col = args
-        with get_conn() as con:
-            r = con.execute(
-                """
-                SELECT 1
-                FROM information_schema.columns
-                WHERE table_name=%s AND column_name=%s
-                """,
-                [table, col],
-            ).fetchone()
-            return bool(r)
     elif len(args) == 3:
-        con, table, col = args
-        r = con.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name=%s AND column_name=%s
-            """,
-            [table, col],
-        ).fetchone()
-        return bool(r)
+        _, table, col = args
     else:
         raise TypeError("_col_exists() takes 2 or 3 positional arguments")
-
-def _get_job_context(job_id: int):
-    with get_conn() as con:
-        row = con.execute(
-            """
-            SELECT j.job_number, j.title, j.start_date, j.status, c.client_name
-            FROM jobs j
-            JOIN clients c ON c.db_id = j.client_db_id
-            WHERE j.job_id=%s
-            """,
-            [int(job_id)],
-        ).fetchone()
-    return row
-
-
-def _get_scope_config(job_id: int, scope: str):
-    with get_conn() as con:
-        r = con.execute(
-            """
-            SELECT include_scope, dataset_id, factor_method
-            FROM job_scope_config
-            WHERE job_id=%s AND scope=%s
-            """,
-            [int(job_id), scope],
-        ).fetchone()
-    if not r:
-        return True, None, "Activity"
-    return bool(r[0]), r[1], r[2] or "Activity"
-
+    return has_column(table, col)
 
 
 def _get_dataset_year(dataset_id: int | None):
@@ -99,44 +43,36 @@ def _get_dataset_year(dataset_id: int | None):
     except Exception:
         return None
 
-def _search_factors(dataset_id, scope: str, query: str, year: int | None = None, all_years: bool = False):
-    """
-    Best-effort factor lookup search.
-
-    Supports newer NZI Pro schema (factor_lookup.db_id, level_1..4, column_text, uom, ghg_unit, year)
-    while remaining compatible with older schemas (factor_id, category/subcategory, unit, name).
-    """
-    if not query:
-        return []
 
-    # Column existence checks (safe across schema variants)
-    has_dataset = _col_exists("factor_lookup", "dataset_id")
-    has_scope = _col_exists("factor_lookup", "scope")
-    has_year = _col_exists("factor_lookup", "year")
+def _legacy_search_df(cols, dataset_id, scope: str, query: str, year: int | None, all_years: bool):
+    """ILIKE search for older factor_lookup schemas (factor_id, category/subcategory, unit, name)."""
+    has_dataset = "dataset_id" in cols
+    has_scope = "scope" in cols
+    has_year = "year" in cols
 
     # ID column variants
-    has_factor_id = _col_exists("factor_lookup", "factor_id")
-    has_db_id = _col_exists("factor_lookup", "db_id")
+    has_factor_id = "factor_id" in cols
+    has_db_id = "db_id" in cols
     id_col = "factor_id" if has_factor_id else ("db_id" if has_db_id else None)
     if id_col is None:
-        return []
+        return None
 
     # New schema columns
-    has_l1 = _col_exists("factor_lookup", "level_1")
-    has_l2 = _col_exists("factor_lookup", "level_2")
-    has_l3 = _col_exists("factor_lookup", "level_3")
-    has_l4 = _col_exists("factor_lookup", "level_4")
-    has_coltext = _col_exists("factor_lookup", "column_text")
-    has_uom = _col_exists("factor_lookup", "uom")
-    has_ghg = _col_exists("factor_lookup", "ghg_unit")
+    has_l1 = "level_1" in cols
+    has_l2 = "level_2" in cols
+    has_l3 = "level_3" in cols
+    has_l4 = "level_4" in cols
+    has_coltext = "column_text" in cols
+    has_uom = "uom" in cols
+    has_ghg = "ghg_unit" in cols
 
     # Older schema columns
-    has_category = _col_exists("factor_lookup", "category")
-    has_subcat = _col_exists("factor_lookup", "subcategory")
-    has_unit = _col_exists("factor_lookup", "unit")
-    has_name = _col_exists("factor_lookup", "name")
+    has_category = "category" in cols
+    has_subcat = "subcategory" in cols
+    has_unit = "unit" in cols
+    has_name = "name" in cols
 
-    has_factor = _col_exists("factor_lookup", "factor")
+    has_factor = "factor" in cols
 
     # Build select list safely (alias id to factor_id)
     select_cols = []
@@ -195,12 +131,15 @@ def _search_factors(dataset_id, scope: str, query: str, year: int | None = None,
         wh.append("year=%s")
         params.append(int(year))
 
+    if "is_active" in cols:
+        wh.append("is_active=TRUE")
+
     # Search text across likely text columns
     like = f"%{query.strip()}%"
     search_terms = []
 
     for col in ["name", "category", "subcategory", "level_1", "level_2", "level_3", "level_4", "column_text"]:
-        if _col_exists("factor_lookup", col):
+        if col in cols:
             search_terms.append(f"{col} ILIKE %s")
             params.append(like)
 
@@ -212,10 +151,44 @@ def _search_factors(dataset_id, scope: str, query: str, year: int | None = None,
 
     try:
         with get_conn() as con:
-            df = con.execute(sql, params).df()
+            return con.execute(sql, params).df()
     except Exception:
+        return None
+
+
+def _search_factors(dataset_id, scope: str, query: str, year: int | None = None, all_years: bool = False):
+    """
+    Best-effort factor lookup search.
+
+    Supports newer NZI Pro schema (factor_lookup.db_id, level_1..4, column_text, uom, ghg_unit, year)
+    while remaining compatible with older schemas (factor_id, category/subcategory, unit, name).
+    """
+    if not query:
         return []
 
+    # Column existence checks (safe across schema variants)
+    cols = table_columns("factor_lookup")
+    has_dataset = "dataset_id" in cols
+    has_scope = "scope" in cols
+    has_year = "year" in cols
+
+    if {"db_id", "level_1", "column_text"} <= cols:
+        # Current schema: ranked, indexed search (services.factor_search).
+        try:
+            df = search_factors(
+                query,
+                dataset_id=dataset_id if has_dataset else None,
+                scope=scope if has_scope else None,
+                year=None if (all_years or not has_year) else year,
+                page_size=200,
+            ).df.rename(columns={"db_id": "factor_id"})
+        except Exception:
+            return []
+    else:
+        df = _legacy_search_df(cols, dataset_id, scope, query, year, all_years)
+        if df is None:
+            return []
+
     results = []
     for _, r in df.iterrows():
         fid = int(r.get("factor_id"))
@@ -266,89 +239,8 @@ def _search_factors(dataset_id, scope: str, query: str, year: int | None = None,
     return results
 
 
-
-
-# -------------------------
-# Phase A helpers: cascading factor selection
-# -------------------------
-def _factor_rows_for_levels(dataset_id: int, scope: str, l1=None, l2=None, l3=None, l4=None):
-    """Return factor_lookup rows matching the selected hierarchy levels.
-
-    Uses new schema columns level_1..level_4 when available, otherwise falls back to
-    category/subcategory/name where possible.
-    """
-    has_l1 = _col_exists("factor_lookup", "level_1")
-    has_l2 = _col_exists("factor_lookup", "level_2")
-    has_l3 = _col_exists("factor_lookup", "level_3")
-    has_l4 = _col_exists("factor_lookup", "level_4")
-    has_coltext = _col_exists("factor_lookup", "column_text")
-    has_uom = _col_exists("factor_lookup", "uom")
-    has_ghg = _col_exists("factor_lookup", "ghg_unit")
-    has_original = _col_exists("factor_lookup", "original_id")
-
-    # ID column variants
-    has_factor_id = _col_exists("factor_lookup", "factor_id")
-    has_db_id = _col_exists("factor_lookup", "db_id")
-    id_col = "factor_id" if has_factor_id else ("db_id" if has_db_id else None)
-    if id_col is None:
-        return None
-
-    sel = [f"{id_col} AS factor_id"]
-    if has_original:
-        sel.append("original_id")
-    if _col_exists("factor_lookup", "year"):
-        sel.append("year")
-
-    if has_l1: sel.append("level_1")
-    if has_l2: sel.append("level_2")
-    if has_l3: sel.append("level_3")
-    if has_l4: sel.append("level_4")
-    if has_coltext: sel.append("column_text")
-    if has_uom: sel.append("uom")
-    if has_ghg: sel.append("ghg_unit")
-    if _col_exists("factor_lookup", "factor"):
-        sel.append("factor")
-
-    # Fallback columns for older schemas
-    if (not has_l1) and _col_exists("factor_lookup", "category"):
-        sel.append("category")
-    if (not has_l2) and _col_exists("factor_lookup", "subcategory"):
-        sel.append("subcategory")
-    if (not has_coltext) and _col_exists("factor_lookup", "name"):
-        sel.append("name")
-    if (not has_uom) and _col_exists("factor_lookup", "unit"):
-        sel.append("unit")
-
-    wh = ["dataset_id=%s"]
-    params = [int(dataset_id)]
-
-    if _col_exists("factor_lookup", "scope"):
-        wh.append("scope=%s")
-        params.append(scope)
-
-    # Apply hierarchy filters (prefer level_*, else fallback)
-    if l1:
-        if has_l1:
-            wh.append("level_1=%s"); params.append(l1)
-        elif _col_exists("factor_lookup", "category"):
-            wh.append("category=%s"); params.append(l1)
-    if l2:
-        if has_l2:
-            wh.append("level_2=%s"); params.append(l2)
-        elif _col_exists("factor_lookup", "subcategory"):
-            wh.append("subcategory=%s"); params.append(l2)
-    if l3 and has_l3:
-        wh.append("level_3=%s"); params.append(l3)
-    if l4 and has_l4:
-        wh.append("level_4=%s"); params.append(l4)
-
-    sql = f"SELECT {', '.join(sel)} FROM factor_lookup WHERE {' AND '.join(wh)} ORDER BY factor_id DESC"
-    with get_conn() as con:
-        return con.execute(sql, params).df()
-
-
 def _job_scope_rows_df(job_id: int, scope: str, include_disabled: bool = False):
-    """Return job_scope_rows for a job+scope. Adds a 'tco2e_used' column.
+    """Return job_scope_rows for a job+scope, with 'tco2e_used' (override else calc) from SQL.
     Safe if table doesn't exist yet (returns empty df).
     """
     where = "" if include_disabled else "AND enabled=TRUE"
@@ -356,11 +248,12 @@ def _job_scope_rows_df(job_id: int, scope: str, include_disabled: bool = False):
         SELECT
             row_id, job_id, scope, dataset_id,
             factor_db_id, original_id,
-            level_1, level_2, level_3, level_4,
+            level_1, level_2, level_3, level_4, column_text,
             report_label, notes,
             enabled,
             qty, uom, factor, ghg_unit,
             calc_tco2e, override_tco2e, override_reason,
+            COALESCE(override_tco2e, calc_tco2e, 0) AS tco2e_used,
             created_at, updated_at
         FROM job_scope_rows
         WHERE job_id=%s AND scope=%s
@@ -369,42 +262,121 @@ def _job_scope_rows_df(job_id: int, scope: str, include_disabled: bool = False):
     """
     try:
         with get_conn() as con:
-            df = con.execute(sql, [int(job_id), str(scope)]).df()
+            return con.execute(sql, [int(job_id), str(scope)]).df()
     except Exception:
-        import pandas as pd
         return pd.DataFrame()
 
-    if df is None or df.empty:
-        return df
 
-    # used emissions = override if present else calc
-    import pandas as pd
-    df["tco2e_used"] = df["override_tco2e"].where(df["override_tco2e"].notna(), df["calc_tco2e"])
-    # ensure numeric
-    df["tco2e_used"] = pd.to_numeric(df["tco2e_used"], errors="coerce").fillna(0.0)
-    return df
+# Scope rows grid: one st.data_editor instead of a widget row per record.
+_GRID_COLUMNS = [
+    "select", "row_id", "enabled", "report_label", "activity", "factor_text", "original_id",
+    "qty", "calc_tco2e", "override_tco2e", "override_reason", "tco2e_used", "notes",
+]
+_GRID_EDITABLE = ["select", "enabled", "report_label", "qty", "override_tco2e", "override_reason", "notes"]
+
+
+def _rows_grid_frame(sdf):
+    """Grid view of _job_scope_rows_df output (built column-wise, no per-row Python)."""
+    levels = sdf[["level_1", "level_2", "level_3", "level_4"]].fillna("").astype(str)
+    activity = levels["level_1"].str.cat([levels[c] for c in ("level_2", "level_3", "level_4")], sep=" / ")
+    activity = activity.str.replace(r"( / )+$", "", regex=True) + " — " + sdf["column_text"].fillna("").astype(str)
+    grid = sdf.assign(
+        select=False,
+        enabled=sdf["enabled"].fillna(True).astype(bool),
+        activity=activity,
+        factor_text=sdf["factor"].astype(str) + " " + sdf["ghg_unit"].fillna("").map(normalise_ghg_unit),
+    )
+    return grid[_GRID_COLUMNS + ["factor", "ghg_unit"]].reset_index(drop=True)
+
+
+def _grid_changes(base, edited):
+    """Rows whose editable values differ between the grid's input and its output."""
+    moved = None
+    for c in ("enabled", "qty", "override_tco2e"):
+        a, b = base[c], edited[c]
+        diff = (a != b) & ~(a.isna() & b.isna())
+        moved = diff if moved is None else moved | diff
+    for c in ("report_label", "override_reason", "notes"):
+        moved |= base[c].fillna("").astype(str) != edited[c].fillna("").astype(str)
+    return edited.loc[moved]
+
+
+def _render_rows_grid(job_id: int, scope: str):
+    show_disabled = st.checkbox("Show disabled rows", value=True, key=f"show_dis_{scope}")
+    sdf = _job_scope_rows_df(job_id, scope, include_disabled=show_disabled)
+    if sdf.empty:
+        st.info("No rows yet.")
+        return
 
+    # Bumped after each save so the editor starts clean on the new data.
+    ver_key = f"rows_grid_ver_{scope}"
+    base = _rows_grid_frame(sdf)
+    edited = st.data_editor(
+        base,
+        key=f"rows_grid_{scope}_{job_id}_{st.session_state.get(ver_key, 0)}",
+        column_order=_GRID_COLUMNS,
+        column_config={
+            "select": st.column_config.CheckboxColumn("Sel", width="small"),
+            "row_id": st.column_config.NumberColumn("Row", width="small"),
+            "enabled": st.column_config.CheckboxColumn("On", width="small"),
+            "report_label": st.column_config.TextColumn("Label"),
+            "activity": st.column_config.TextColumn("Activity", width="large"),
+            "factor_text": st.column_config.TextColumn("Factor"),
+            "original_id": st.column_config.TextColumn("Factor ID"),
+            "qty": st.column_config.NumberColumn("Qty", min_value=0.0),
+            "calc_tco2e": st.column_config.NumberColumn("Calc tCO2e", format="%.4f"),
+            "override_tco2e": st.column_config.NumberColumn("Override tCO2e", min_value=0.0, format="%.4f"),
+            "override_reason": st.column_config.TextColumn("Override reason"),
+            "tco2e_used": st.column_config.NumberColumn("Used tCO2e", format="%.4f"),
+            "notes": st.column_config.TextColumn("Notes"),
+        },
+        disabled=[c for c in _GRID_COLUMNS if c not in _GRID_EDITABLE],
+        num_rows="fixed",
+        hide_index=True,
+        use_container_width=True,
+    )
 
+    selected = edited.loc[edited["select"], "row_id"].astype(int).tolist()
+    changed = _grid_changes(base, edited)
+    a = st.columns(4)
+    save = a[0].button(f"💾 Save {len(changed)} change(s)", disabled=changed.empty, key=f"rows_grid_save_{scope}")
+    # Bulk actions reload the grid, which would drop pending edits, so they wait for Save.
+    pending = "Save the pending changes first." if not changed.empty else None
+    disable = a[1].button(
+        f"Disable {len(selected)} selected", disabled=not selected or bool(pending), help=pending,
+        key=f"rows_grid_disable_{scope}",
+    )
+    enable = a[2].button(
+        f"Enable {len(selected)} selected", disabled=not selected or bool(pending), help=pending,
+        key=f"rows_grid_enable_{scope}",
+    )
+    delete = a[3].button(
+        f"🗑️ Delete {len(selected)} selected", disabled=not selected or bool(pending), help=pending,
+        key=f"rows_grid_delete_{scope}",
+    )
+    if not (save or disable or enable or delete):
+        return
 
-def _factor_cascade_options(dataset_id: int, scope: str):
-    """Return distinct Level 1 options for a dataset+scope."""
-    if _col_exists("factor_lookup", "level_1"):
-        col = "level_1"
-    elif _col_exists("factor_lookup", "category"):
-        col = "category"
-    else:
-        return []
+    if disable or enable:
+        n = _set_rows_enabled(job_id, scope, selected, bool(enable))
+        st.session_state[ver_key] = st.session_state.get(ver_key, 0) + 1
+        st.toast(f"{n} row(s) {'enabled' if enable else 'disabled'}")
+        st.rerun()
 
-    sql = f"SELECT DISTINCT {col} AS l1 FROM factor_lookup WHERE dataset_id=%s" + (" AND scope=%s" if _col_exists("factor_lookup", "scope") else "") + " ORDER BY l1"
-    params = [int(dataset_id)]
-    if _col_exists("factor_lookup", "scope"):
-        params.append(scope)
+    changed = changed.copy()
+    # An override of 0 means "no override", as in the Add row form.
+    no_override = changed["override_tco2e"].isna() | (changed["override_tco2e"] <= 0)
+    changed.loc[no_override, ["override_tco2e", "override_reason"]] = None
+    missing_reason = ~no_override & (changed["override_reason"].fillna("").astype(str).str.strip() == "")
+    if missing_reason.any() and not delete:
+        st.error(f"Override reason is required when override is set (rows {changed.loc[missing_reason, 'row_id'].tolist()}).")
+        return
+
+    updated, deleted = _save_scope_row_edits(job_id, scope, changed, delete_ids=selected if delete else ())
+    st.session_state[ver_key] = st.session_state.get(ver_key, 0) + 1
+    st.toast(f"{updated} row(s) updated, {deleted} deleted")
+    st.rerun()
 
-    with get_conn() as con:
-        df = con.execute(sql, params).df()
-    if df.empty:
-        return []
-    return [x for x in df["l1"].tolist() if x is not None and str(x).strip() != ""]
 
 def _list_entries(job_id: int, scope: str, include_archived: bool):
     where = "" if include_archived else "AND is_archived=FALSE"
@@ -423,6 +395,149 @@ def _list_entries(job_id: int, scope: str, include_archived: bool):
     return df
 
 
+@st.fragment
+def _add_row_fragment(job_id: int, scope: str, dataset_id: int):
+    """Add row cascade, factor line picker and inputs.
+
+    Runs as a fragment: a dropdown change reruns only this function (which
+    reads nothing but the cached factor tree), not the page's job context
+    queries or the rows grid. Adding a row reruns the whole app so totals
+    and the grid pick it up.
+    """
+    # NOTE: do NOT use st.form here – we need dynamic cascading dropdowns.
+    base = f"{scope}_addrow"
+
+    def _reset(*names):
+        for n in names:
+            st.session_state.pop(f"{base}_{n}", None)
+
+    # Current selections (stored in session_state so dependent dropdowns refresh immediately)
+    l1_key = f"{base}_l1"
+    l2_key = f"{base}_l2"
+    l3_key = f"{base}_l3"
+    l4_key = f"{base}_l4"
+    f_key  = f"{base}_factor"
+    qty_key = f"{base}_qty"
+    en_key = f"{base}_enabled"
+    lbl_key = f"{base}_label"
+    notes_key = f"{base}_notes"
+    ovr_key = f"{base}_override"
+    ovr_reason_key = f"{base}_override_reason"
+
+    # Determine which schema is available in factor_lookup
+    levels_exist = _col_exists("factor_lookup", "level_1")
+
+    # One cached tree per dataset+scope answers every dropdown below.
+    tree = get_factor_hierarchy(int(dataset_id), scope)
+
+    if levels_exist:
+        l1_opts = tree.options()
+        l1 = st.selectbox(
+            "Category (Level 1) *",
+            l1_opts,
+            key=l1_key,
+            on_change=lambda: _reset("l2", "l3", "l4", "factor"),
+        )
+
+        l2_opts = tree.options(l1) if l1 else []
+        l2 = st.selectbox(
+            "Level 2",
+            l2_opts,
+            key=l2_key,
+            on_change=lambda: _reset("l3", "l4", "factor"),
+        )
+
+        l3_opts = tree.options(l1, l2) if (l1 and l2) else []
+        l3 = st.selectbox(
+            "Level 3",
+            l3_opts,
+            key=l3_key,
+            on_change=lambda: _reset("l4", "factor"),
+        )
+
+        l4_opts = tree.options(l1, l2, l3) if (l1 and l2 and l3) else []
+        l4 = st.selectbox("Level 4", l4_opts, key=l4_key, on_change=lambda: _reset("factor"))
+
+        fdf = tree.lines(l1, l2, l3, l4) if l1 else None
+    else:
+        # Legacy schema: category/subcategory
+        l1_opts = tree.options()
+        l1 = st.selectbox(
+            "Category *",
+            l1_opts,
+            key=l1_key,
+            on_change=lambda: _reset("l2", "factor"),
+        )
+
+        l2_opts = tree.options(l1) if l1 else []
+        l2 = st.selectbox("Subcategory", l2_opts, key=l2_key, on_change=lambda: _reset("factor"))
+
+        fdf = tree.lines(l1, l2) if l1 else None
+
+    if fdf is None or fdf.empty:
+        st.info("Pick a category (and deeper levels where available) to load factor lines.")
+        st.button("Add row", disabled=True, key=f"{base}_add_disabled")
+    else:
+        # Choose specific factor line
+        fdf = fdf.copy()
+        disp = (
+            fdf["column_text"].fillna("").astype(str).str.strip()
+            + " — "
+            + fdf["uom"].fillna("").astype(str).str.strip()
+        ).tolist()
+        choice = st.selectbox("Factor line *", disp, key=f_key)
+        frow = fdf.iloc[disp.index(choice)]
+
+        st.caption(f"ID: {frow.get('original_id')} • UOM: {frow.get('uom')} • Factor: {frow.get('factor')} ({normalise_ghg_unit(frow.get('ghg_unit'))})")
+
+        c1, c2, c3 = st.columns(3)
+        qty = c1.number_input("Quantity", min_value=0.0, value=float(st.session_state.get(qty_key, 0.0)), step=1.0, key=qty_key)
+        enabled = c2.checkbox("Enabled", value=bool(st.session_state.get(en_key, True)), key=en_key)
+        report_label = c3.text_input("Report label", key=lbl_key)
+
+        notes = st.text_area("Notes", key=notes_key)
+
+        o1, o2 = st.columns(2)
+        override = o1.number_input("Override tCO2e (optional)", min_value=0.0, value=float(st.session_state.get(ovr_key, 0.0)), step=0.001, key=ovr_key)
+        override_reason = o2.text_input("Override reason (required if override used)", key=ovr_reason_key)
+
+        if st.button("Add row", key=f"{base}_add"):
+            calc = _calc_row_tco2e(qty, frow.get("factor"), frow.get("ghg_unit"))
+            use_override = override is not None and float(override) > 0.0
+            if use_override and not (override_reason or "").strip():
+                st.error("Override reason is required when Override tCO2e is used.")
+            else:
+                _insert_job_scope_row(
+                    job_id=int(job_id),
+                    scope=scope,
+                    dataset_id=int(dataset_id),
+                    factor_db_id=int(frow.get("db_id")),
+                    original_id=str(frow.get("original_id") or ""),
+                    level_1=str(frow.get("level_1") or ""),
+                    level_2=str(frow.get("level_2") or ""),
+                    level_3=str(frow.get("level_3") or ""),
+                    level_4=str(frow.get("level_4") or ""),
+                    column_text=str(frow.get("column_text") or ""),
+                    report_label=(report_label or "").strip(),
+                    notes=(notes or "").strip() or None,
+                    enabled=bool(enabled),
+                    qty=float(qty),
+                    uom=str(frow.get("uom") or ""),
+                    factor=float(frow.get("factor") or 0.0),
+                    ghg_unit=str(frow.get("ghg_unit") or "kgCO2e"),
+                    calc_tco2e=float(calc),
+                    override_tco2e=float(override) if use_override else None,
+                    override_reason=(override_reason or "").strip() if use_override else None,
+                )
+                # Clear dependent selections/inputs for quick next entry
+                _reset("factor")
+                st.session_state.pop(qty_key, None)
+                st.session_state.pop(ovr_key, None)
+                st.session_state.pop(ovr_reason_key, None)
+                st.toast("Row added")
+                st.rerun()
+
+
 def render_scope(scope: str):
     job_id = st.session_state.get("selected_job_id")
     if not job_id:
@@ -432,16 +547,18 @@ def render_scope(scope: str):
             st.rerun()
         return
 
-    ctx = _get_job_context(int(job_id))
+    ctx = get_job_context(int(job_id))
     if not ctx:
         st.warning("Job not found.")
         return
 
-    job_number, title, start_date, status, client_name = ctx
     st.title(f"📦 {scope} — Data Entry")
-    st.caption(f"**{job_number}** — {client_name} — {title or ''}")
+    st.caption(f"**{ctx.job_number}** — {ctx.client_name} — {ctx.title or ''}")
 
-    inc, dataset_id, factor_method = _get_scope_config(int(job_id), scope)
+    cfg = ctx.scope(scope)
+    inc = cfg.include_scope if cfg else True
+    dataset_id = cfg.dataset_id if cfg else None
+    factor_method = (cfg.factor_method if cfg else None) or "Activity"
 
     dataset_year = _get_dataset_year(dataset_id)
     if not inc:
@@ -474,465 +591,236 @@ def render_scope(scope: str):
     if use_simple:
         st.markdown("### Row-by-row entries")
 
-        st.session_state.setdefault("edit_scope_row_id", None)
-
         # -------------------------
         # Add row (cascading selector)
         # -------------------------
         with st.expander("➕ Add row", expanded=True):
-            # NOTE: do NOT use st.form here – we need dynamic cascading dropdowns.
-            base = f"{scope}_addrow"
-
-            def _reset(*names):
-                for n in names:
-                    st.session_state.pop(f"{base}_{n}", None)
-
-            # Current selections (stored in session_state so dependent dropdowns refresh immediately)
-            l1_key = f"{base}_l1"
-            l2_key = f"{base}_l2"
-            l3_key = f"{base}_l3"
-            l4_key = f"{base}_l4"
-            f_key  = f"{base}_factor"
-            qty_key = f"{base}_qty"
-            en_key = f"{base}_enabled"
-            lbl_key = f"{base}_label"
-            notes_key = f"{base}_notes"
-            ovr_key = f"{base}_override"
-            ovr_reason_key = f"{base}_override_reason"
-
-            # Determine which schema is available in factor_lookup
-            with get_conn() as con:
-                levels_exist = _col_exists(con, "factor_lookup", "level_1")
-
-            if levels_exist:
-                l1_opts = _factor_cascade_options(int(dataset_id), scope)
-                l1 = st.selectbox(
-                    "Category (Level 1) *",
-                    l1_opts,
-                    key=l1_key,
-                    on_change=lambda: _reset("l2", "l3", "l4", "factor"),
-                )
-
-                l2_opts = []
-                if l1:
-                    df_l2 = _factor_rows_for_levels(int(dataset_id), scope, l1=l1)[["level_2"]].dropna().drop_duplicates().sort_values("level_2")
-                    l2_opts = df_l2["level_2"].tolist()
-                l2 = st.selectbox(
-                    "Level 2",
-                    l2_opts,
-                    key=l2_key,
-                    on_change=lambda: _reset("l3", "l4", "factor"),
-                )
+            if dataset_id is None:
+                st.info("Select a dataset for this scope in Job Folder → Data Collection first.")
+            else:
+                _add_row_fragment(int(job_id), scope, int(dataset_id))
 
-                l3_opts = []
-                if l1 and l2:
-                    df_l3 = _factor_rows_for_levels(int(dataset_id), scope, l1=l1, l2=l2)[["level_3"]].dropna().drop_duplicates().sort_values("level_3")
-                    l3_opts = df_l3["level_3"].tolist()
-                l3 = st.selectbox(
-                    "Level 3",
-                    l3_opts,
-                    key=l3_key,
-                    on_change=lambda: _reset("l4", "factor"),
+        st.markdown("---")
+        totals = emissions.scope_level_totals(int(job_id), scope)
+        st.metric("Total tCO2e (enabled rows)", round(float(totals["tco2e"].sum()), 4))
+        if len(totals) > 1:
+            with st.expander("Totals by category (level 1)"):
+                st.dataframe(
+                    totals[["level_1", "row_count", "tco2e"]].round({"tco2e": 4}),
+                    use_container_width=True,
+                    hide_index=True,
                 )
 
-                l4_opts = []
-                if l1 and l2 and l3:
-                    df_l4 = _factor_rows_for_levels(int(dataset_id), scope, l1=l1, l2=l2, l3=l3)[["level_4"]].dropna().drop_duplicates().sort_values("level_4")
-                    l4_opts = df_l4["level_4"].tolist()
-                l4 = st.selectbox("Level 4", l4_opts, key=l4_key, on_change=lambda: _reset("factor"))
+        _render_rows_grid(int(job_id), scope)
 
-                fdf = _factor_rows_for_levels(int(dataset_id), scope, l1=l1, l2=l2, l3=l3, l4=l4)
-            else:
-                # Legacy schema: category/subcategory
-                l1_opts = _factor_cascade_options(int(dataset_id), scope)
-                l1 = st.selectbox(
-                    "Category *",
-                    l1_opts,
-                    key=l1_key,
-                    on_change=lambda: _reset("l2", "factor"),
+    else:
+        # Legacy entry UI (crp_scope_entries). Neither branch calls st.stop(), so
+        # the script finishes and app.py's Diagnostics panel renders.
+        # -------------------------
+        # Add entry
+        # -------------------------
+        with st.expander("➕ Add entry", expanded=True):
+            with st.form(f"add_{scope}_entry", clear_on_submit=True):
+                c1, c2, c3 = st.columns(3)
+                method = c1.selectbox("Method", ["Activity", "Spend", "Custom"], index=0)
+                category = c2.text_input("Category")
+                subcategory = c3.text_input("Subcategory")
+
+                desc = st.text_input("Description")
+
+                c4, c5, c6 = st.columns(3)
+                amount = c4.number_input("Amount", min_value=0.0, value=0.0)
+                unit = c5.text_input("Unit (e.g., kWh, miles, £)", value="")
+                tco2e_override = c6.number_input("tCO₂e (tonnes) override (optional)", min_value=0.0, value=0.0)
+
+                st.markdown("**Emission factor (optional)**")
+                q = st.text_input("Search factors", placeholder="Type to search factor lookup…")
+                search_all_years = st.checkbox(
+                    "Search all years",
+                    value=False,
+                    help="By default we filter factors to the selected dataset year for this job. Enable this to search across all years in the dataset.",
                 )
+                factors = _search_factors(
+                    dataset_id,
+                    scope,
+                    q,
+                    year=dataset_year,
+                    all_years=search_all_years,
+                ) if q else []
+                factor_choice = None
+                factor_value = None
+                factor_ghg_unit = None
+                if factors:
+                    labels = [f["label"] for f in factors]
+                    pick = st.selectbox("Matching factors", labels)
+                    chosen = factors[labels.index(pick)]
+                    factor_choice = chosen["factor_id"]
+                    factor_value = chosen["factor"]
+                    factor_ghg_unit = chosen.get("ghg_unit")
+                else:
 
-                l2_opts = []
-                if l1:
-                    ftmp = _factor_rows_for_levels(int(dataset_id), scope, l1=l1)
-                    if ftmp is not None and not ftmp.empty and "level_2" in ftmp.columns:
-                        l2_opts = sorted([x for x in ftmp["level_2"].dropna().unique().tolist() if str(x).strip() != ""])
-                l2 = st.selectbox("Subcategory", l2_opts, key=l2_key, on_change=lambda: _reset("factor"))
-
-                fdf = _factor_rows_for_levels(int(dataset_id), scope, l1=l1, l2=l2)
-
-            if fdf is None or fdf.empty:
-                st.info("Pick a category (and deeper levels where available) to load factor lines.")
-                st.button("Add row", disabled=True, key=f"{base}_add_disabled")
-            else:
-                # Choose specific factor line
-                fdf = fdf.copy()
-                disp = (
-                    fdf["column_text"].fillna("").astype(str).str.strip()
-                    + " — "
-                    + fdf["uom"].fillna("").astype(str).str.strip()
-                ).tolist()
-                choice = st.selectbox("Factor line *", disp, key=f_key)
-                frow = fdf.iloc[disp.index(choice)]
-
-                st.caption(f"ID: {frow.get('original_id')} • UOM: {frow.get('uom')} • Factor: {frow.get('factor')} ({_ghg_unit_default(frow.get('ghg_unit'))})")
-
-                c1, c2, c3 = st.columns(3)
-                qty = c1.number_input("Quantity", min_value=0.0, value=float(st.session_state.get(qty_key, 0.0)), step=1.0, key=qty_key)
-                enabled = c2.checkbox("Enabled", value=bool(st.session_state.get(en_key, True)), key=en_key)
-                report_label = c3.text_input("Report label", key=lbl_key)
-
-                notes = st.text_area("Notes", key=notes_key)
-
-                o1, o2 = st.columns(2)
-                override = o1.number_input("Override tCO2e (optional)", min_value=0.0, value=float(st.session_state.get(ovr_key, 0.0)), step=0.001, key=ovr_key)
-                override_reason = o2.text_input("Override reason (required if override used)", key=ovr_reason_key)
-
-                if st.button("Add row", key=f"{base}_add"):
-                    calc = _calc_row_tco2e(qty, frow.get("factor"), frow.get("ghg_unit"))
-                    use_override = override is not None and float(override) > 0.0
-                    if use_override and not (override_reason or "").strip():
-                        st.error("Override reason is required when Override tCO2e is used.")
-                    else:
-                        _insert_job_scope_row(
-                            job_id=int(job_id),
-                            scope=scope,
-                            dataset_id=int(dataset_id),
-                            factor_db_id=int(frow.get("db_id")),
-                            original_id=str(frow.get("original_id") or ""),
-                            level_1=str(frow.get("level_1") or ""),
-                            level_2=str(frow.get("level_2") or ""),
-                            level_3=str(frow.get("level_3") or ""),
-                            level_4=str(frow.get("level_4") or ""),
-                            report_label=(report_label or "").strip(),
-                            notes=(notes or "").strip() or None,
-                            enabled=bool(enabled),
-                            qty=float(qty),
-                            uom=str(frow.get("uom") or ""),
-                            factor=float(frow.get("factor") or 0.0),
-                            ghg_unit=str(frow.get("ghg_unit") or "kgCO2e"),
-                            calc_tco2e=float(calc),
-                            override_tco2e=float(override) if use_override else None,
-                            override_reason=(override_reason or "").strip() if use_override else None,
+                    st.caption("No factor selected. You can enter custom tCO₂e or add factors/datasets later.")
+
+                notes = st.text_area("Notes", height=80)
+
+                if st.form_submit_button("Save entry"):
+                    # Compute tco2e if not overridden
+                    tco2e = float(tco2e_override) if tco2e_override and tco2e_override > 0 else None
+                    if tco2e is None and factor_value is not None:
+                        try:
+                            # factor * amount is in the factor's ghg_unit (typically kgCO2e); store tonnes
+                            tco2e = _calc_row_tco2e(float(amount), float(factor_value), factor_ghg_unit)
+                        except Exception:
+                            tco2e = None
+
+                    with get_conn(transactional=True) as con:
+                        con.execute(
+                            """
+                            INSERT INTO crp_scope_entries
+                              (job_id, scope, category, subcategory, description, amount, unit,
+                               dataset_id, factor_id, factor_value, tco2e, method, notes, updated_at)
+                            VALUES
+                              (%s, %s, %s, %s, %s, %s, %s,
+                               %s, %s, %s, %s, %s, %s, NOW())
+                            """,
+                            [
+                                int(job_id), scope,
+                                (category or "").strip() or None,
+                                (subcategory or "").strip() or None,
+                                (desc or "").strip() or None,
+                                float(amount) if amount is not None else None,
+                                (unit or "").strip() or None,
+                                int(dataset_id) if dataset_id is not None else None,
+                                int(factor_choice) if factor_choice is not None else None,
+                                float(factor_value) if factor_value is not None else None,
+                                float(tco2e) if tco2e is not None else None,
+                                method,
+                                (notes or "").strip() or None,
+                            ],
                         )
-                        # Clear dependent selections/inputs for quick next entry
-                        _reset("factor")
-                        st.session_state.pop(qty_key, None)
-                        st.session_state.pop(ovr_key, None)
-                        st.session_state.pop(ovr_reason_key, None)
-                        st.toast("Row added")
-                        st.rerun()
-
-        st.markdown("---")
-        show_disabled = st.checkbox("Show disabled rows", value=True, key=f"show_dis_{scope}")
-        sdf = _job_scope_rows_df(int(job_id), scope, include_disabled=show_disabled)
-
-        if sdf.empty:
-            st.info("No rows yet.")
-        else:
-            # Totals
-            used = []
-            for _, rr in sdf.iterrows():
-                if not bool(rr.get("enabled", True)):
-                    continue
-                v = rr.get("override_tco2e")
-                if v is None or str(v) == "nan":
-                    v = rr.get("calc_tco2e")
-                try:
-                    used.append(float(v) if v is not None else 0.0)
-                except Exception:
-                    used.append(0.0)
-            st.metric("Total tCO2e (enabled rows)", round(sum(used), 4))
-
-            # Header
-            h = st.columns([1, 3, 3, 1.5, 1.5, 1.2, 1.2, 1.2])
-            h[0].markdown("**On**")
-            h[1].markdown("**Label / Activity**")
-            h[2].markdown("**Factor (ID)**")
-            h[3].markdown("**Qty**")
-            h[4].markdown("**Calc tCO2e**")
-            h[5].markdown("**Override**")
-            h[6].markdown("**Used**")
-            h[7].markdown("**Actions**")
-
-            for _, rr in sdf.iterrows():
-                rid = int(rr["row_id"])
-                is_override = rr.get("override_tco2e") is not None and str(rr.get("override_tco2e")) != "nan"
-                used_val = rr.get("override_tco2e") if is_override else rr.get("calc_tco2e")
-                prefix = "🟧 " if is_override else ""
-                c = st.columns([1, 3, 3, 1.5, 1.5, 1.2, 1.2, 1.2])
-                enabled_now = c[0].checkbox("", value=bool(rr.get("enabled", True)), key=f"en_{scope}_{rid}")
-                act = f"{prefix}{rr.get('report_label') or ''}\n{rr.get('level_1') or ''} / {rr.get('level_2') or ''} / {rr.get('level_3') or ''} / {rr.get('level_4') or ''}\n{rr.get('column_text') or ''}"
-                c[1].write(act)
-
-                c[2].write(f"{rr.get('factor')} {rr.get('ghg_unit')}\nID: {rr.get('original_id')}")
-                c[3].write(rr.get("qty"))
-                c[4].write(rr.get("calc_tco2e"))
-                c[5].write(rr.get("override_tco2e") if is_override else "")
-                c[6].write(used_val)
-
-                # Actions: Edit / Delete
-                if c[7].button("✏️", key=f"edit_row_{scope}_{rid}"):
-                    st.session_state["edit_scope_row_id"] = rid
+                        emissions.sync_summary(con, int(job_id), scope)
+                    st.success("Saved.")
                     st.rerun()
 
-                if c[7].button("🗑️", key=f"del_row_{scope}_{rid}"):
-                    _delete_job_scope_row(rid)
-                    st.toast("Row deleted")
-                    st.rerun()
-
-            edit_rid = st.session_state.get("edit_scope_row_id")
-            if edit_rid:
-                st.markdown("### Edit row")
-                row = sdf.loc[sdf["row_id"] == int(edit_rid)]
-                if row.empty:
-                    st.session_state["edit_scope_row_id"] = None
-                else:
-                    rr = row.iloc[0]
-                    with st.form(f"edit_scope_row_{scope}_{edit_rid}"):
-                        enabled = st.checkbox("Enabled", value=bool(rr.get("enabled", True)))
-                        report_label = st.text_input("Report label", value=rr.get("report_label") or "")
-                        notes = st.text_area("Notes", value=rr.get("notes") or "")
-                        qty = st.number_input("Quantity", min_value=0.0, value=float(rr.get("qty") or 0.0), step=1.0)
-                        override = st.number_input("Override tCO2e (optional)", min_value=0.0, value=float(rr.get("override_tco2e") or 0.0), step=0.001)
-                        override_reason = st.text_input("Override reason", value=rr.get("override_reason") or "")
-
-                        b1, b2 = st.columns(2)
-                        save = b1.form_submit_button("Save")
-                        cancel = b2.form_submit_button("Cancel")
-
-                        if cancel:
-                            st.session_state["edit_scope_row_id"] = None
-                            st.rerun()
-
-                        if save:
-                            calc = _calc_row_tco2e(qty, rr.get("factor"), rr.get("ghg_unit"))
-                            use_override = override is not None and float(override) > 0.0
-                            if use_override and not (override_reason or "").strip():
-                                st.error("Override reason is required when override is set.")
-                            else:
-                                _update_job_scope_row(
-                                    int(edit_rid),
-                                    {
-                                        "enabled": bool(enabled),
-                                        "report_label": (report_label or "").strip() or None,
-                                        "notes": (notes or "").strip() or None,
-                                        "qty": float(qty),
-                                        "calc_tco2e": calc,
-                                        "override_tco2e": float(override) if use_override else None,
-                                        "override_reason": (override_reason or "").strip() if use_override else None,
-                                    },
-                                )
-                                st.success("Saved.")
-                                st.session_state["edit_scope_row_id"] = None
-                                st.rerun()
-
-        # Stop here so the legacy UI below doesn't also render
-        st.stop()
-
-
-    # -------------------------
-    # Add entry
-    # -------------------------
-    with st.expander("➕ Add entry", expanded=True):
-        with st.form(f"add_{scope}_entry", clear_on_submit=True):
-            c1, c2, c3 = st.columns(3)
-            method = c1.selectbox("Method", ["Activity", "Spend", "Custom"], index=0)
-            category = c2.text_input("Category")
-            subcategory = c3.text_input("Subcategory")
-
-            desc = st.text_input("Description")
-
-            c4, c5, c6 = st.columns(3)
-            amount = c4.number_input("Amount", min_value=0.0, value=0.0)
-            unit = c5.text_input("Unit (e.g., kWh, miles, £)", value="")
-            tco2e_override = c6.number_input("tCO₂e (tonnes) override (optional)", min_value=0.0, value=0.0)
-
-            st.markdown("**Emission factor (optional)**")
-            q = st.text_input("Search factors", placeholder="Type to search factor lookup…")
-            search_all_years = st.checkbox(
-                "Search all years",
-                value=False,
-                help="By default we filter factors to the selected dataset year for this job. Enable this to search across all years in the dataset.",
-            )
-            factors = _search_factors(
-                dataset_id,
-                scope,
-                q,
-                year=dataset_year,
-                all_years=search_all_years,
-            ) if q else []
-            factor_choice = None
-            factor_value = None
-            factor_ghg_unit = None
-            if factors:
-                labels = [f["label"] for f in factors]
-                pick = st.selectbox("Matching factors", labels)
-                chosen = factors[labels.index(pick)]
-                factor_choice = chosen["factor_id"]
-                factor_value = chosen["factor"]
-                factor_ghg_unit = chosen.get("ghg_unit")
-            else:
-
-                st.caption("No factor selected. You can enter custom tCO₂e or add factors/datasets later.")
+        # -------------------------
+        # Entries table
+        # -------------------------
+        st.markdown("### Entries")
+        show_archived = st.checkbox("Show archived entries", value=False, key=f"show_arch_{scope}")
+        df = _list_entries(int(job_id), scope, include_archived=show_archived)
 
-            notes = st.text_area("Notes", height=80)
+        if df.empty:
+            st.info("No entries yet.")
+            return
 
-            if st.form_submit_button("Save entry"):
-                # Compute tco2e if not overridden
-                tco2e = float(tco2e_override) if tco2e_override and tco2e_override > 0 else None
-                if tco2e is None and factor_value is not None:
-                    try:
-                        # factor * amount is typically in kgCO2e; convert to tonnes for reporting/storage
-                        tco2e = _to_tco2e(float(amount), float(factor_value), factor_ghg_unit)
-                    except Exception:
-                        tco2e = None
+        h = st.columns([2, 2, 3, 1, 1, 1, 1, 1])
+        h[0].markdown("**Category**")
+        h[1].markdown("**Subcategory**")
+        h[2].markdown("**Description**")
+        h[3].markdown("**Amount**")
+        h[4].markdown("**Unit**")
+        h[5].markdown("**tCO₂e**")
+        h[6].markdown("**Edit**")
+        h[7].markdown("**Archive**")
+
+        for _, r in df.iterrows():
+            eid = int(r["entry_id"])
+            c = st.columns([2, 2, 3, 1, 1, 1, 1, 1])
+
+            c[0].write(r.get("category") or "")
+            c[1].write(r.get("subcategory") or "")
+            c[2].write(r.get("description") or "")
+            c[3].write("" if r.get("amount") is None else r.get("amount"))
+            c[4].write(r.get("unit") or "")
+            c[5].write("" if r.get("tco2e") is None else r.get("tco2e"))
+
+            if c[6].button("✏️", key=f"edit_{scope}_{eid}"):
+                st.session_state["edit_entry_id"] = eid
+                st.rerun()
 
-                with get_conn() as con:
+            if c[7].button("🗄️", key=f"arch_{scope}_{eid}"):
+                with get_conn(transactional=True) as con:
                     con.execute(
-                        """
-                        INSERT INTO crp_scope_entries
-                          (job_id, scope, category, subcategory, description, amount, unit,
-                           dataset_id, factor_id, factor_value, tco2e, method, notes, updated_at)
-                        VALUES
-                          (%s, %s, %s, %s, %s, %s, %s,
-                           %s, %s, %s, %s, %s, %s, NOW())
-                        """,
-                        [
-                            int(job_id), scope,
-                            (category or "").strip() or None,
-                            (subcategory or "").strip() or None,
-                            (desc or "").strip() or None,
-                            float(amount) if amount is not None else None,
-                            (unit or "").strip() or None,
-                            int(dataset_id) if dataset_id is not None else None,
-                            int(factor_choice) if factor_choice is not None else None,
-                            float(factor_value) if factor_value is not None else None,
-                            float(tco2e) if tco2e is not None else None,
-                            method,
-                            (notes or "").strip() or None,
-                        ],
+                        "UPDATE crp_scope_entries SET is_archived=TRUE, updated_at=NOW() WHERE entry_id=%s",
+                        [eid],
                     )
-                st.success("Saved.")
+                    emissions.sync_summary(con, int(job_id), scope)
+                st.toast("Archived")
                 st.rerun()
 
-    # -------------------------
-    # Entries table
-    # -------------------------
-    st.markdown("### Entries")
-    show_archived = st.checkbox("Show archived entries", value=False, key=f"show_arch_{scope}")
-    df = _list_entries(int(job_id), scope, include_archived=show_archived)
-
-    if df.empty:
-        st.info("No entries yet.")
-        return
-
-    h = st.columns([2, 2, 3, 1, 1, 1, 1, 1])
-    h[0].markdown("**Category**")
-    h[1].markdown("**Subcategory**")
-    h[2].markdown("**Description**")
-    h[3].markdown("**Amount**")
-    h[4].markdown("**Unit**")
-    h[5].markdown("**tCO₂e**")
-    h[6].markdown("**Edit**")
-    h[7].markdown("**Archive**")
-
-    for _, r in df.iterrows():
-        eid = int(r["entry_id"])
-        c = st.columns([2, 2, 3, 1, 1, 1, 1, 1])
-
-        c[0].write(r.get("category") or "")
-        c[1].write(r.get("subcategory") or "")
-        c[2].write(r.get("description") or "")
-        c[3].write("" if r.get("amount") is None else r.get("amount"))
-        c[4].write(r.get("unit") or "")
-        c[5].write("" if r.get("tco2e") is None else r.get("tco2e"))
-
-        if c[6].button("✏️", key=f"edit_{scope}_{eid}"):
-            st.session_state["edit_entry_id"] = eid
-            st.rerun()
+        # -------------------------
+        # Edit panel
+        # -------------------------
+        edit_id = st.session_state.get("edit_entry_id")
+        if edit_id:
+            st.markdown("---")
+            st.markdown("### Edit entry")
 
-        if c[7].button("🗄️", key=f"arch_{scope}_{eid}"):
             with get_conn() as con:
-                con.execute(
-                    "UPDATE crp_scope_entries SET is_archived=TRUE, updated_at=NOW() WHERE entry_id=%s",
-                    [eid],
-                )
-            st.toast("Archived")
-            st.rerun()
-
-    # -------------------------
-    # Edit panel
-    # -------------------------
-    edit_id = st.session_state.get("edit_entry_id")
-    if edit_id:
-        st.markdown("---")
-        st.markdown("### Edit entry")
-
-        with get_conn() as con:
-            row = con.execute(
-                """
-                SELECT entry_id, category, subcategory, description, amount, unit,
-                       factor_id, factor_value, tco2e, method, notes
-                FROM crp_scope_entries
-                WHERE entry_id=%s
-                """,
-                [int(edit_id)],
-            ).fetchone()
-
-        if not row:
-            st.session_state["edit_entry_id"] = None
-            st.warning("Entry not found.")
-            return
+                row = con.execute(
+                    """
+                    SELECT entry_id, category, subcategory, description, amount, unit,
+                           factor_id, factor_value, tco2e, method, notes
+                    FROM crp_scope_entries
+                    WHERE entry_id=%s
+                    """,
+                    [int(edit_id)],
+                ).fetchone()
+
+            if not row:
+                st.session_state["edit_entry_id"] = None
+                st.warning("Entry not found.")
+                return
 
-        (eid, category, subcategory, description, amount, unit,
-         factor_id, factor_value, tco2e, method, notes) = row
+            (eid, category, subcategory, description, amount, unit,
+             factor_id, factor_value, tco2e, method, notes) = row
 
-        with st.form(f"edit_{scope}_{eid}", clear_on_submit=False):
-            c1, c2, c3 = st.columns(3)
-            new_method = c1.selectbox("Method", ["Activity", "Spend", "Custom"], index=["Activity", "Spend", "Custom"].index(method or "Activity"))
-            new_cat = c2.text_input("Category", value=category or "")
-            new_sub = c3.text_input("Subcategory", value=subcategory or "")
-            new_desc = st.text_input("Description", value=description or "")
+            with st.form(f"edit_{scope}_{eid}", clear_on_submit=False):
+                c1, c2, c3 = st.columns(3)
+                new_method = c1.selectbox("Method", ["Activity", "Spend", "Custom"], index=["Activity", "Spend", "Custom"].index(method or "Activity"))
+                new_cat = c2.text_input("Category", value=category or "")
+                new_sub = c3.text_input("Subcategory", value=subcategory or "")
+                new_desc = st.text_input("Description", value=description or "")
 
-            c4, c5, c6 = st.columns(3)
-            new_amount = c4.number_input("Amount", min_value=0.0, value=float(amount or 0.0))
-            new_unit = c5.text_input("Unit", value=unit or "")
-            new_tco2e = c6.number_input("tCO₂e", min_value=0.0, value=float(tco2e or 0.0))
+                c4, c5, c6 = st.columns(3)
+                new_amount = c4.number_input("Amount", min_value=0.0, value=float(amount or 0.0))
+                new_unit = c5.text_input("Unit", value=unit or "")
+                new_tco2e = c6.number_input("tCO₂e", min_value=0.0, value=float(tco2e or 0.0))
 
-            new_notes = st.text_area("Notes", value=notes or "", height=80)
+                new_notes = st.text_area("Notes", value=notes or "", height=80)
 
-            b1, b2 = st.columns(2)
-            save = b1.form_submit_button("Save")
-            cancel = b2.form_submit_button("Cancel")
+                b1, b2 = st.columns(2)
+                save = b1.form_submit_button("Save")
+                cancel = b2.form_submit_button("Cancel")
 
-            if cancel:
-                st.session_state["edit_entry_id"] = None
-                st.rerun()
+                if cancel:
+                    st.session_state["edit_entry_id"] = None
+                    st.rerun()
 
-            if save:
-                with get_conn() as con:
-                    con.execute(
-                        """
-                        UPDATE crp_scope_entries
-                        SET category=%s, subcategory=%s, description=%s,
-                            amount=%s, unit=%s,
-                            tco2e=%s, method=%s, notes=%s,
-                            updated_at=NOW()
-                        WHERE entry_id=%s
-                        """,
-                        [
-                            (new_cat or "").strip() or None,
-                            (new_sub or "").strip() or None,
-                            (new_desc or "").strip() or None,
-                            float(new_amount) if new_amount is not None else None,
-                            (new_unit or "").strip() or None,
-                            float(new_tco2e) if new_tco2e is not None else None,
-                            new_method,
-                            (new_notes or "").strip() or None,
-                            int(eid),
-                        ],
-                    )
-                st.success("Updated.")
-                st.session_state["edit_entry_id"] = None
-                st.rerun()
+                if save:
+                    with get_conn(transactional=True) as con:
+                        con.execute(
+                            """
+                            UPDATE crp_scope_entries
+                            SET category=%s, subcategory=%s, description=%s,
+                                amount=%s, unit=%s,
+                                tco2e=%s, method=%s, notes=%s,
+                                updated_at=NOW()
+                            WHERE entry_id=%s
+                            """,
+                            [
+                                (new_cat or "").strip() or None,
+                                (new_sub or "").strip() or None,
+                                (new_desc or "").strip() or None,
+                                float(new_amount) if new_amount is not None else None,
+                                (new_unit or "").strip() or None,
+                                float(new_tco2e) if new_tco2e is not None else None,
+                                new_method,
+                                (new_notes or "").strip() or None,
+                                int(eid),
+                            ],
+                        )
+                        emissions.sync_summary(con, int(job_id), scope)
+                    st.success("Updated.")
+                    st.session_state["edit_entry_id"] = None
+                    st.rerun()
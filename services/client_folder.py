@@ -0,0 +1,130 @@
+"""Client Folder section data, loaded on demand and cached per client.
+
+The Client Folder shows one section at a time (Sites, Contacts, CRP, Targets,
+...), so each section's data is only queried when it is opened and then kept
+in a process-wide TTL cache keyed by (client_id, section). The write paths
+for a section (add_site, add_contact, add_note) call invalidate_client(), so
+the writing process sees its own change immediately; tables written outside
+the app (crp_reports, activity_data imports) are picked up within the TTL
+(CLIENT_FOLDER_TTL_SECONDS, default 120). Callers get copies.
+"""
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+
+from core.cache import TTLCache
+from core.database import get_conn
+
+_SECTIONS = TTLCache(
+    maxsize=int(os.getenv("CLIENT_FOLDER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("CLIENT_FOLDER_TTL_SECONDS", "120")),
+)
+
+SCOPES = ("Scope 1", "Scope 2", "Scope 3")
+
+
+def _cached(client_id: int, section: str, loader, *extra):
+    return _SECTIONS.get_or_load((int(client_id), section, *extra), loader)
+
+
+def invalidate_client(client_id: int, *sections: str) -> int:
+    """Drop cached sections of one client (all of them when none are named)."""
+    cid = int(client_id)
+    if sections:
+        return _SECTIONS.invalidate_where(lambda k: k[0] == cid and k[1] in sections)
+    return _SECTIONS.invalidate_where(lambda k: k[0] == cid)
+
+
+def _frame(sql: str, params: list) -> pd.DataFrame:
+    with get_conn() as con:
+        return con.execute(sql, params).df()
+
+
+def sites(client_id: int) -> pd.DataFrame:
+    from services.sites import list_sites
+
+    return _cached(client_id, "sites", lambda: list_sites(int(client_id))).copy()
+
+
+def contacts(client_id: int) -> pd.DataFrame:
+    from services.contacts import list_contacts
+
+    return _cached(client_id, "contacts", lambda: list_contacts(int(client_id))).copy()
+
+
+def notes(client_id: int) -> pd.DataFrame:
+    from services.notes import list_notes
+
+    return _cached(client_id, "notes", lambda: list_notes(int(client_id))).copy()
+
+
+def crp_years(client_id: int) -> pd.DataFrame:
+    sql = "SELECT reporting_year, is_benchmark, status, created_at FROM crp_reports WHERE client_db_id=? ORDER BY reporting_year"
+    return _cached(client_id, "crp", lambda: _frame(sql, [int(client_id)])).copy()
+
+
+def activity_summary(client_id: int) -> pd.DataFrame:
+    sql = """
+        SELECT COALESCE(s.site_name,'(Unassigned)') AS site,
+               ad.scope,
+               SUM(ad.emissions_tco2e) AS tCO2e
+        FROM activity_data ad
+        LEFT JOIN client_sites s ON s.site_id = ad.site_id
+        WHERE ad.client_db_id=?
+        GROUP BY 1,2
+        ORDER BY 1,2
+    """
+    return _cached(client_id, "activity", lambda: _frame(sql, [int(client_id)])).copy()
+
+
+def datasets_used(client_id: int) -> pd.DataFrame:
+    sql = """
+        SELECT d.name, d.source, d.analysis_type, d.country, d.year, d.version,
+               COUNT(*) AS lines, SUM(ad.emissions_tco2e) AS total_tco2e
+        FROM activity_data ad
+        JOIN factor_lookup fl ON fl.db_id = ad.factor_id
+        LEFT JOIN datasets d ON d.dataset_id = fl.dataset_id
+        WHERE ad.client_db_id = ?
+        GROUP BY 1,2,3,4,5,6
+        ORDER BY d.year DESC, d.name
+    """
+    return _cached(client_id, "datasets", lambda: _frame(sql, [int(client_id)])).copy()
+
+
+def baseline(client_id: int, benchmark_year, fallback_year: int) -> tuple[int, dict[str, float]]:
+    """(baseline year, {scope: tCO2e}) for the Targets forecast.
+
+    The baseline year is the client's benchmark_year, else its earliest CRP
+    year, else fallback_year. Both lookups run in one statement.
+    """
+    explicit = None if pd.isna(benchmark_year) else int(benchmark_year)
+
+    def load():
+        with get_conn() as con:
+            df = con.execute(
+                """
+                WITH y AS (
+                    SELECT COALESCE(CAST(? AS INTEGER), MIN(reporting_year), CAST(? AS INTEGER)) AS yr
+                    FROM crp_reports
+                    WHERE client_db_id=?
+                )
+                SELECT y.yr AS baseline_year, ad.scope, SUM(ad.emissions_tco2e) AS t
+                FROM y
+                LEFT JOIN crp_reports r ON r.client_db_id=? AND r.reporting_year = y.yr
+                LEFT JOIN activity_data ad ON ad.client_db_id=? AND ad.crp_id = r.crp_id
+                GROUP BY y.yr, ad.scope
+                """,
+                [explicit, int(fallback_year), int(client_id), int(client_id), int(client_id)],
+            ).df()
+        totals = dict.fromkeys(SCOPES, 0.0)
+        for _, r in df.iterrows():
+            s = str(r["scope"]).strip().lower()
+            for scope in SCOPES:
+                if s.startswith(scope.lower()):
+                    totals[scope] = 0.0 if pd.isna(r["t"]) else float(r["t"])
+        return int(df["baseline_year"].iloc[0]), totals
+
+    year, totals = _cached(client_id, "baseline", load, explicit, int(fallback_year))
+    return year, dict(totals)
@@ -1,6 +1,7 @@
 import pandas as pd
 
 from core.database import db_backend, get_conn, next_id
+from services.client_folder import invalidate_client
 
 
 def list_contacts(client_db_id: int) -> pd.DataFrame:
@@ -32,15 +33,18 @@ def add_contact(
                 """,
                 [int(client_db_id), full_name, (job_title or None), (email or None)],
             ).fetchone()
-            return int(row[0])
+            new_id = int(row[0])
+        else:
+            # DuckDB fallback
+            contact_id = next_id("client_contacts", "contact_id")
+            con.execute(
+                """
+                INSERT INTO client_contacts (contact_id, client_db_id, full_name, job_title, email)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [int(contact_id), int(client_db_id), full_name, (job_title or None), (email or None)],
+            )
+            new_id = int(contact_id)
 
-        # DuckDB fallback
-        contact_id = next_id("client_contacts", "contact_id")
-        con.execute(
-            """
-            INSERT INTO client_contacts (contact_id, client_db_id, full_name, job_title, email)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            [int(contact_id), int(client_db_id), full_name, (job_title or None), (email or None)],
-        )
-        return int(contact_id)
+    invalidate_client(client_db_id, "contacts")
+    return new_id
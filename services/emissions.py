@@ -0,0 +1,191 @@
+"""Emissions totals for job_scope_rows, summed in SQL.
+
+"Used" emissions for a row are COALESCE(override_tco2e, calc_tco2e); only
+enabled rows count. Headline numbers (scope pages, Job Folder) come from here
+so they never need the row set itself.
+
+job_emissions_summary holds the same totals pre-aggregated per
+(job_id, scope, level_1), with the legacy crp_scope_entries (non-archived,
+category as level_1) folded in. Postgres keeps it current with triggers
+(core.migrations); on DuckDB every write path calls sync_summary() on the
+connection it wrote with. rebuild_summary() / verify_summary() recompute it
+from scratch (python -m services.emissions --rebuild / --verify).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+import pandas as pd
+
+from core.database import EMISSIONS_SUMMARY_SOURCE_SQL as _SUMMARY_SOURCE_SQL, db_backend, get_conn
+
+TOTAL_COLUMNS = ["job_id", "scope", "level_1", "row_count", "tco2e"]
+
+
+def emissions_totals(
+    job_ids: list[int] | None = None,
+    scope: str | None = None,
+    by_level_1: bool = True,
+) -> pd.DataFrame:
+    """Per job / scope (/ level_1) totals of used tCO2e over enabled rows.
+
+    job_ids=None covers every job. With by_level_1=False the level_1 column
+    is None and there is one row per (job_id, scope).
+    """
+    where = ["enabled = TRUE"]
+    params: list = []
+    if job_ids is not None:
+        ids = [int(j) for j in job_ids]
+        if not ids:
+            return pd.DataFrame(columns=TOTAL_COLUMNS)
+        where.append(f"job_id IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    if scope is not None:
+        where.append("scope = %s")
+        params.append(str(scope))
+
+    level = "level_1" if by_level_1 else "CAST(NULL AS TEXT)"
+    group = "job_id, scope, level_1" if by_level_1 else "job_id, scope"
+    with get_conn() as con:
+        df = con.execute(
+            f"""
+            SELECT job_id, scope, {level} AS level_1,
+                   COUNT(*) AS row_count,
+                   COALESCE(SUM(COALESCE(override_tco2e, calc_tco2e)), 0) AS tco2e
+            FROM job_scope_rows
+            WHERE {" AND ".join(where)}
+            GROUP BY {group}
+            ORDER BY job_id, scope, 3
+            """,
+            params,
+        ).df()
+    if df.empty:
+        return pd.DataFrame(columns=TOTAL_COLUMNS)
+    df["tco2e"] = pd.to_numeric(df["tco2e"], errors="coerce").fillna(0.0).astype(float)
+    df["row_count"] = df["row_count"].astype(int)
+    return df[TOTAL_COLUMNS]
+
+
+def job_scope_totals(job_id: int) -> dict[str, float]:
+    """{scope: used tCO2e} for one job (scopes without enabled rows are absent)."""
+    df = emissions_totals([int(job_id)], by_level_1=False)
+    return {str(r["scope"]): float(r["tco2e"]) for _, r in df.iterrows()}
+
+
+def scope_level_totals(job_id: int, scope: str) -> pd.DataFrame:
+    """level_1 breakdown for one job + scope, largest first."""
+    df = emissions_totals([int(job_id)], scope=scope)
+    return df.sort_values("tco2e", ascending=False, ignore_index=True)
+
+
+# -------------------------
+# job_emissions_summary
+# -------------------------
+SUMMARY_COLUMNS = ["job_id", "scope", "level_1", "row_count", "tco2e"]
+
+def sync_summary(con, job_id: int, scope: str) -> None:
+    """Recompute the summary rows for one job + scope after a write (DuckDB only).
+
+    Call it on the connection that made the write. Postgres triggers already
+    did the same work, so this is a no-op there.
+    """
+    if db_backend() == "postgres":
+        return
+    con.execute("DELETE FROM job_emissions_summary WHERE job_id=%s AND scope=%s", [int(job_id), str(scope)])
+    con.execute(
+        "INSERT INTO job_emissions_summary (job_id, scope, level_1, row_count, tco2e, updated_at) "
+        "SELECT job_id, scope, level_1, row_count, tco2e, CURRENT_TIMESTAMP FROM ("
+        + _SUMMARY_SOURCE_SQL.format(where="AND job_id=%s AND scope=%s")
+        + ") fresh",
+        [int(job_id), str(scope)] * 2,
+    )
+
+
+def sync_summary_jobs(con, job_ids) -> None:
+    """sync_summary() for every scope of many jobs in two statements (DuckDB only)."""
+    ids = sorted({int(j) for j in job_ids})
+    if db_backend() == "postgres" or not ids:
+        return
+    in_list = f"job_id IN ({', '.join(['%s'] * len(ids))})"
+    con.execute(f"DELETE FROM job_emissions_summary WHERE {in_list}", ids)
+    con.execute(
+        "INSERT INTO job_emissions_summary (job_id, scope, level_1, row_count, tco2e, updated_at) "
+        "SELECT job_id, scope, level_1, row_count, tco2e, CURRENT_TIMESTAMP FROM ("
+        + _SUMMARY_SOURCE_SQL.format(where=f"AND {in_list}")
+        + ") fresh",
+        ids * 2,
+    )
+
+
+def job_summary(job_id: int) -> pd.DataFrame:
+    """Summary rows for one job (no scan of the row tables)."""
+    with get_conn() as con:
+        return con.execute(
+            f"""
+            SELECT {", ".join(SUMMARY_COLUMNS)}
+            FROM job_emissions_summary
+            WHERE job_id=%s
+            ORDER BY scope, tco2e DESC
+            """,
+            [int(job_id)],
+        ).df()
+
+
+def rebuild_summary() -> int:
+    """Recompute job_emissions_summary from scratch in one transaction; returns its row count."""
+    with get_conn(transactional=True) as con:
+        con.execute("DELETE FROM job_emissions_summary")
+        con.execute(
+            "INSERT INTO job_emissions_summary (job_id, scope, level_1, row_count, tco2e, updated_at) "
+            "SELECT job_id, scope, level_1, row_count, tco2e, CURRENT_TIMESTAMP FROM ("
+            + _SUMMARY_SOURCE_SQL.format(where="")
+            + ") fresh"
+        )
+        return int(con.execute("SELECT COUNT(*) FROM job_emissions_summary").fetchone()[0])
+
+
+def verify_summary(tolerance: float = 1e-6) -> pd.DataFrame:
+    """Keys where the stored summary and a fresh aggregate disagree (empty = consistent)."""
+    with get_conn() as con:
+        stored = con.execute(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM job_emissions_summary").df()
+        fresh = con.execute(_SUMMARY_SOURCE_SQL.format(where="")).df()
+    keys = ["job_id", "scope", "level_1"]
+    merged = stored.merge(fresh, on=keys, how="outer", suffixes=("_stored", "_fresh"), indicator=True)
+    for c in ("row_count", "tco2e"):
+        for side in ("stored", "fresh"):
+            merged[f"{c}_{side}"] = pd.to_numeric(merged[f"{c}_{side}"], errors="coerce").fillna(0).astype(float)
+    bad = (
+        (merged["_merge"] != "both")
+        | (merged["row_count_stored"] != merged["row_count_fresh"])
+        | ((merged["tco2e_stored"] - merged["tco2e_fresh"]).abs() > tolerance)
+    )
+    return merged.loc[bad].drop(columns="_merge").reset_index(drop=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rebuild / verify job_emissions_summary.")
+    ap.add_argument("--rebuild", action="store_true", help="recompute the table from scratch first")
+    ap.add_argument("--verify", action="store_true", help="compare the table with a fresh aggregate")
+    args = ap.parse_args(argv)
+    if not (args.rebuild or args.verify):
+        ap.error("pass --rebuild and/or --verify")
+
+    from core.migrations import ensure_schema
+
+    ensure_schema(include_migrations=db_backend() == "postgres")
+    if args.rebuild:
+        print(f"rebuilt job_emissions_summary: {rebuild_summary()} rows")
+    if args.verify:
+        bad = verify_summary()
+        if bad.empty:
+            print("job_emissions_summary: consistent")
+        else:
+            print(f"job_emissions_summary: {len(bad)} mismatched keys")
+            print(bad.head(20).to_string(index=False))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""In-memory Level 1 -> 4 factor hierarchy per dataset and scope.
+
+The Add Row cascade needs the distinct options at each level and the factor
+lines under the current selection. Both are answered from a tree built with
+one query per (dataset, scope) and kept in a process-wide TTL/LRU cache;
+factor imports invalidate the dataset's trees.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from core.cache import TTLCache
+from core.database import get_conn
+from core.schema import table_columns
+
+LEVELS = ("level_1", "level_2", "level_3", "level_4")
+
+_TREES = TTLCache(
+    maxsize=int(os.getenv("FACTOR_TREE_CACHE_SIZE", "32")),
+    ttl=float(os.getenv("FACTOR_TREE_TTL_SECONDS", "3600")),
+)
+
+
+def _blank(v) -> bool:
+    return v is None or (isinstance(v, float) and np.isnan(v)) or str(v).strip() == ""
+
+
+@dataclass(frozen=True)
+class FactorHierarchy:
+    dataset_id: int
+    scope: str
+    lines_df: pd.DataFrame
+    # prefix tuple -> sorted child options, and prefix tuple -> row positions in lines_df
+    children: dict = field(repr=False)
+    members: dict = field(repr=False)
+
+    def options(self, *path) -> list[str]:
+        """Distinct non-blank options one level below `path` (no path -> Level 1)."""
+        return list(self.children.get(_prefix(path), ()))
+
+    def lines(self, l1=None, l2=None, l3=None, l4=None) -> pd.DataFrame:
+        """Factor lines under the selected levels (unselected trailing levels match all)."""
+        prefix = _prefix((l1, l2, l3, l4))
+        if not prefix:
+            return self.lines_df
+        pos = self.members.get(prefix)
+        if pos is None:
+            return self.lines_df.iloc[0:0]
+        return self.lines_df.iloc[pos]
+
+
+def _prefix(path) -> tuple:
+    out = []
+    for v in path:
+        if _blank(v):
+            break
+        out.append(str(v))
+    return tuple(out)
+
+
+def _load_lines(dataset_id: int, scope: str) -> pd.DataFrame:
+    cols = table_columns("factor_lookup")
+    id_col = "factor_id" if "factor_id" in cols else ("db_id" if "db_id" in cols else None)
+    if id_col is None:
+        return pd.DataFrame()
+
+    # Older schemas: category/subcategory/name/unit stand in for level_1/level_2/column_text/uom.
+    fallbacks = {"level_1": "category", "level_2": "subcategory", "column_text": "name", "uom": "unit"}
+    sel = [f"{id_col} AS db_id"]
+    for c in ("original_id", "year", *LEVELS, "column_text", "uom", "ghg_unit", "factor"):
+        if c in cols:
+            sel.append(c)
+        elif fallbacks.get(c) in cols:
+            sel.append(f"{fallbacks[c]} AS {c}")
+        else:
+            sel.append(f"NULL AS {c}")
+
+    wh, params = ["dataset_id=%s"], [int(dataset_id)]
+    if "scope" in cols:
+        wh.append("scope=%s")
+        params.append(scope)
+    if "is_active" in cols:
+        wh.append("is_active=TRUE")
+
+    sql = f"SELECT {', '.join(sel)} FROM factor_lookup WHERE {' AND '.join(wh)} ORDER BY db_id DESC"
+    with get_conn() as con:
+        df = con.execute(sql, params).df()
+    df["factor_id"] = df["db_id"]
+    return df
+
+
+def build_hierarchy(dataset_id: int, scope: str, lines: pd.DataFrame) -> FactorHierarchy:
+    children: dict[tuple, list[str]] = {}
+    members: dict[tuple, np.ndarray] = {}
+    if not lines.empty:
+        child_sets: dict[tuple, set] = {}
+        member_lists: dict[tuple, list[int]] = {}
+        for pos, path in enumerate(lines[list(LEVELS)].to_numpy(dtype=object)):
+            prefix: tuple = ()
+            for v in path:
+                if _blank(v):
+                    break
+                v = str(v)
+                child_sets.setdefault(prefix, set()).add(v)
+                prefix = prefix + (v,)
+                member_lists.setdefault(prefix, []).append(pos)
+        children = {k: sorted(v) for k, v in child_sets.items()}
+        members = {k: np.asarray(v, dtype="int64") for k, v in member_lists.items()}
+    return FactorHierarchy(int(dataset_id), str(scope), lines, children, members)
+
+
+def get_factor_hierarchy(dataset_id: int, scope: str) -> FactorHierarchy:
+    key = (int(dataset_id), str(scope))
+    return _TREES.get_or_load(key, lambda: build_hierarchy(key[0], key[1], _load_lines(*key)))
+
+
+def invalidate_dataset(dataset_id: int) -> int:
+    """Drop cached trees for a dataset (call after importing into it)."""
+    return _TREES.invalidate_where(lambda k: k[0] == int(dataset_id))
+
+
+def cache_stats() -> dict:
+    return _TREES.stats()
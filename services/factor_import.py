@@ -0,0 +1,489 @@
+"""Bulk factor CSV ingestion into factor_lookup.
+
+The CSV is streamed in bounded chunks: the encoding is detected once from a
+sample, each chunk is normalised with vectorised pandas operations and
+loaded in one bulk statement (COPY FROM STDIN on Postgres, a native
+DataFrame insert on DuckDB). Progress is checkpointed per chunk in
+factor_import_runs, so a failed import of the same file resumes where it
+stopped.
+
+Two modes are supported. "append" adds every row. "upsert" matches rows on
+(dataset_id, original_id, year): new keys are inserted, changed rows are
+updated in place and identical rows are left alone. With retire_missing,
+rows of the dataset that are absent from the file are marked inactive
+(never deleted, since job rows reference factor_lookup.db_id).
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from core.database import db_backend, get_conn
+from services.factor_hierarchy import invalidate_dataset
+from services.factor_search import refresh_search_doc
+from utils.units import DEFAULT_GHG_UNIT, normalise_ghg_units, unknown_ghg_units
+
+FACTOR_COLUMNS = [
+    "dataset_id",
+    "file_name",
+    "year",
+    "original_id",
+    "scope",
+    "level_1",
+    "level_2",
+    "level_3",
+    "level_4",
+    "column_text",
+    "uom",
+    "ghg_unit",
+    "factor",
+    "source",
+    "region",
+    "currency",
+]
+
+
+# Columns compared on upsert; a difference in any of them counts as a change.
+FACTOR_VALUE_COLUMNS = [
+    "scope",
+    "level_1",
+    "level_2",
+    "level_3",
+    "level_4",
+    "column_text",
+    "uom",
+    "ghg_unit",
+    "factor",
+    "source",
+    "region",
+    "currency",
+]
+FACTOR_KEY = ("dataset_id", "original_id", "year")
+IMPORT_MODES = ("append", "upsert")
+
+DEFAULT_CHUNK_ROWS = 20000
+ENCODING_SAMPLE_BYTES = 256 * 1024
+
+
+@dataclass
+class FactorImportResult:
+    inserted: int
+    rejected: int
+    seconds: float
+    error: str | None = None
+    chunks: int = 0
+    resumed_from_chunk: int = 0
+    # Rows of `inserted` that the earlier, interrupted run loaded (not timed by `seconds`).
+    resumed_rows: int = 0
+    run_id: str | None = None
+    mode: str = "append"
+    updated: int = 0
+    unchanged: int = 0
+    retired: int = 0
+    # GHG units the registry did not recognise; they were loaded but convert as kg.
+    unknown_units: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        rows = self.inserted + self.updated + self.unchanged - self.resumed_rows
+        return rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Pick the CSV encoding once from a leading sample (utf-8 -> cp1252 -> latin1)."""
+    for enc in ("utf-8", "cp1252"):
+        try:
+            sample.decode(enc)
+            return enc
+        except UnicodeDecodeError as e:
+            # A multi-byte utf-8 character cut off by the sample boundary is fine.
+            if enc == "utf-8" and e.start >= len(sample) - 3 and e.reason == "unexpected end of data":
+                return enc
+    return "latin1"
+
+
+def _file_sha256(fh) -> str:
+    h = hashlib.sha256()
+    fh.seek(0)
+    for block in iter(lambda: fh.read(1024 * 1024), b""):
+        h.update(block)
+    fh.seek(0)
+    return h.hexdigest()
+
+
+def _file_size(fh) -> int:
+    fh.seek(0, io.SEEK_END)
+    size = fh.tell()
+    fh.seek(0)
+    return size
+
+
+def _norm_col(c: str) -> str:
+    return str(c).lower().strip().replace("_", " ")
+
+
+def map_factor_columns(columns) -> dict[str, str | None]:
+    """Map CSV headers (case / underscore / spacing tolerant) to factor_lookup fields."""
+    cols = {_norm_col(c): c for c in columns}
+
+    def pick(*names):
+        for n in names:
+            k = _norm_col(n)
+            if k in cols:
+                return cols[k]
+        return None
+
+    return {
+        "year": pick("Year"),
+        "original_id": pick("ID", "Code"),
+        "scope": pick("Scope"),
+        "level_1": pick("Level 1", "Category", "SIC Section", "Product Group"),
+        "level_2": pick("Level 2", "Subcategory", "SIC Division", "Product"),
+        "level_3": pick("Level 3", "Detail", "Item"),
+        "level_4": pick("Level 4"),
+        "column_text": pick("Column Text", "Description", "Name", "Activity"),
+        "uom": pick("UOM", "Unit", "Units"),
+        "ghg_unit": pick("GHG Unit", "GHGUnit"),
+        "factor": pick(
+            "Factor",
+            "GHG Conversion Factor",
+            "kgCO2e per unit",
+            "kgco2e_per_unit",
+            "kgCO2e per GBP",
+            "kgCO2e_per_GBP",
+        ),
+    }
+
+
+def _text_or_none(s: pd.Series) -> pd.Series:
+    return s.astype(object).where(s.notna(), None)
+
+
+def normalise_factor_frame(
+    raw: pd.DataFrame,
+    colmap: dict[str, str | None],
+    *,
+    dataset_id: int,
+    file_name: str,
+    ds_year: int,
+    source: str,
+    region: str,
+    currency: str,
+) -> tuple[pd.DataFrame, int]:
+    """Return (rows ready for factor_lookup, number of rejected rows)."""
+    n = len(raw)
+    factor = pd.to_numeric(raw[colmap["factor"]], errors="coerce")
+    keep = factor.notna() & np.isfinite(factor)
+    raw = raw.loc[keep]
+    factor = factor.loc[keep]
+
+    # Year precedence: CSV > dataset
+    if colmap["year"]:
+        year = np.trunc(pd.to_numeric(raw[colmap["year"]], errors="coerce")).fillna(ds_year).astype("int64")
+    else:
+        year = pd.Series(ds_year, index=raw.index, dtype="int64")
+
+    out = pd.DataFrame(index=raw.index)
+    out["dataset_id"] = int(dataset_id)
+    out["file_name"] = file_name
+    out["year"] = year
+    for f in ("original_id", "scope", "level_1", "level_2", "level_3", "level_4", "uom"):
+        out[f] = _text_or_none(raw[colmap[f]]) if colmap[f] else None
+    out["column_text"] = raw[colmap["column_text"]].astype("string").fillna("").str.strip().astype(object)
+    out["ghg_unit"] = normalise_ghg_units(raw[colmap["ghg_unit"]]) if colmap["ghg_unit"] else DEFAULT_GHG_UNIT
+    out["factor"] = factor.astype("float64")
+    out["source"] = source
+    out["region"] = region
+    out["currency"] = currency
+    return out[FACTOR_COLUMNS].reset_index(drop=True), int(n - len(out))
+
+
+def bulk_insert_factors(con, frame: pd.DataFrame) -> int:
+    """Insert normalised rows on an open connection (caller owns the transaction)."""
+    if frame.empty:
+        return 0
+    if db_backend() != "postgres":
+        # DuckDB: factor_lookup.db_id has no IDENTITY; allocate a contiguous block.
+        start = int(con.execute("SELECT COALESCE(MAX(db_id),0) FROM factor_lookup").fetchone()[0] or 0)
+        frame = frame.copy()
+        frame.insert(0, "db_id", np.arange(start + 1, start + 1 + len(frame), dtype="int64"))
+    return con.insert_df("factor_lookup", frame)
+
+
+_STAGE_DDL = """
+    CREATE TEMP TABLE {name} (
+      dataset_id INTEGER, file_name VARCHAR, year INTEGER, original_id VARCHAR,
+      scope VARCHAR, level_1 VARCHAR, level_2 VARCHAR, level_3 VARCHAR, level_4 VARCHAR,
+      column_text VARCHAR, uom VARCHAR, ghg_unit VARCHAR, factor DOUBLE PRECISION,
+      source VARCHAR, region VARCHAR, currency VARCHAR
+    )
+"""
+_KEY_MATCH = " AND ".join(f"f.{c} = s.{c}" for c in FACTOR_KEY)
+_ROW_CHANGED = (
+    "("
+    + " OR ".join(
+        "CAST(f.factor AS DOUBLE PRECISION) IS DISTINCT FROM s.factor" if c == "factor" else f"f.{c} IS DISTINCT FROM s.{c}"
+        for c in FACTOR_VALUE_COLUMNS
+    )
+    + " OR f.is_active IS DISTINCT FROM TRUE)"
+)
+
+
+def _stage(con, name: str, frame: pd.DataFrame):
+    """(Re)create a connection-local temp table and bulk-load frame into it."""
+    con.execute(f"DROP TABLE IF EXISTS {name}")
+    con.execute(_STAGE_DDL.format(name=name))
+    con.insert_df(name, frame)
+
+
+def upsert_factors(con, frame: pd.DataFrame) -> tuple[int, int, int]:
+    """Merge normalised rows into factor_lookup by (dataset_id, original_id, year).
+
+    Returns (inserted, updated, unchanged). Only new and changed rows are
+    written; the caller owns the transaction.
+    """
+    if frame.empty:
+        return 0, 0, 0
+    # Last occurrence of a key within the file wins.
+    frame = frame.drop_duplicates(subset=list(FACTOR_KEY), keep="last")
+    _stage(con, "_factor_stage", frame)
+    try:
+        new_rows = int(
+            con.execute(
+                f"SELECT COUNT(*) FROM _factor_stage s WHERE NOT EXISTS (SELECT 1 FROM factor_lookup f WHERE {_KEY_MATCH})"
+            ).fetchone()[0]
+        )
+        changed = int(
+            con.execute(
+                f"SELECT COUNT(*) FROM _factor_stage s WHERE EXISTS "
+                f"(SELECT 1 FROM factor_lookup f WHERE {_KEY_MATCH} AND {_ROW_CHANGED})"
+            ).fetchone()[0]
+        )
+
+        if changed:
+            sets = ", ".join(f"{c}=s.{c}" for c in FACTOR_VALUE_COLUMNS + ["file_name"])
+            if db_backend() != "postgres":
+                # DuckDB: search_doc is a plain column; clear it so refresh_search_doc() rebuilds it.
+                sets += ", search_doc=NULL"
+            con.execute(
+                f"UPDATE factor_lookup AS f SET {sets}, is_active=TRUE "
+                f"FROM _factor_stage s WHERE {_KEY_MATCH} AND {_ROW_CHANGED}"
+            )
+
+        if new_rows:
+            cols = ", ".join(FACTOR_COLUMNS)
+            src_cols = ", ".join(f"s.{c}" for c in FACTOR_COLUMNS)
+            missing = f"NOT EXISTS (SELECT 1 FROM factor_lookup f WHERE {_KEY_MATCH})"
+            if db_backend() == "postgres":
+                con.execute(f"INSERT INTO factor_lookup ({cols}) SELECT {src_cols} FROM _factor_stage s WHERE {missing}")
+            else:
+                # DuckDB: no IDENTITY on db_id; number the new rows after the current max.
+                con.execute(
+                    f"""
+                    INSERT INTO factor_lookup (db_id, {cols})
+                    SELECT (SELECT COALESCE(MAX(db_id),0) FROM factor_lookup) + ROW_NUMBER() OVER (), {src_cols}
+                    FROM _factor_stage s WHERE {missing}
+                    """
+                )
+    finally:
+        con.execute("DROP TABLE IF EXISTS _factor_stage")
+    return new_rows, changed, len(frame) - new_rows - changed
+
+
+def retire_missing_factors(con, dataset_id: int, keys: pd.DataFrame) -> int:
+    """Mark active rows of a dataset whose (original_id, year) is not in keys as inactive."""
+    if keys.empty:
+        return 0
+    stage = keys.drop_duplicates().assign(dataset_id=int(dataset_id))
+    con.execute("DROP TABLE IF EXISTS _factor_seen")
+    con.execute("CREATE TEMP TABLE _factor_seen (dataset_id INTEGER, original_id VARCHAR, year INTEGER)")
+    try:
+        con.insert_df("_factor_seen", stage[["dataset_id", "original_id", "year"]])
+        vanished = (
+            "dataset_id=%s AND is_active=TRUE AND NOT EXISTS "
+            "(SELECT 1 FROM _factor_seen s WHERE s.dataset_id=f.dataset_id AND s.original_id=f.original_id AND s.year=f.year)"
+        )
+        n = int(con.execute(f"SELECT COUNT(*) FROM factor_lookup f WHERE {vanished}", [int(dataset_id)]).fetchone()[0])
+        if n:
+            con.execute(f"UPDATE factor_lookup AS f SET is_active=FALSE WHERE {vanished}", [int(dataset_id)])
+    finally:
+        con.execute("DROP TABLE IF EXISTS _factor_seen")
+    return n
+
+
+def _resumable_run(dataset_id: int, sha: str, chunk_rows: int):
+    with get_conn() as con:
+        return con.execute(
+            """
+            SELECT run_id, chunks_done, rows_inserted, rows_rejected
+            FROM factor_import_runs
+            WHERE dataset_id=%s AND file_sha256=%s AND chunk_rows=%s AND status IN ('running', 'failed')
+              AND COALESCE(mode, 'append')='append'
+            ORDER BY updated_at DESC
+            LIMIT 1
+            """,
+            [int(dataset_id), sha, int(chunk_rows)],
+        ).fetchone()
+
+
+def _start_run(dataset_id: int, file_name: str, sha: str, chunk_rows: int, mode: str) -> str:
+    run_id = uuid.uuid4().hex
+    with get_conn() as con:
+        con.execute(
+            """
+            INSERT INTO factor_import_runs
+              (run_id, dataset_id, file_name, file_sha256, chunk_rows, mode, chunks_done,
+               rows_inserted, rows_updated, rows_unchanged, rows_retired, rows_rejected,
+               status, started_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, 0, 0, 0, 0, 0, 0, 'running', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            """,
+            [run_id, int(dataset_id), file_name, sha, int(chunk_rows), mode],
+        )
+    return run_id
+
+
+def _set_run_status(run_id: str, status: str, error: str | None = None):
+    with get_conn() as con:
+        con.execute(
+            "UPDATE factor_import_runs SET status=%s, error=%s, updated_at=CURRENT_TIMESTAMP WHERE run_id=%s",
+            [status, (error or None), run_id],
+        )
+
+
+def ingest_factor_csv(
+    file,
+    file_name: str,
+    dataset_id: int,
+    dataset_meta: dict,
+    *,
+    mode: str = "append",
+    retire_missing: bool = False,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    on_progress: Callable[[float, FactorImportResult], None] | None = None,
+) -> FactorImportResult:
+    """Stream, normalise and load a factor CSV for one dataset.
+
+    `file` is a binary file-like object (or raw bytes). Each chunk is written
+    and checkpointed in its own transaction. In "append" mode, re-running the
+    same file for the same dataset after a failure skips the chunks that
+    already landed; "upsert" is idempotent, so a failed upsert simply starts
+    over. `on_progress(fraction, result_so_far)` is called after every chunk.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    t0 = time.perf_counter()
+    fh = io.BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    size = _file_size(fh)
+    encoding = detect_encoding(fh.read(ENCODING_SAMPLE_BYTES))
+    fh.seek(0)
+
+    header = pd.read_csv(fh, encoding=encoding, nrows=0)
+    fh.seek(0)
+    colmap = map_factor_columns(header.columns)
+    if colmap["column_text"] is None or colmap["factor"] is None:
+        return FactorImportResult(0, 0, time.perf_counter() - t0, "CSV missing required columns (Column Text / Factor).")
+    if mode == "upsert" and colmap["original_id"] is None:
+        return FactorImportResult(0, 0, time.perf_counter() - t0, "Update mode needs an ID column to match rows.", mode=mode)
+
+    sha = _file_sha256(fh)
+    prior = _resumable_run(dataset_id, sha, chunk_rows) if mode == "append" else None
+    if prior:
+        run_id, done, inserted, rejected = prior[0], int(prior[1] or 0), int(prior[2] or 0), int(prior[3] or 0)
+        _set_run_status(run_id, "running")
+    else:
+        run_id, done, inserted, rejected = _start_run(dataset_id, file_name, sha, chunk_rows, mode), 0, 0, 0
+    res = FactorImportResult(
+        inserted, rejected, 0.0, chunks=done, resumed_from_chunk=done, resumed_rows=inserted, run_id=run_id, mode=mode
+    )
+
+    norm_kwargs = dict(
+        dataset_id=int(dataset_id),
+        file_name=file_name,
+        ds_year=int(dataset_meta["year"]),
+        source=str(dataset_meta["source"]),
+        region=str(dataset_meta.get("region", "") or ""),
+        currency=str(dataset_meta.get("currency", "GBP") or "GBP"),
+    )
+    seen_keys: list[pd.DataFrame] = []
+    unknown_units: set[str] = set()
+
+    try:
+        reader = pd.read_csv(
+            fh,
+            encoding=encoding,
+            dtype=str,
+            chunksize=int(chunk_rows),
+        )
+        for i, raw in enumerate(reader):
+            if colmap["ghg_unit"]:
+                unknown_units.update(unknown_ghg_units(raw[colmap["ghg_unit"]]))
+            if i < done:
+                # Resume: this chunk already landed. Re-reading it with the same
+                # reader (rather than skipping lines) keeps chunk boundaries on
+                # CSV records, so quoted fields with newlines stay intact.
+                continue
+            frame, bad = normalise_factor_frame(raw, colmap, **norm_kwargs)
+            upd = same = 0
+            if mode == "upsert":
+                # Rows without an ID cannot be matched on re-import.
+                keyed = frame["original_id"].notna()
+                bad += int((~keyed).sum())
+                frame = frame.loc[keyed]
+                if retire_missing:
+                    seen_keys.append(frame[["original_id", "year"]])
+            # Rows and checkpoint commit together, so a resume never double-loads a chunk.
+            with get_conn(transactional=True) as con:
+                if mode == "upsert":
+                    n, upd, same = upsert_factors(con, frame)
+                else:
+                    n = bulk_insert_factors(con, frame)
+                refresh_search_doc(con, dataset_id)
+                con.execute(
+                    """
+                    UPDATE factor_import_runs
+                    SET chunks_done=chunks_done+1, rows_inserted=rows_inserted+%s,
+                        rows_updated=rows_updated+%s, rows_unchanged=rows_unchanged+%s,
+                        rows_rejected=rows_rejected+%s, updated_at=CURRENT_TIMESTAMP
+                    WHERE run_id=%s
+                    """,
+                    [int(n), int(upd), int(same), int(bad), run_id],
+                )
+            res.inserted += n
+            res.updated += upd
+            res.unchanged += same
+            res.rejected += bad
+            res.chunks += 1
+            res.unknown_units = sorted(unknown_units)
+            res.seconds = time.perf_counter() - t0
+            if on_progress:
+                on_progress(min(1.0, fh.tell() / size) if size else 1.0, res)
+
+        # Only retire once the whole file matched something; an empty parse must not wipe a dataset.
+        if retire_missing and seen_keys and (res.inserted + res.updated + res.unchanged) > 0:
+            with get_conn(transactional=True) as con:
+                res.retired = retire_missing_factors(con, dataset_id, pd.concat(seen_keys, ignore_index=True))
+                con.execute(
+                    "UPDATE factor_import_runs SET rows_retired=%s, updated_at=CURRENT_TIMESTAMP WHERE run_id=%s",
+                    [int(res.retired), run_id],
+                )
+    except Exception as e:
+        invalidate_dataset(dataset_id)
+        _set_run_status(run_id, "failed", f"{type(e).__name__}: {e}")
+        hint = "Upload the same file again to resume." if mode == "append" else "Upload the file again to retry."
+        res.error = f"Import stopped after {res.chunks} chunk(s): {type(e).__name__}: {e}. {hint}"
+        res.seconds = time.perf_counter() - t0
+        return res
+
+    invalidate_dataset(dataset_id)
+    _set_run_status(run_id, "complete")
+    res.seconds = time.perf_counter() - t0
+    if res.inserted + res.updated + res.unchanged == 0:
+        res.error = "No valid factor rows found."
+    return res
@@ -0,0 +1,275 @@
+"""Everything the Job Folder shows for one job, read in one round trip.
+
+A job's Job Folder rows (crp_job_details, job_plan and one job_scope_config
+row per scope) are created with the job by create_job_rows(); jobs created
+before that are backfilled at schema boot (core.database.JOB_FOLDER_ROWS_SQL).
+get_job_context() then reads the job, its client and those rows with a
+single SELECT and returns a frozen JobContext, cached per job in a TTLCache
+(JOB_CONTEXT_TTL_SECONDS, default 300).
+
+Writes go through the save_* helpers here, which invalidate the job's
+entry; other writers (job edits on the Jobs page, client renames) call
+invalidate_job() / invalidate_all().
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+
+import pandas as pd
+
+from core.cache import TTLCache
+from core.database import JOB_FOLDER_ROWS_SQL, get_conn
+
+SCOPES = ("Scope 1", "Scope 2", "Scope 3")
+
+_CONTEXTS = TTLCache(
+    maxsize=int(os.getenv("JOB_CONTEXT_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("JOB_CONTEXT_TTL_SECONDS", "300")),
+)
+
+
+@dataclass(frozen=True)
+class CrpDetails:
+    reporting_period_from: date | None
+    reporting_period_to: date | None
+    is_benchmark: bool
+    reporting_year: int
+    is_renewal: bool
+    client_order_number: str | None
+    client_contact_name: str | None
+    client_contact_email: str | None
+    report_signee_name: str | None
+    report_signee_position: str | None
+    payment_term_id: int
+    free_training_place: bool
+    num_employees: int | None
+    turnover_gbp: float | None
+    premises_size_m2: float | None
+    vehicles_owned: int | None
+    vehicles_leased: int | None
+    premises_owned: int | None
+    premises_leased: int | None
+
+
+@dataclass(frozen=True)
+class JobPlan:
+    data_collection_due: date | None
+    first_draft_due: date | None
+    final_report_due: date | None
+    override_dates: bool
+
+
+@dataclass(frozen=True)
+class ScopeConfig:
+    scope: str
+    include_scope: bool
+    dataset_id: int | None
+    factor_method: str | None
+
+
+@dataclass(frozen=True)
+class JobContext:
+    job_id: int
+    job_number: str
+    title: str | None
+    job_type: str | None
+    reporting_year: int | None
+    status: str | None
+    start_date: date | None
+    due_date: date | None
+    client_db_id: int
+    client_name: str
+    crp: CrpDetails
+    plan: JobPlan
+    scopes: tuple[ScopeConfig, ...]
+
+    def scope(self, name: str) -> ScopeConfig | None:
+        for s in self.scopes:
+            if s.scope == name:
+                return s
+        return None
+
+
+_JOB_COLUMNS = ["job_id", "job_number", "title", "job_type", "reporting_year", "status",
+                "start_date", "due_date", "client_db_id", "client_name"]
+_CRP_COLUMNS = [f.name for f in fields(CrpDetails)]
+_PLAN_COLUMNS = [f.name for f in fields(JobPlan)]
+
+_CONTEXT_SQL = f"""
+    SELECT {", ".join(f"j.{c}" for c in _JOB_COLUMNS[:-1])}, c.client_name,
+           {", ".join(f"d.{c} AS crp_{c}" for c in _CRP_COLUMNS)},
+           {", ".join(f"p.{c}" for c in _PLAN_COLUMNS)},
+           s.scope, s.include_scope, s.dataset_id, s.factor_method
+    FROM jobs j
+    JOIN clients c ON c.db_id = j.client_db_id
+    LEFT JOIN crp_job_details d ON d.job_id = j.job_id
+    LEFT JOIN job_plan p ON p.job_id = j.job_id
+    LEFT JOIN job_scope_config s ON s.job_id = j.job_id
+    WHERE j.job_id = %s
+    ORDER BY s.scope
+"""
+
+
+def _value(v):
+    """NaN / NaT / NA -> None, pandas / NumPy scalars -> plain Python."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.date()
+    return v.item() if hasattr(v, "item") else v
+
+
+def _date(v) -> date | None:
+    v = _value(v)
+    return v.date() if isinstance(v, datetime) else v
+
+
+def _int(v) -> int | None:
+    v = _value(v)
+    return None if v is None else int(v)
+
+
+def _float(v) -> float | None:
+    v = _value(v)
+    return None if v is None else float(v)
+
+
+def _text(v) -> str | None:
+    v = _value(v)
+    return None if v is None else str(v)
+
+
+def _context(df: pd.DataFrame) -> JobContext:
+    r = df.iloc[0]
+    crp = CrpDetails(
+        reporting_period_from=_date(r["crp_reporting_period_from"]),
+        reporting_period_to=_date(r["crp_reporting_period_to"]),
+        is_benchmark=bool(_value(r["crp_is_benchmark"])),
+        reporting_year=_int(r["crp_reporting_year"]),
+        is_renewal=bool(_value(r["crp_is_renewal"])),
+        client_order_number=_text(r["crp_client_order_number"]),
+        client_contact_name=_text(r["crp_client_contact_name"]),
+        client_contact_email=_text(r["crp_client_contact_email"]),
+        report_signee_name=_text(r["crp_report_signee_name"]),
+        report_signee_position=_text(r["crp_report_signee_position"]),
+        payment_term_id=_int(r["crp_payment_term_id"]) or 1,
+        free_training_place=bool(_value(r["crp_free_training_place"])),
+        num_employees=_int(r["crp_num_employees"]),
+        turnover_gbp=_float(r["crp_turnover_gbp"]),
+        premises_size_m2=_float(r["crp_premises_size_m2"]),
+        vehicles_owned=_int(r["crp_vehicles_owned"]),
+        vehicles_leased=_int(r["crp_vehicles_leased"]),
+        premises_owned=_int(r["crp_premises_owned"]),
+        premises_leased=_int(r["crp_premises_leased"]),
+    )
+    plan = JobPlan(
+        data_collection_due=_date(r["data_collection_due"]),
+        first_draft_due=_date(r["first_draft_due"]),
+        final_report_due=_date(r["final_report_due"]),
+        override_dates=bool(_value(r["override_dates"])),
+    )
+    scopes = tuple(
+        ScopeConfig(
+            scope=str(s["scope"]),
+            include_scope=True if _value(s["include_scope"]) is None else bool(s["include_scope"]),
+            dataset_id=_int(s["dataset_id"]),
+            factor_method=_text(s["factor_method"]),
+        )
+        for _, s in df.iterrows()
+        if _value(s["scope"]) is not None
+    )
+    return JobContext(
+        job_id=int(r["job_id"]),
+        job_number=str(r["job_number"]),
+        title=_text(r["title"]),
+        job_type=_text(r["job_type"]),
+        reporting_year=_int(r["reporting_year"]),
+        status=_text(r["status"]),
+        start_date=_date(r["start_date"]),
+        due_date=_date(r["due_date"]),
+        client_db_id=int(r["client_db_id"]),
+        client_name=str(r["client_name"]),
+        crp=crp,
+        plan=plan,
+        scopes=scopes,
+    )
+
+
+def _load(job_id: int) -> JobContext | None:
+    with get_conn() as con:
+        df = con.execute(_CONTEXT_SQL, [job_id]).df()
+        if df.empty:
+            return None
+        if df["crp_reporting_year"].isna().iloc[0] or df["override_dates"].isna().iloc[0] or len(df) < len(SCOPES):
+            # Written around the app after the boot backfill; create the rows once.
+            create_job_rows(con, job_id)
+            df = con.execute(_CONTEXT_SQL, [job_id]).df()
+    return _context(df)
+
+
+def get_job_context(job_id: int) -> JobContext | None:
+    """Cached JobContext for job_id, or None if the job does not exist."""
+    job_id = int(job_id)
+    return _CONTEXTS.get_or_load(job_id, lambda: _load(job_id))
+
+
+def invalidate_job(job_id: int) -> None:
+    _CONTEXTS.invalidate(int(job_id))
+
+
+def invalidate_all() -> None:
+    _CONTEXTS.clear()
+
+
+def create_job_rows(con, job_id: int) -> None:
+    """Create the job's crp_job_details / job_plan / job_scope_config rows.
+
+    Call on the connection that inserted the job; rows that already exist are
+    left alone.
+    """
+    for sql in JOB_FOLDER_ROWS_SQL:
+        con.execute(sql.format(where="AND j.job_id = %s"), [int(job_id)])
+
+
+def save_crp_details(job_id: int, crp: CrpDetails) -> None:
+    """Write crp_job_details (and jobs.reporting_year, which mirrors it) in one transaction."""
+    with get_conn(transactional=True) as con:
+        con.execute("UPDATE jobs SET reporting_year=%s WHERE job_id=%s", [int(crp.reporting_year), int(job_id)])
+        con.execute(
+            f"""
+            UPDATE crp_job_details
+            SET {", ".join(f"{c}=%s" for c in _CRP_COLUMNS)}, updated_at=NOW()
+            WHERE job_id=%s
+            """,
+            [getattr(crp, c) for c in _CRP_COLUMNS] + [int(job_id)],
+        )
+    invalidate_job(job_id)
+
+
+def save_job_plan(job_id: int, plan: JobPlan) -> None:
+    with get_conn() as con:
+        con.execute(
+            f"""
+            UPDATE job_plan
+            SET {", ".join(f"{c}=%s" for c in _PLAN_COLUMNS)}, updated_at=NOW()
+            WHERE job_id=%s
+            """,
+            [getattr(plan, c) for c in _PLAN_COLUMNS] + [int(job_id)],
+        )
+    invalidate_job(job_id)
+
+
+def save_scope_config(job_id: int, scopes: list[ScopeConfig]) -> None:
+    with get_conn(transactional=True) as con:
+        for s in scopes:
+            con.execute(
+                """
+                UPDATE job_scope_config
+                SET include_scope=%s, dataset_id=%s, factor_method=%s
+                WHERE job_id=%s AND scope=%s
+                """,
+                [bool(s.include_scope), s.dataset_id, s.factor_method, int(job_id), s.scope],
+            )
+    invalidate_job(job_id)
@@ -0,0 +1,136 @@
+"""Cached lookup lists (job types, subjects, datasets, roles, ...).
+
+These tables change a few times a month but were re-queried on every
+Streamlit rerun. Each list is cached per process under the current lookup
+version with a TTL (LOOKUP_CACHE_TTL_SECONDS, default 300). Code that writes
+a lookup table calls bump_lookup_version(), so the writing process serves
+fresh lists immediately; other processes pick the change up within the TTL.
+Callers get copies and may mutate them freely.
+"""
+from __future__ import annotations
+
+import os
+import threading
+
+import pandas as pd
+
+from core.cache import TTLCache
+from core.database import get_conn
+
+_CACHE = TTLCache(maxsize=64, ttl=float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300")))
+_VERSION = 0
+_VERSION_LOCK = threading.Lock()
+
+DEFAULT_JOB_TYPES = ["CRP", "Consultancy", "LCA", "Training"]
+DEFAULT_SUBJECTS = ["Research", "Data Collection", "Analysis", "Reporting"]
+DEFAULT_ROLES = ["Admin", "Consultant", "ReadOnly", "CRM", "QA", "Support"]
+
+
+def lookup_version() -> int:
+    return _VERSION
+
+
+def bump_lookup_version() -> int:
+    """Invalidate every cached lookup (call after writing any lookup table)."""
+    global _VERSION
+    with _VERSION_LOCK:
+        _VERSION += 1
+        _CACHE.clear()
+        return _VERSION
+
+
+def _cached(name: str, loader):
+    return _CACHE.get_or_load((name, _VERSION), loader)
+
+
+def _names(sql: str) -> list[str]:
+    with get_conn() as con:
+        df = con.execute(sql).df()
+    return [] if df.empty else df.iloc[:, 0].tolist()
+
+
+def job_types() -> list[str]:
+    rows = _cached("job_types", lambda: _names("SELECT name FROM job_types WHERE is_active=TRUE ORDER BY name"))
+    return list(rows) or list(DEFAULT_JOB_TYPES)
+
+
+def time_subjects() -> list[str]:
+    rows = _cached("time_subjects", lambda: _names("SELECT name FROM time_subjects WHERE is_active=TRUE ORDER BY name"))
+    return list(rows) or list(DEFAULT_SUBJECTS)
+
+
+def payment_terms() -> list[tuple[int, str]]:
+    def load():
+        with get_conn() as con:
+            df = con.execute(
+                "SELECT term_id, name FROM payment_terms_lookup WHERE is_active=TRUE ORDER BY term_id"
+            ).df()
+        return list(df.itertuples(index=False, name=None))
+
+    return list(_cached("payment_terms", load)) or [(1, "100% in advance")]
+
+
+def datasets() -> pd.DataFrame:
+    """All factor datasets, newest year first."""
+
+    def load():
+        with get_conn() as con:
+            return con.execute(
+                """
+                SELECT dataset_id, name, source, analysis_type, country, region, currency, year, version
+                FROM datasets
+                ORDER BY year DESC, name
+                """
+            ).df()
+
+    return _cached("datasets", load).copy()
+
+
+def roles() -> list[str]:
+    rows = _cached("roles", lambda: _names("SELECT role_name FROM roles_lookup WHERE is_active=TRUE ORDER BY role_name"))
+    if rows:
+        return list(rows)
+    with get_conn() as con:
+        con.execute("""
+            INSERT INTO roles_lookup (role_name, is_active)
+            VALUES ('Admin',TRUE),('Consultant',TRUE),('ReadOnly',TRUE),('CRM',TRUE),('QA',TRUE),('Support',TRUE)
+            ON CONFLICT (role_name) DO NOTHING
+        """)
+    bump_lookup_version()
+    return list(DEFAULT_ROLES)
+
+
+def industries() -> list[str]:
+    """Active industries; [] if industries_lookup does not exist yet."""
+
+    def load():
+        try:
+            return _names("SELECT name FROM industries_lookup WHERE is_active=TRUE ORDER BY name")
+        except Exception:
+            return []
+
+    return list(_cached("industries", load))
+
+
+def crm_owners() -> list[str]:
+    """Distinct CRM owners from users + existing clients, prefixed with "(Unassigned)"."""
+
+    def load():
+        a = _names("SELECT DISTINCT crm_owner AS v FROM clients WHERE crm_owner IS NOT NULL AND crm_owner <> ''")
+        b = _names("SELECT DISTINCT full_name AS v FROM users WHERE status='Active' AND full_name IS NOT NULL AND full_name <> ''")
+        return sorted({str(x) for x in a + b if x is not None and str(x).strip() != ""})
+
+    return ["(Unassigned)"] + list(_cached("crm_owners", load))
+
+
+def portfolios() -> list[str]:
+    """Distinct portfolios already in use (plus default NZI)."""
+
+    def load():
+        a = _names("SELECT DISTINCT portfolio AS v FROM clients WHERE portfolio IS NOT NULL AND portfolio <> ''")
+        return sorted({str(x) for x in a if x is not None and str(x).strip() != ""})
+
+    vals = list(_cached("portfolios", load))
+    if "NZI" not in vals:
+        vals = ["NZI"] + vals
+    return vals
@@ -4,6 +4,7 @@ import pandas as pd
 from datetime import datetime, timezone
 
 from core.database import db_backend, get_conn, next_id
+from services.client_folder import invalidate_client
 
 
 def list_notes(client_db_id: int) -> pd.DataFrame:
@@ -36,15 +37,18 @@ def add_note(
                 """,
                 [int(client_db_id), str(author), str(note_text), ts],
             ).fetchone()
-            return int(row[0])
+            new_id = int(row[0])
+        else:
+            # DuckDB fallback
+            note_id = next_id("client_notes", "note_id")
+            con.execute(
+                """
+                INSERT INTO client_notes (note_id, client_db_id, author, note_text, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [int(note_id), int(client_db_id), str(author), str(note_text), ts],
+            )
+            new_id = int(note_id)
 
-        # DuckDB fallback
-        note_id = next_id("client_notes", "note_id")
-        con.execute(
-            """
-            INSERT INTO client_notes (note_id, client_db_id, author, note_text, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            [int(note_id), int(client_db_id), str(author), str(note_text), ts],
-        )
-        return int(note_id)
+    invalidate_client(client_db_id, "notes")
+    return new_id
@@ -0,0 +1,199 @@
+"""Recalculate job_scope_rows after factor values change.
+
+job_scope_rows keeps its own copy of factor, ghg_unit and calc_tco2e taken
+when the row was entered. After a dataset is corrected (e.g. an upsert
+import), recalc_scope_rows() finds every row whose factor_db_id points at the
+changed factors (job_scope_rows_factor_idx), recomputes tCO2e for all of
+them in one vectorised pass (utils.units) and, unless it is a dry run,
+writes the changed rows back with a single UPDATE ... FROM a staged table.
+The diff is returned either way so it can be reviewed first.
+
+Overrides are left alone: calc_tco2e is refreshed, override_tco2e is not, so
+rows with an override keep their used value (flagged in the diff).
+
+CLI:
+    python -m services.recalc --dataset 3            # dry run, prints the diff
+    python -m services.recalc --dataset 3 --apply
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from core.database import db_backend, get_conn
+from services.emissions import sync_summary_jobs
+from utils.units import normalise_ghg_units, tco2e
+
+DIFF_COLUMNS = [
+    "row_id",
+    "job_id",
+    "scope",
+    "original_id",
+    "qty",
+    "old_factor",
+    "new_factor",
+    "old_ghg_unit",
+    "new_ghg_unit",
+    "old_calc_tco2e",
+    "new_calc_tco2e",
+    "delta_tco2e",
+    "overridden",
+    "factor_active",
+]
+
+
+@dataclass
+class RecalcResult:
+    rows_checked: int
+    rows_changed: int
+    applied: bool
+    seconds: float
+    diff: pd.DataFrame
+
+    @property
+    def delta_tco2e(self) -> float:
+        """Net change in calc tCO2e across changed rows (overridden rows included)."""
+        return float(self.diff["delta_tco2e"].sum()) if not self.diff.empty else 0.0
+
+
+def _dependent_rows(con, dataset_id: int | None, factor_db_ids) -> pd.DataFrame:
+    where, params = [], []
+    if dataset_id is not None:
+        where.append("f.dataset_id = %s")
+        params.append(int(dataset_id))
+    if factor_db_ids is not None:
+        ids = sorted({int(i) for i in factor_db_ids})
+        if not ids:
+            return pd.DataFrame()
+        where.append(f"r.factor_db_id IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    return con.execute(
+        f"""
+        SELECT r.row_id, r.job_id, r.scope, r.original_id, r.qty,
+               r.factor AS old_factor, f.factor AS new_factor,
+               r.ghg_unit AS old_ghg_unit, COALESCE(f.ghg_unit, r.ghg_unit) AS new_ghg_unit,
+               r.calc_tco2e AS old_calc_tco2e, r.override_tco2e,
+               COALESCE(f.is_active, TRUE) AS factor_active
+        FROM job_scope_rows r
+        JOIN factor_lookup f ON f.db_id = r.factor_db_id
+        WHERE {" AND ".join(where)}
+        ORDER BY r.row_id
+        """,
+        params,
+    ).df()
+
+
+def _changed(rows: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    """Rows whose stored factor, ghg_unit or calc_tco2e differ from the recomputed ones."""
+    if rows.empty:
+        return pd.DataFrame(columns=DIFF_COLUMNS)
+    new_calc = tco2e(rows["qty"], rows["new_factor"], rows["new_ghg_unit"])
+    old_calc = pd.to_numeric(rows["old_calc_tco2e"], errors="coerce").to_numpy(dtype="float64")
+    old_f = pd.to_numeric(rows["old_factor"], errors="coerce").to_numpy(dtype="float64")
+    new_f = pd.to_numeric(rows["new_factor"], errors="coerce").to_numpy(dtype="float64")
+
+    calc_moved = np.isnan(old_calc) | (np.abs(new_calc - np.nan_to_num(old_calc)) > tolerance)
+    factor_moved = ~np.isclose(old_f, new_f, rtol=0.0, atol=tolerance, equal_nan=True)
+    ghg_moved = (normalise_ghg_units(rows["old_ghg_unit"]) != normalise_ghg_units(rows["new_ghg_unit"])).to_numpy()
+
+    out = rows.assign(
+        new_calc_tco2e=new_calc,
+        delta_tco2e=new_calc - np.nan_to_num(old_calc),
+        overridden=rows["override_tco2e"].notna(),
+    )
+    return out.loc[calc_moved | factor_moved | ghg_moved, DIFF_COLUMNS].reset_index(drop=True)
+
+
+def _write_back(con, diff: pd.DataFrame) -> None:
+    """One UPDATE for all changed rows, joined to a staged copy of the new values."""
+    stage = pd.DataFrame(
+        {
+            "row_id": diff["row_id"].astype("int64"),
+            "factor": pd.to_numeric(diff["new_factor"], errors="coerce").astype("float64"),
+            "ghg_unit": diff["new_ghg_unit"].astype("object"),
+            "calc_tco2e": diff["new_calc_tco2e"].astype("float64"),
+        }
+    )
+    con.execute("DROP TABLE IF EXISTS _recalc_stage")
+    con.execute(
+        "CREATE TEMP TABLE _recalc_stage (row_id INTEGER, factor DOUBLE PRECISION, ghg_unit VARCHAR, calc_tco2e DOUBLE PRECISION)"
+    )
+    try:
+        con.insert_df("_recalc_stage", stage)
+        con.execute(
+            """
+            UPDATE job_scope_rows AS r
+            SET factor = s.factor, ghg_unit = s.ghg_unit, calc_tco2e = s.calc_tco2e,
+                updated_at = CURRENT_TIMESTAMP
+            FROM _recalc_stage s
+            WHERE r.row_id = s.row_id
+            """
+        )
+    finally:
+        con.execute("DROP TABLE IF EXISTS _recalc_stage")
+
+
+def recalc_scope_rows(
+    dataset_id: int | None = None,
+    factor_db_ids=None,
+    apply: bool = False,
+    tolerance: float = 1e-9,
+) -> RecalcResult:
+    """Recompute rows that use factors of dataset_id and/or the given factor_db_ids.
+
+    With apply=False (the default) nothing is written and the result's diff
+    shows what would change.
+    """
+    if dataset_id is None and factor_db_ids is None:
+        raise ValueError("Pass dataset_id and/or factor_db_ids.")
+    t0 = time.perf_counter()
+    with get_conn(transactional=apply) as con:
+        rows = _dependent_rows(con, dataset_id, factor_db_ids)
+        diff = _changed(rows, tolerance)
+        if apply and not diff.empty:
+            _write_back(con, diff)
+            sync_summary_jobs(con, diff["job_id"].unique())
+    return RecalcResult(
+        rows_checked=len(rows),
+        rows_changed=len(diff),
+        applied=bool(apply and not diff.empty),
+        seconds=time.perf_counter() - t0,
+        diff=diff,
+    )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Recalculate job scope rows from current factor values.")
+    ap.add_argument("--dataset", type=int, help="dataset_id whose factors changed")
+    ap.add_argument("--factor-ids", help="comma-separated factor_lookup.db_id values")
+    ap.add_argument("--apply", action="store_true", help="write the changes (default is a dry run)")
+    ap.add_argument("--csv", help="also write the diff to this CSV file")
+    args = ap.parse_args(argv)
+    ids = [int(x) for x in args.factor_ids.split(",") if x.strip()] if args.factor_ids else None
+    if args.dataset is None and ids is None:
+        ap.error("pass --dataset and/or --factor-ids")
+
+    from core.migrations import ensure_schema
+
+    ensure_schema(include_migrations=db_backend() == "postgres")
+    res = recalc_scope_rows(args.dataset, ids, apply=args.apply)
+    verb = "updated" if res.applied else "would change"
+    print(
+        f"{res.rows_checked:,} dependent rows checked, {res.rows_changed:,} {verb} "
+        f"(net calc delta {res.delta_tco2e:+.6f} tCO2e) in {res.seconds * 1000.0:.0f} ms"
+    )
+    if not res.diff.empty:
+        print(res.diff.head(25).to_string(index=False))
+    if args.csv:
+        res.diff.to_csv(args.csv, index=False)
+        print(f"diff: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Writes for job_scope_rows (the row-by-row scope data entry).
+
+Each write runs in one transaction with services.emissions.sync_summary(), so
+job_emissions_summary never lags the rows on DuckDB (Postgres uses triggers).
+"""
+from __future__ import annotations
+
+import pandas as pd
+
+from core.database import get_conn
+from services.emissions import sync_summary
+from utils.units import tco2e
+
+# Columns the scope grid edits in bulk (save_scope_row_edits); calc_tco2e follows qty.
+GRID_EDIT_COLUMNS = ("enabled", "report_label", "notes", "qty", "override_tco2e", "override_reason")
+
+# Columns a caller may set on insert/update (row_id/job_id/scope are fixed once created).
+EDITABLE_COLUMNS = (
+    "dataset_id",
+    "factor_db_id",
+    "original_id",
+    "level_1",
+    "level_2",
+    "level_3",
+    "level_4",
+    "column_text",
+    "report_label",
+    "notes",
+    "enabled",
+    "qty",
+    "uom",
+    "factor",
+    "ghg_unit",
+    "calc_tco2e",
+    "override_tco2e",
+    "override_reason",
+)
+
+
+def calc_row_tco2e(qty, factor, ghg_unit: str | None) -> float:
+    """qty * factor in tonnes CO2e, converted from the factor's ghg_unit (utils.units)."""
+    return tco2e(qty, factor, ghg_unit)
+
+
+def insert_job_scope_row(job_id: int, scope: str, **values) -> int:
+    cols = [c for c in EDITABLE_COLUMNS if c in values]
+    unknown = set(values) - set(EDITABLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown job_scope_rows columns: {sorted(unknown)}")
+    with get_conn(transactional=True) as con:
+        row = con.execute(
+            f"""
+            INSERT INTO job_scope_rows (job_id, scope, {", ".join(cols)})
+            VALUES (%s, %s, {", ".join(["%s"] * len(cols))})
+            RETURNING row_id
+            """,
+            [int(job_id), str(scope)] + [values[c] for c in cols],
+        ).fetchone()
+        sync_summary(con, int(job_id), str(scope))
+    return int(row[0])
+
+
+def save_scope_row_edits(job_id: int, scope: str, changed: pd.DataFrame, delete_ids=()) -> tuple[int, int]:
+    """Apply a batch of grid edits for one job + scope in a single transaction.
+
+    changed holds row_id, factor, ghg_unit and GRID_EDIT_COLUMNS for each
+    edited row; calc_tco2e is recomputed from qty for all of them at once.
+    The rows are staged in a temp table and written with one UPDATE ... FROM,
+    deletes with one DELETE. Returns (updated, deleted).
+    """
+    job_id, scope = int(job_id), str(scope)
+    ids = sorted({int(r) for r in delete_ids})
+    updated = deleted = 0
+    with get_conn(transactional=True) as con:
+        if ids:
+            deleted = len(
+                con.execute(
+                    f"DELETE FROM job_scope_rows WHERE job_id=%s AND scope=%s "
+                    f"AND row_id IN ({', '.join(['%s'] * len(ids))}) RETURNING row_id",
+                    [job_id, scope] + ids,
+                ).df()
+            )
+        changed = changed.loc[~changed["row_id"].isin(ids)] if changed is not None else None
+        if changed is not None and not changed.empty:
+            stage = pd.DataFrame(
+                {
+                    "row_id": changed["row_id"].astype("int64"),
+                    "enabled": changed["enabled"].fillna(True).astype(bool),
+                    "report_label": changed["report_label"].astype(object),
+                    "notes": changed["notes"].astype(object),
+                    "qty": pd.to_numeric(changed["qty"], errors="coerce").astype("float64"),
+                    "calc_tco2e": tco2e(changed["qty"], changed["factor"], changed["ghg_unit"]),
+                    "override_tco2e": pd.to_numeric(changed["override_tco2e"], errors="coerce").astype("float64"),
+                    "override_reason": changed["override_reason"].astype(object),
+                }
+            )
+            con.execute("DROP TABLE IF EXISTS _row_edit_stage")
+            con.execute(
+                """
+                CREATE TEMP TABLE _row_edit_stage (
+                  row_id INTEGER, enabled BOOLEAN, report_label VARCHAR, notes VARCHAR,
+                  qty DOUBLE PRECISION, calc_tco2e DOUBLE PRECISION,
+                  override_tco2e DOUBLE PRECISION, override_reason VARCHAR
+                )
+                """
+            )
+            try:
+                con.insert_df("_row_edit_stage", stage)
+                con.execute(
+                    """
+                    UPDATE job_scope_rows AS r
+                    SET enabled = s.enabled, report_label = s.report_label, notes = s.notes,
+                        qty = s.qty, calc_tco2e = s.calc_tco2e,
+                        override_tco2e = s.override_tco2e, override_reason = s.override_reason,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM _row_edit_stage s
+                    WHERE r.row_id = s.row_id AND r.job_id = %s AND r.scope = %s
+                    """,
+                    [job_id, scope],
+                )
+            finally:
+                con.execute("DROP TABLE IF EXISTS _row_edit_stage")
+            updated = len(stage)
+        if updated or deleted:
+            sync_summary(con, job_id, scope)
+    return updated, deleted
+
+
+def set_rows_enabled(job_id: int, scope: str, row_ids, enabled: bool) -> int:
+    """Enable or disable rows of one job + scope, touching no other column. Returns rows changed."""
+    job_id, scope = int(job_id), str(scope)
+    ids = sorted({int(r) for r in row_ids})
+    if not ids:
+        return 0
+    with get_conn(transactional=True) as con:
+        n = len(
+            con.execute(
+                f"UPDATE job_scope_rows SET enabled=%s, updated_at=CURRENT_TIMESTAMP "
+                f"WHERE job_id=%s AND scope=%s AND enabled<>%s "
+                f"AND row_id IN ({', '.join(['%s'] * len(ids))}) RETURNING row_id",
+                [bool(enabled), job_id, scope, bool(enabled)] + ids,
+            ).df()
+        )
+        if n:
+            sync_summary(con, job_id, scope)
+    return n
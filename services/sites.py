@@ -1,6 +1,7 @@
 import pandas as pd
 
 from core.database import db_backend, get_conn, next_id
+from services.client_folder import invalidate_client
 
 
 def list_sites(client_db_id: int) -> pd.DataFrame:
@@ -27,15 +28,18 @@ def add_site(client_db_id: int, site_name: str, location: str | None, is_registe
                 """,
                 [int(client_db_id), site_name, (location or None), bool(is_registered_office)],
             ).fetchone()
-            return int(row[0])
+            new_id = int(row[0])
+        else:
+            # DuckDB fallback
+            site_id = next_id("client_sites", "site_id")
+            con.execute(
+                """
+                INSERT INTO client_sites (site_id, client_db_id, site_name, location, is_registered_office)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [int(site_id), int(client_db_id), site_name, (location or None), bool(is_registered_office)],
+            )
+            new_id = int(site_id)
 
-        # DuckDB fallback
-        site_id = next_id("client_sites", "site_id")
-        con.execute(
-            """
-            INSERT INTO client_sites (site_id, client_db_id, site_name, location, is_registered_office)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            [int(site_id), int(client_db_id), site_name, (location or None), bool(is_registered_office)],
-        )
-        return int(site_id)
+    invalidate_client(client_db_id, "sites")
+    return new_id
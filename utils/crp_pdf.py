@@ -6,8 +6,7 @@ import streamlit as st
 
 # --- CONFIG / BOOT ---
 from config import APP_TITLE, LOGO_URL
-from core.database import run_ddl
-from core.migrations import run_migrations
+from core.migrations import boot_info, ensure_schema
 from components.navigation import render_sidebar
 
 PROJECT_ROOT = Path(__file__).parent.resolve()
@@ -31,9 +30,8 @@ try:
 except Exception:
     pass
 
-# Schema + migrations (safe to run on every rerun)
-run_ddl()
-run_migrations()
+# Schema + migrations: applied once per process (or when the DDL fingerprint changes)
+ensure_schema(include_migrations=True)
 
 # --- Dynamic page loader (supports either `pages/` or `nzi_pages/`) ---
 def discover_pages_pkg() -> str | None:
@@ -86,6 +84,8 @@ with st.expander("🔧 Diagnostics", expanded=False):
         "reports": "OK" if reports else (err_reports or "missing (optional)"),
         "admin": "OK" if admin else err_admin,
     })
+    st.caption("Schema boot")
+    st.write(boot_info())
 
 # --- Custom sidebar navigation + routing ---
 page = render_sidebar()  # must return one of: "Dashboard", "Clients", "Client Folder", "Jobs", "Reports", "Admin"